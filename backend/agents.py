@@ -1,30 +1,47 @@
 """
 LangGraph Agent System with Supervisor and Workers
 """
-from typing import TypedDict, Annotated, Sequence
+from typing import TypedDict, Annotated, Sequence, Dict, Optional
 from langgraph.graph import StateGraph, END
 from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_core.embeddings import Embeddings
 from langchain_core.messages import HumanMessage, AIMessage, BaseMessage
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import DirectoryLoader, TextLoader
 import operator
 from pathlib import Path
 import os
+import re
+import sqlite3
+import threading
+import time
 
 from prompts import (
     SUPERVISOR_PROMPT,
     KNOWLEDGE_WORKER_PROMPT,
     RESPONSE_WORKER_PROMPT,
-    ESCALATION_WORKER_PROMPT
+    ESCALATION_WORKER_PROMPT,
+    ESCALATION_HANDOFF_TEMPLATE,
+    ESCALATION_REFERENCE_TEMPLATE,
+    FAQ_POLISH_PROMPT
 )
 from config import settings
+from embedding_cache import QueryEmbeddingCache, CachedEmbeddings
+from embedding_backends import create_embeddings
+from knowledge_base import open_index
+from knowledge_reload import KnowledgeReloader
+from escalation_screen import EscalationScreen, ESCALATE, BENIGN
+from escalation_queue import DeskNotifier, EscalationQueue, EscalationWorkers, build_ticket
+from node_cache import NodeMemo, fingerprint, query_intent
+from llm_cache import LLMCallCache
+from llm_batcher import LLMBatcher
+from model_cascade import ModelCascade
+from tracing import TraceWriter, annotate, node_span, record_llm_call
+from token_accounting import TokenMeter, note_node, note_path
+from profiling import ProfileSession, profile_node
 
 # State definition for the agent graph
 class AgentState(TypedDict):
-    """State shared across all agents"""
+    """State shared across all agents (nodes return only the keys they change)"""
+    # LLM responses, only collected when settings.debug_messages is on
     messages: Annotated[Sequence[BaseMessage], operator.add]
     query: str
     chat_history: str
@@ -32,125 +49,270 @@ class AgentState(TypedDict):
     knowledge_retrieved: str
     escalation_needed: bool
     final_response: str
+    screen_decision: str
+    session_id: str
+
+
+WORKER_LABELS = ("knowledge_worker", "response_worker", "escalation_worker", "finish")
+
+
+def _label_text(text: str) -> str:
+    """Lower-case with spaces/hyphens as underscores, so "Knowledge Worker" reads as the label"""
+    return re.sub(r"[\s-]+", "_", text.lower())
+
+
+def parse_worker_label(text: str):
+    """
+    Return the worker named by a (possibly partial) supervisor answer once it
+    is unambiguous, e.g. "know" -> knowledge_worker; None if undecided.
+    """
+    cleaned = re.sub(r"[^a-z_]", "", _label_text(text)).strip("_")
+    if len(cleaned) < 3:
+        return None
+    matches = [label for label in WORKER_LABELS if label.startswith(cleaned) or cleaned.startswith(label)]
+    if len(matches) != 1:
+        return None
+    return "FINISH" if matches[0] == "finish" else matches[0]
 
 
 class CustomerSupportOrchestrator:
     """Main orchestrator using LangGraph with Supervisor-Worker pattern"""
     
-    def __init__(self):
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash",
-            temperature=0.7,
+    def __init__(self, models: Optional[Dict[str, object]] = None, embeddings: Optional[Embeddings] = None):
+        """
+        ``models`` optionally overrides the chat model per node ("supervisor",
+        "knowledge", "response", "response_fast", "escalation"), and
+        ``embeddings`` the embedding backend, e.g. with local stand-ins for
+        testing.
+        """
+        models = models or {}
+        # The supervisor only emits a one-word label: deterministic and capped
+        self.supervisor_llm = models.get("supervisor") or ChatGoogleGenerativeAI(
+            model=settings.supervisor_model,
+            temperature=0,
+            max_output_tokens=settings.supervisor_max_tokens,
+            thinking_budget=0,  # thinking tokens would count against the cap
             google_api_key=settings.google_api_key
         )
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-MiniLM-L6-v2"
-        )
+        self.knowledge_llm = models.get("knowledge") or self._create_llm(settings.knowledge_model)
+        self.response_llm = models.get("response") or self._create_llm(settings.response_model)
+        self.escalation_llm = models.get("escalation") or self._create_llm(settings.escalation_model)
+        
+        # Optional fast-first cascade for the customer-facing response
+        self.response_cascade = None
+        if settings.response_cascade_enabled or "response_fast" in models:
+            fast_llm = models.get("response_fast") or self._create_llm(settings.response_fast_model)
+            self.response_cascade = ModelCascade([("fast", fast_llm), ("full", self.response_llm)])
+        
+        # Query embeddings go through a shared LRU cache so repeated queries skip the model
+        self.embedding_cache = QueryEmbeddingCache(settings.embedding_cache_size)
+        self.embeddings = CachedEmbeddings(embeddings or create_embeddings(), self.embedding_cache)
         self.vector_store = None
         self.graph = None
-        
-        # Initialize knowledge base
+        self.faq_stats = {"hits": 0, "misses": 0}
+        self.supervisor_stats = {"decisions": 0, "output_tokens": 0, "max_output_tokens": 0, "early_exits": 0}
+        self._stats_lock = threading.Lock()
+        self.llm_cache = LLMCallCache() if settings.llm_cache_enabled else None
+        self.llm_batcher = LLMBatcher() if settings.llm_batching_enabled else None
+        # Knowledge summaries memoised on (query intent, retrieved chunk IDs)
+        self.knowledge_memo = NodeMemo(
+            "knowledge_worker",
+            settings.node_cache_size if settings.node_cache_enabled else 0,
+            settings.node_cache_ttl
+        )
+        self.escalation_screen = (
+            EscalationScreen.from_settings() if settings.escalation_prescreen else None
+        )
+        self.tracer = TraceWriter() if settings.trace_enabled else None
+        # Escalation tickets are written and delivered off the request path
+        self.escalations = None
+        if settings.escalation_queue_enabled:
+            self.escalations = EscalationQueue()
+            self.escalation_desk = DeskNotifier()
+            self.escalation_workers = EscalationWorkers(self.escalations, self._deliver_escalation)
+        self.token_meter = TokenMeter()
+        
+        # Initialize knowledge base and watch it for changes
         self._initialize_knowledge_base()
+        self.knowledge_reloader = KnowledgeReloader(self)
+        self.knowledge_reloader.start_watcher()
         
         # Build the agent graph
         self._build_graph()
+        if self.escalations is not None:
+            self.escalation_workers.start()
+    
+    @staticmethod
+    def _create_llm(model: str):
+        return ChatGoogleGenerativeAI(
+            model=model,
+            temperature=settings.llm_temperature,
+            google_api_key=settings.google_api_key
+        )
     
     def _initialize_knowledge_base(self):
-        """Load documents from knowledge folder and create vector store"""
+        """Open the shared knowledge index, building it first if needed"""
         knowledge_path = Path(settings.knowledge_path)
         
-        if not knowledge_path.exists():
+        if not knowledge_path.exists() and settings.index_mode != "readonly":
             print(f"Warning: Knowledge path {knowledge_path} does not exist")
             return
         
-        # Load all text files from knowledge folder
-        loader = DirectoryLoader(
-            str(knowledge_path),
-            glob="**/*.txt",
-            loader_cls=TextLoader
-        )
-        
         try:
-            documents = loader.load()
-            
-            if not documents:
-                print("Warning: No documents found in knowledge folder")
-                return
-            
-            # Split documents into chunks
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=1000,
-                chunk_overlap=200
-            )
-            splits = text_splitter.split_documents(documents)
-            
-            # Create vector store
-            self.vector_store = Chroma.from_documents(
-                documents=splits,
-                embedding=self.embeddings,
-                persist_directory=settings.chroma_db_path
-            )
-            print(f"Loaded {len(documents)} documents with {len(splits)} chunks into vector store")
-            
+            self.vector_store = open_index(self.embeddings, settings.index_mode)
         except Exception as e:
             print(f"Error loading knowledge base: {e}")
     
-    def supervisor_node(self, state: AgentState) -> AgentState:
+    def supervisor_node(self, state: AgentState) -> dict:
         """Supervisor decides which worker to route to next"""
         query = state["query"]
         chat_history = state.get("chat_history", "")
         
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", SUPERVISOR_PROMPT),
-            ("human", "Decide the next worker: knowledge_worker, response_worker, escalation_worker, or FINISH")
-        ])
-        
         formatted_prompt = SUPERVISOR_PROMPT.format(
             query=query,
             chat_history=chat_history
         )
         
-        response = self.llm.invoke([HumanMessage(content=formatted_prompt)])
-        decision = response.content.lower()
-        
-        # Parse decision
-        if "knowledge_worker" in decision:
-            next_worker = "knowledge_worker"    
-        elif "escalation_worker" in decision:
-            next_worker = "escalation_worker"
-        elif "response_worker" in decision:
-            next_worker = "response_worker"
+        # Stream the one-word answer and stop as soon as the label is unambiguous
+        messages = [HumanMessage(content=formatted_prompt)]
+        response = None
+        next_worker = None
+        prompt_tokens = self.token_meter.check_prompt("supervisor", messages)
+        start = time.perf_counter()
+        cached = self.llm_cache.get(self.supervisor_llm, messages, "supervisor") if self.llm_cache else None
+        if cached is not None:
+            response = AIMessage(content=cached)
+            next_worker = parse_worker_label(cached)
+        elif self.llm_batcher is not None:
+            # Batched calls can't stream; the label is capped at a few tokens anyway
+            response = self.llm_batcher.invoke("supervisor", self.supervisor_llm, messages)
+            next_worker = parse_worker_label(response.content)
+            if self.llm_cache:
+                self.llm_cache.put(self.supervisor_llm, messages, "supervisor", response.content)
         else:
-            next_worker = "FINISH"
-        
-        state["next_worker"] = next_worker
-        state["messages"] = state.get("messages", []) + [response]
+            stream = self.supervisor_llm.stream(messages)
+            try:
+                for chunk in stream:
+                    response = chunk if response is None else response + chunk
+                    next_worker = parse_worker_label(response.content)
+                    if next_worker:
+                        break
+            finally:
+                stream.close()
+            if self.llm_cache and response is not None:
+                self.llm_cache.put(self.supervisor_llm, messages, "supervisor", response.content)
+        
+        if response is not None:
+            self._account("supervisor", self.supervisor_llm, messages, response, time.perf_counter() - start,
+                          cached=cached is not None, prompt_tokens=prompt_tokens)
+        
+        decision = _label_text(response.content) if response is not None else ""
+        early_exit = next_worker is not None
+        
+        # Fall back to searching the full output for a worker name
+        if next_worker is None:
+            if "knowledge_worker" in decision:
+                next_worker = "knowledge_worker"    
+            elif "escalation_worker" in decision:
+                next_worker = "escalation_worker"
+            elif "response_worker" in decision:
+                next_worker = "response_worker"
+            else:
+                next_worker = "FINISH"
+        
+        self._record_supervisor_decision(response, early_exit)
+        
+        # The pre-screen found no sensitive wording: answer instead of escalating
+        if (next_worker == "escalation_worker" and settings.escalation_skip_benign
+                and state.get("screen_decision") == BENIGN):
+            next_worker = "knowledge_worker"
+        
+        return {"next_worker": next_worker, **self._debug_messages(response)}
+    
+    def _invoke_llm(self, node: str, llm, messages):
+        """Single entry point for non-streaming LLM calls from graph nodes"""
+        prompt_tokens = self.token_meter.check_prompt(node, messages)
+        start = time.perf_counter()
+        if self.llm_cache is not None:
+            cached = self.llm_cache.get(llm, messages, node)
+            if cached is not None:
+                response = AIMessage(content=cached)
+                self._account(node, llm, messages, response, time.perf_counter() - start,
+                              cached=True, prompt_tokens=prompt_tokens)
+                return response
+        
+        if self.llm_batcher is not None:
+            response = self.llm_batcher.invoke(node, llm, messages)
+        else:
+            response = llm.invoke(messages)
+        self._account(node, llm, messages, response, time.perf_counter() - start, prompt_tokens=prompt_tokens)
         
-        return state
+        if self.llm_cache is not None and isinstance(response.content, str):
+            self.llm_cache.put(llm, messages, node, response.content)
+        return response
+    
+    def _account(self, node: str, llm, messages, response, elapsed: float,
+                 cached: bool = False, prompt_tokens: Optional[int] = None):
+        """Token meter and request trace bookkeeping for one LLM call"""
+        self.token_meter.record(node, llm, messages, response, cached=cached, prompt_tokens=prompt_tokens)
+        record_llm_call(node, llm, response, elapsed, cached=cached)
+    
+    @staticmethod
+    def _debug_messages(response) -> dict:
+        """State update that keeps the raw LLM message only in debug mode"""
+        if settings.debug_messages and response is not None:
+            return {"messages": [response]}
+        return {}
     
-    def knowledge_worker_node(self, state: AgentState) -> AgentState:
+    def _record_supervisor_decision(self, response, early_exit: bool):
+        usage = getattr(response, "usage_metadata", None) or {}
+        text = response.content if response is not None else ""
+        tokens = usage.get("output_tokens") or max(1, len(text) // 4)
+        with self._stats_lock:
+            self.supervisor_stats["decisions"] += 1
+            self.supervisor_stats["output_tokens"] += tokens
+            self.supervisor_stats["max_output_tokens"] = max(self.supervisor_stats["max_output_tokens"], tokens)
+            if early_exit:
+                self.supervisor_stats["early_exits"] += 1
+    
+    def knowledge_worker_node(self, state: AgentState) -> dict:
         """Knowledge worker retrieves relevant information from vector store"""
         query = state["query"]
         
-        # Retrieve relevant documents
+        # Retrieve relevant documents (one read of the reference: reloads swap it)
         context = ""
-        if self.vector_store:
-            docs = self.vector_store.similarity_search(query, k=3)
+        docs = []
+        vector_store = self.vector_store
+        if vector_store:
+            docs = vector_store.similarity_search(query, k=3)
+            annotate(chunk_ids=[doc.metadata.get("id") for doc in docs])
             context = "\n\n".join([f"Document {i+1}:\n{doc.page_content}" for i, doc in enumerate(docs)])
         else:
             context = "No knowledge base available"
         
-        # Process with LLM
-        prompt = KNOWLEDGE_WORKER_PROMPT.format(query=query, context=context)
-        response = self.llm.invoke([HumanMessage(content=prompt)])
+        # Process with LLM, reusing the summary for the same intent and chunk set
+        self.knowledge_memo.sync_version(vector_store.version if vector_store else "")
+        key = fingerprint(
+            query_intent(query),
+            *sorted(doc.metadata.get("id", doc.page_content) for doc in docs)
+        )
+        responses = []
+        
+        def summarise():
+            prompt = KNOWLEDGE_WORKER_PROMPT.format(query=query, context=context)
+            response = self._invoke_llm("knowledge_worker", self.knowledge_llm, [HumanMessage(content=prompt)])
+            responses.append(response)
+            return response.content
         
-        state["knowledge_retrieved"] = response.content
-        state["messages"] = state.get("messages", []) + [response]
-        state["next_worker"] = "response_worker"  # Always go to response worker after retrieval
+        knowledge = self.knowledge_memo.get_or_compute(key, summarise)
         
-        return state
+        return {
+            "knowledge_retrieved": knowledge,
+            "next_worker": "response_worker",  # Always go to response worker after retrieval
+            **self._debug_messages(responses[0] if responses else None)
+        }
     
-    def response_worker_node(self, state: AgentState) -> AgentState:
+    def response_worker_node(self, state: AgentState) -> dict:
         """Response worker generates the final customer-facing response"""
         query = state["query"]
         knowledge = state.get("knowledge_retrieved", "No specific knowledge retrieved")
@@ -162,15 +324,23 @@ class CustomerSupportOrchestrator:
             chat_history=chat_history
         )
         
-        response = self.llm.invoke([HumanMessage(content=prompt)])
-        
-        state["final_response"] = response.content
-        state["messages"] = state.get("messages", []) + [response]
-        state["next_worker"] = "FINISH"
+        messages = [HumanMessage(content=prompt)]
+        if self.response_cascade is not None:
+            response, _ = self.response_cascade.run(
+                messages,
+                lambda llm, msgs: self._invoke_llm("response_worker", llm, msgs),
+                knowledge=knowledge
+            )
+        else:
+            response = self._invoke_llm("response_worker", self.response_llm, messages)
         
-        return state
+        return {
+            "final_response": response.content,
+            "next_worker": "FINISH",
+            **self._debug_messages(response)
+        }
     
-    def escalation_worker_node(self, state: AgentState) -> AgentState:
+    def escalation_worker_node(self, state: AgentState) -> dict:
         """Escalation worker assesses if human intervention is needed"""
         query = state["query"]
         context = state.get("knowledge_retrieved", "")
@@ -182,34 +352,79 @@ class CustomerSupportOrchestrator:
             chat_history=chat_history
         )
         
-        response = self.llm.invoke([HumanMessage(content=prompt)])
+        response = self._invoke_llm("escalation_worker", self.escalation_llm, [HumanMessage(content=prompt)])
         
         # Check if escalation is needed
         escalation_needed = "escalation needed: yes" in response.content.lower()
         
-        state["escalation_needed"] = escalation_needed
-        state["messages"] = state.get("messages", []) + [response]
+        update = {"escalation_needed": escalation_needed, **self._debug_messages(response)}
         
         if escalation_needed:
-            state["final_response"] = (
+            update["final_response"] = (
                 "This query requires human assistance. A support agent will contact you shortly.\n\n"
                 f"Assessment: {response.content}"
+            ) + self._queue_escalation(
+                "assessment", query, state.get("session_id", ""), chat_history,
+                context=context, assessment=response.content
             )
-            state["next_worker"] = "FINISH"
+            update["next_worker"] = "FINISH"
         else:
-            state["next_worker"] = "response_worker"
+            update["next_worker"] = "response_worker"
         
-        return state
+        return update
+    
+    def _queue_escalation(self, source: str, query: str, session_id: str, chat_history: str,
+                          **fields) -> str:
+        """Queue the hand-off to a human; returns the reference line for the customer"""
+        if self.escalations is None:
+            return ""
+        try:
+            ticket_id = self.escalations.enqueue({
+                "source": source,
+                "query": query,
+                "session_id": session_id,
+                "chat_history": chat_history,
+                **fields
+            })
+        except sqlite3.Error as e:
+            print(f"Error queueing escalation: {e}")
+            return ""
+        self.escalation_workers.wake()
+        annotate(escalation_ticket=ticket_id)
+        return ESCALATION_REFERENCE_TEMPLATE.format(ticket_id=ticket_id)
+    
+    def _deliver_escalation(self, job: dict):
+        """Queue worker: write the ticket and send it to the agent desk"""
+        assessment = job.get("assessment")
+        if not assessment:  # pre-screened queries skipped the assessment on the request path
+            prompt = ESCALATION_WORKER_PROMPT.format(
+                query=job["query"],
+                context=job.get("context", ""),
+                chat_history=job.get("chat_history", "")
+            )
+            assessment = self._invoke_llm(
+                "escalation_handoff", self.escalation_llm, [HumanMessage(content=prompt)]
+            ).content
+        self.escalation_desk.notify(build_ticket(job, assessment))
+    
+    @staticmethod
+    def _instrumented(name: str, node):
+        """Wrap a graph node so its timing lands in the active request trace"""
+        def run(state: AgentState) -> dict:
+            note_node(name)
+            with node_span(name), profile_node(name):
+                return node(state)
+        return run
     
     def _build_graph(self):
         """Build the LangGraph workflow"""
         workflow = StateGraph(AgentState)
         
         # Add nodes
-        workflow.add_node("supervisor", self.supervisor_node)
-        workflow.add_node("knowledge_worker", self.knowledge_worker_node)
-        workflow.add_node("response_worker", self.response_worker_node)
-        workflow.add_node("escalation_worker", self.escalation_worker_node)
+        workflow.add_node("supervisor", self._instrumented("supervisor", self.supervisor_node))
+        workflow.add_node("knowledge_worker", self._instrumented("knowledge_worker", self.knowledge_worker_node))
+        workflow.add_node("response_worker", self._instrumented("response_worker", self.response_worker_node))
+        workflow.add_node("escalation_worker", self._instrumented("escalation_worker", self.escalation_worker_node))
         
         # Add edges
         workflow.set_entry_point("supervisor")
@@ -253,8 +468,115 @@ class CustomerSupportOrchestrator:
         # Compile the graph
         self.graph = workflow.compile()
     
-    def process_query(self, query: str, chat_history: str = "") -> dict:
-        """Process a customer query through the agent system"""
+    def get_stats(self) -> dict:
+        """Runtime metrics for the orchestrator's shared components"""
+        stats = {
+            "embedding_cache": self.embedding_cache.stats(),
+            "knowledge_index": self.knowledge_reloader.status(),
+            "supervisor": {
+                **self.supervisor_stats,
+                "avg_output_tokens": (
+                    self.supervisor_stats["output_tokens"] / self.supervisor_stats["decisions"]
+                    if self.supervisor_stats["decisions"] else 0.0
+                )
+            },
+            "knowledge_memo": self.knowledge_memo.stats(),
+            "llm_cache": self.llm_cache.stats() if self.llm_cache else {},
+            "tracing": self.tracer.stats() if self.tracer else {},
+            "tokens": self.token_meter.stats(),
+            "llm_batches": self.llm_batcher.stats() if self.llm_batcher else {},
+            "response_cascade": self.response_cascade.stats() if self.response_cascade else {},
+            "escalation_screen": self.escalation_screen.stats() if self.escalation_screen else {},
+            "escalation_queue": self.escalations.stats() if self.escalations else {},
+            "faq_fast_path": {
+                **self.faq_stats,
+                "questions": len(self.vector_store.faq) if self.vector_store else 0
+            }
+        }
+        backend_stats = getattr(self.embeddings.base, "stats", None)
+        if backend_stats:
+            try:
+                stats["embedding_service"] = backend_stats()
+            except Exception as e:
+                stats["embedding_service"] = {"error": str(e)}
+        return stats
+    
+    def _answer_from_faq(self, query: str):
+        """Return a stored FAQ answer if the query matches a canonical question"""
+        vector_store = self.vector_store
+        if not settings.faq_fast_path or vector_store is None or not len(vector_store.faq):
+            return None
+        
+        match = vector_store.faq.match(self.embeddings.embed_query_array(query))
+        hit = match is not None and match[1] >= settings.faq_match_threshold
+        with self._stats_lock:
+            self.faq_stats["hits" if hit else "misses"] += 1
+        if not hit:
+            return None
+        
+        entry, score = match
+        answer = entry["answer"]
+        if settings.faq_polish:
+            prompt = FAQ_POLISH_PROMPT.format(
+                question=entry["question"],
+                answer=answer,
+                query=query
+            )
+            answer = self._invoke_llm("faq_polish", self.response_llm, [HumanMessage(content=prompt)]).content
+        
+        return {
+            "response": answer,
+            "escalation_needed": False,
+            "knowledge_used": f"FAQ ({Path(entry['source']).name}, similarity {score:.2f}): {entry['question']}"
+        }
+    
+    def process_query(self, query: str, chat_history: str = "", profile: bool = False,
+                      session_id: str = "") -> dict:
+        """
+        Process a customer query through the agent system. ``profile`` runs it
+        under the profiler and adds the stored profile's id as "profile_id".
+        ``session_id`` is only passed on to escalation tickets.
+        """
+        if profile:
+            session = ProfileSession(label=query[:80])
+            with session.run():
+                result = self._measured_query(query, chat_history, session_id)
+            session.save()
+            return {**result, "profile_id": session.id}
+        return self._measured_query(query, chat_history, session_id)
+    
+    def _measured_query(self, query: str, chat_history: str, session_id: str) -> dict:
+        with self.token_meter.request():
+            if self.tracer is None:
+                return self._process_query(query, chat_history, session_id)
+            with self.tracer.capture(query, chat_history) as trace:
+                result = self._process_query(query, chat_history, session_id)
+                if trace is not None:
+                    trace.finish(result)
+                return result
+    
+    def _process_query(self, query: str, chat_history: str, session_id: str = "") -> dict:
+        # Unambiguous escalation triggers go straight to a human
+        screen = self.escalation_screen.screen(query) if self.escalation_screen else None
+        if screen is not None and screen.decision == ESCALATE:
+            annotate(path="prescreen", screen_rules=screen.rules)
+            note_path("prescreen")
+            return {
+                "response": ESCALATION_HANDOFF_TEMPLATE.format(
+                    rules=", ".join(screen.rules),
+                    query=query
+                ) + self._queue_escalation("prescreen", query, session_id, chat_history, rules=screen.rules),
+                "escalation_needed": True,
+                "knowledge_used": ""
+            }
+        
+        # Fast path: verbatim/near-verbatim FAQ questions skip the agent graph
+        faq_result = self._answer_from_faq(query)
+        if faq_result is not None:
+            annotate(path="faq")
+            note_path("faq")
+            return faq_result
+        
         initial_state = {
             "messages": [],
             "query": query,
@@ -262,7 +584,9 @@ class CustomerSupportOrchestrator:
             "next_worker": "",
             "knowledge_retrieved": "",
             "escalation_needed": False,
-            "final_response": ""
+            "final_response": "",
+            "screen_decision": screen.decision if screen is not None else "",
+            "session_id": session_id
         }
         
         # Run the graph
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Benchmark embedding backends: memory, startup time and per-query latency
+
+Each backend is measured in a fresh subprocess so RSS numbers aren't mixed.
+
+Usage: python bench_embeddings.py [--backends local onnx] [--queries 200]
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+QUERIES = [
+    "What is your return policy?",
+    "How long does shipping take?",
+    "Can I cancel my order?",
+    "Do you ship internationally?",
+    "How do I reset my password?",
+    "Is my payment information secure?",
+    "What payment methods do you accept?",
+    "My package arrived damaged, what should I do?",
+]
+
+
+def _rss_mb() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def measure(backend: str, n_queries: int) -> dict:
+    """Run inside the child process: load one backend and time it"""
+    from config import settings
+    settings.embedding_backend = backend
+    from embedding_backends import create_embeddings
+
+    rss_before = _rss_mb()
+    start = time.perf_counter()
+    embeddings = create_embeddings()
+    embeddings.embed_query("warm up")
+    startup = time.perf_counter() - start
+
+    latencies = []
+    vectors = {}
+    for i in range(n_queries):
+        query = QUERIES[i % len(QUERIES)]
+        t0 = time.perf_counter()
+        vectors[query] = embeddings.embed_query(query)
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+    latencies.sort()
+    return {
+        "backend": backend,
+        "rss_mb": round(_rss_mb() - rss_before, 1),
+        "startup_s": round(startup, 2),
+        "p50_ms": round(statistics.median(latencies), 2),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 2),
+        "vectors": vectors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--backends", nargs="+", default=["local", "onnx"])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(args.child, args.queries)))
+        return
+
+    results = []
+    for backend in args.backends:
+        out = subprocess.run(
+            [sys.executable, __file__, "--child", backend, "--queries", str(args.queries)],
+            capture_output=True, text=True, cwd=Path(__file__).parent
+        )
+        if out.returncode != 0:
+            print(f"{backend}: failed\n{out.stderr}")
+            continue
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    print(f"{'backend':<10}{'rss MB':>10}{'startup s':>12}{'p50 ms':>10}{'p95 ms':>10}")
+    for r in results:
+        print(f"{r['backend']:<10}{r['rss_mb']:>10}{r['startup_s']:>12}{r['p50_ms']:>10}{r['p95_ms']:>10}")
+
+    if len(results) > 1:
+        import numpy as np
+        base = results[0]
+        for other in results[1:]:
+            cosines = []
+            for query, vector in base["vectors"].items():
+                a = np.asarray(vector)
+                b = np.asarray(other["vectors"][query])
+                cosines.append(float(a @ b / (np.linalg.norm(a) * np.linalg.norm(b))))
+            print(f"cosine {base['backend']} vs {other['backend']}: "
+                  f"min {min(cosines):.4f}, mean {statistics.mean(cosines):.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Measure per-request allocations and peak memory of the agent graph state
+
+Runs the real LangGraph workflow with local stand-in LLMs (no API calls, no
+knowledge index) under tracemalloc, with and without DEBUG_MESSAGES.
+
+Usage: python bench_graph_state.py [--requests 200]
+"""
+import argparse
+import sys
+import tracemalloc
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from agents import CustomerSupportOrchestrator
+from config import settings
+
+ANSWER = "- **Relevant Information**: Items can be returned within 30 days. " * 20
+
+
+def make_orchestrator() -> CustomerSupportOrchestrator:
+    """Orchestrator with stand-in models and no knowledge base"""
+    settings.knowledge_path = str(Path(__file__).parent / "no-knowledge")  # no index
+    settings.node_cache_enabled = False  # measure the uncached path
+    settings.llm_cache_enabled = False
+    settings.llm_batching_enabled = False
+    settings.response_cascade_enabled = False
+    settings.trace_enabled = False
+    settings.escalation_queue_enabled = False
+    answer = FakeListChatModel(responses=[ANSWER])
+    return CustomerSupportOrchestrator(
+        models={
+            "supervisor": FakeListChatModel(responses=["knowledge_worker"]),
+            "knowledge": answer,
+            "response": answer,
+            "escalation": answer,
+        },
+        embeddings=DeterministicFakeEmbedding(size=384)
+    )
+
+
+def measure(debug_messages: bool, requests: int) -> dict:
+    settings.debug_messages = debug_messages
+    orchestrator = make_orchestrator()
+    state = {
+        "messages": [],
+        "query": "What is your return policy?",
+        "chat_history": "",
+        "next_worker": "",
+        "knowledge_retrieved": "",
+        "escalation_needed": False,
+        "final_response": "",
+        "screen_decision": ""
+    }
+    orchestrator.graph.invoke(dict(state))  # warm up
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    before = tracemalloc.take_snapshot()
+    peak = 0
+    for _ in range(requests):
+        tracemalloc.reset_peak()
+        final_state = orchestrator.graph.invoke(dict(state))
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    allocated = sum(
+        stat.size_diff for stat in after.compare_to(before, "filename") if stat.size_diff > 0
+    )
+    blocks = sum(
+        stat.count_diff for stat in after.compare_to(before, "filename") if stat.count_diff > 0
+    )
+    return {
+        "peak_kb": peak / 1024,
+        "retained_kb": allocated / 1024,
+        "retained_blocks": blocks,
+        "state_messages": len(final_state.get("messages", [])),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'mode':<10}{'peak KB/request':>18}{'retained KB':>14}{'retained blocks':>18}{'state messages':>17}")
+    for label, debug in (("compact", False), ("debug", True)):
+        r = measure(debug, args.requests)
+        print(f"{label:<10}{r['peak_kb']:>18.1f}{r['retained_kb']:>14.1f}{r['retained_blocks']:>18}{r['state_messages']:>17}")
+
+
+if __name__ == "__main__":
+    main()
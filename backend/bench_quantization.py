@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark int8 index quantisation against exact float32 search
+
+Reports recall@k (overlap with the exact top-k), bytes per vector and query
+latency for float32, int8 and int8 with exact re-ranking. Uses the published
+knowledge index when --index is given, otherwise synthetic clustered vectors
+shaped like MiniLM embeddings. Queries are perturbed copies of stored vectors.
+
+Usage: python bench_quantization.py [--index ./knowledge_index] [--vectors 100000] [--k 3]
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent))
+
+from knowledge_base import VectorIndex, _top_k  # noqa: E402
+from quantization import Int8Vectors  # noqa: E402
+
+
+def synthetic_vectors(n: int, dims: int, clusters: int, rng) -> np.ndarray:
+    centres = rng.standard_normal((clusters, dims)).astype(np.float32)
+    vectors = centres[rng.integers(0, clusters, n)] + 0.6 * rng.standard_normal((n, dims)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def load_index_vectors(root: Path) -> np.ndarray:
+    version = (root / "CURRENT").read_text().strip()
+    return np.load(root / version / "embeddings.npy")
+
+
+def run(name: str, search, queries: np.ndarray, truth: list, k: int) -> dict:
+    latencies, hits = [], 0
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        found = search(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits += len(set(found[:k].tolist()) & expected)
+    latencies.sort()
+    return {
+        "name": name,
+        "recall": hits / (k * len(queries)),
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--index", help="published index directory (default: synthetic vectors)")
+    parser.add_argument("--vectors", type=int, default=100_000)
+    parser.add_argument("--dims", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--rerank", type=int, nargs="+", default=[10, 20, 50])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    if args.index:
+        vectors = load_index_vectors(Path(args.index))
+    else:
+        vectors = synthetic_vectors(args.vectors, args.dims, max(1, args.vectors // 50), rng)
+    n, dims = vectors.shape
+    k = min(args.k, n)
+
+    picks = rng.integers(0, n, args.queries)
+    queries = vectors[picks] + 0.3 * rng.standard_normal((args.queries, dims)).astype(np.float32) / np.sqrt(dims)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    truth = [set(_top_k(vectors @ q, k).tolist()) for q in queries]
+
+    # The server's own search path, over vectors only (no chunks or embedder needed)
+    quantized = Int8Vectors.from_vectors(vectors)
+    index = VectorIndex(vectors, [], embeddings=None, quantized=quantized)
+
+    def reranked(rerank):
+        return lambda query: index._quantized_search(query, k, rerank)
+
+    results = [
+        {**run("float32", lambda q: _top_k(vectors @ q, k), queries, truth, k), "bytes": vectors.nbytes},
+        {**run("int8", reranked(0), queries, truth, k), "bytes": quantized.nbytes},
+    ]
+    for rerank in args.rerank:
+        # Re-ranking reads float32 rows from disk, so resident memory stays at the int8 size
+        results.append({**run(f"int8+rerank{rerank}", reranked(rerank), queries, truth, k),
+                        "bytes": quantized.nbytes})
+
+    print(f"{n} vectors x {dims} dims, {args.queries} queries, recall@{k} vs exact float32")
+    print(f"{'storage':<18}{'recall':>8}{'bytes/vec':>11}{'p50 ms':>9}{'p95 ms':>9}")
+    for r in results:
+        print(f"{r['name']:<18}{r['recall']:>8.3f}{r['bytes'] / n:>11.1f}{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Benchmark WebSocket frame formats for /ws replies
+
+Encodes a conversation of reply frames (the shape websocket_endpoint sends,
+with answers drawn from the knowledge files and long escalation assessments)
+as JSON text and MessagePack binary, each with and without permessage-deflate.
+Reports bytes on the wire per message (payload plus frame header) and CPU per
+message for serialisation, compression and decoding.
+
+Compression mirrors the websockets library's server defaults: 12 window
+bits, memLevel 5 and context takeover, so later messages in a conversation
+compress against earlier ones.
+
+Usage: python bench_ws_framing.py [--messages 200] [--escalation-share 0.2]
+"""
+import argparse
+import random
+import sys
+import time
+import zlib
+from datetime import datetime
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from config import settings  # noqa: E402
+from prompts import ESCALATION_HANDOFF_TEMPLATE  # noqa: E402
+from ws_codec import JSON, MSGPACK, FrameCodec, msgpack  # noqa: E402
+
+
+def knowledge_paragraphs() -> list:
+    paragraphs = []
+    for path in sorted(Path(settings.knowledge_path).glob("*.txt")):
+        paragraphs.extend(p.strip() for p in path.read_text(encoding="utf-8").split("\n\n") if len(p.strip()) > 80)
+    return paragraphs or ["Items can be returned within 30 days of delivery for a full refund. " * 4]
+
+
+def reply_frames(count: int, escalation_share: float, rng: random.Random) -> list:
+    """Reply frames of one conversation, as websocket_endpoint builds them"""
+    paragraphs = knowledge_paragraphs()
+    frames = []
+    message_id = 1
+    now = time.time()
+    for i in range(count):
+        query = rng.choice(paragraphs)[:rng.randint(30, 120)]
+        escalated = rng.random() < escalation_share
+        if escalated:
+            assessment = "\n".join(rng.sample(paragraphs, min(3, len(paragraphs))))
+            response = ESCALATION_HANDOFF_TEMPLATE.format(rules="refund_demand", query=query) + assessment
+        else:
+            response = "\n\n".join(rng.sample(paragraphs, rng.randint(1, min(3, len(paragraphs)))))
+        ts = now + i * 20
+        frames.append({
+            "response": response,
+            "escalation_needed": escalated,
+            "timestamp": datetime.fromtimestamp(ts).isoformat(),
+            "messages": [
+                {"id": message_id, "role": 0, "ts": round(ts, 3)},
+                {"id": message_id + 1, "role": 1, "ts": round(ts + 1.5, 3)},
+            ],
+        })
+        message_id += 2
+    return frames
+
+
+def header_bytes(payload: int) -> int:
+    """Unmasked (server to client) frame header size"""
+    return 2 if payload < 126 else 4 if payload < 65536 else 10
+
+
+def deflater():
+    compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -12, 5)
+
+    def deflate(data: bytes) -> bytes:
+        # permessage-deflate drops the trailing empty block of each sync flush
+        return (compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH))[:-4]
+    return deflate
+
+
+def measure(fmt: str, compressed: bool, frames: list, rounds: int) -> dict:
+    codec = FrameCodec(fmt)
+    encoded = [codec.encode(frame) for frame in frames]
+    payloads = [e.encode() if isinstance(e, str) else e for e in encoded]
+
+    compress_s = 0.0
+    if compressed:
+        deflate = deflater()
+        start = time.perf_counter()
+        wire = [deflate(p) for p in payloads]
+        compress_s = time.perf_counter() - start
+    else:
+        wire = payloads
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for frame in frames:
+            codec.encode(frame)
+    encode_s = (time.perf_counter() - start) / rounds
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for e in encoded:
+            codec.decode(e)
+    decode_s = (time.perf_counter() - start) / rounds
+
+    n = len(frames)
+    return {
+        "mode": fmt + ("+deflate" if compressed else ""),
+        "bytes": sum(len(w) + header_bytes(len(w)) for w in wire) / n,
+        "encode_us": encode_s / n * 1e6,
+        "compress_us": compress_s / n * 1e6,
+        "decode_us": decode_s / n * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=200, help="reply frames in the conversation")
+    parser.add_argument("--escalation-share", type=float, default=0.2)
+    parser.add_argument("--rounds", type=int, default=20, help="repetitions for the CPU timings")
+    args = parser.parse_args()
+
+    frames = reply_frames(args.messages, args.escalation_share, random.Random(0))
+    formats = [JSON] + ([MSGPACK] if msgpack is not None else [])
+    if msgpack is None:
+        print("msgpack is not installed; JSON only")
+
+    results = [measure(fmt, compressed, frames, args.rounds) for fmt in formats for compressed in (False, True)]
+    baseline = results[0]["bytes"]
+    print(f"{args.messages} reply frames, {args.escalation_share:.0%} escalations")
+    print(f"{'mode':<18}{'bytes/msg':>11}{'vs json':>9}{'encode us':>11}{'deflate us':>12}{'decode us':>11}")
+    for r in results:
+        print(f"{r['mode']:<18}{r['bytes']:>11.0f}{r['bytes'] / baseline:>9.2f}{r['encode_us']:>11.1f}"
+              f"{r['compress_us']:>12.1f}{r['decode_us']:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
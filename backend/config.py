@@ -1,2 +1,175 @@
+"""
+Application settings loaded from environment variables / .env
+"""
 import os
+from typing import Dict, Tuple
+from pydantic import PositiveFloat, PositiveInt
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+
+
+class Settings(BaseSettings):
+    """Backend configuration"""
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+
+    google_api_key: str = ""
+    knowledge_path: str = "../knowledge"
+
+    # Gemini model per graph node
+    supervisor_model: str = "gemini-2.5-flash"
+    knowledge_model: str = "gemini-2.5-flash"
+    response_model: str = "gemini-2.5-flash"
+    escalation_model: str = "gemini-2.5-flash"
+    llm_temperature: float = 0.7
+
+    # Response cascade: answer with the fast model first and re-run on
+    # response_model when the verifier rejects the answer
+    response_cascade_enabled: bool = False
+    response_fast_model: str = "gemini-2.5-flash-lite"
+    cascade_min_chars: int = 40
+    # USD per 1M (input, output) tokens, for per-tier cost reporting
+    model_prices: Dict[str, Tuple[float, float]] = {
+        "gemini-2.5-flash": (0.30, 2.50),
+        "gemini-2.5-flash-lite": (0.10, 0.40),
+    }
+
+    # Knowledge index: "auto" builds it if missing/stale, "readonly" only loads a
+    # prebuilt one (multi-worker mode), "rebuild" always rebuilds at startup
+    index_path: str = "./knowledge_index"
+    index_mode: str = "auto"
+    # Vector storage: "none" searches the float32 matrix, "int8" searches scalar
+    # quantised codes and re-ranks the best index_rerank candidates exactly
+    index_quantization: str = "none"
+    index_rerank: int = 20
+    # Seconds between checks for changed knowledge files (0 disables the watcher)
+    knowledge_watch_interval: float = 10.0
+
+    # Collapse near-duplicate chunks (MinHash estimated Jaccard >= threshold) at ingest
+    dedup_enabled: bool = True
+    dedup_threshold: float = 0.85
+
+    # FAQ fast path: answer directly when a query matches a canonical FAQ question
+    faq_fast_path: bool = True
+    faq_match_threshold: float = 0.88
+    faq_polish: bool = False
+
+    # Keep every LLM response message in the graph state (debugging only)
+    debug_messages: bool = False
+
+    # Output token cap for the supervisor's one-word routing answer
+    supervisor_max_tokens: int = 8
+
+    # Memoised knowledge_worker summaries (invalidated when the index version changes)
+    node_cache_enabled: bool = True
+    node_cache_size: int = 1024
+    node_cache_ttl: float = 3600.0
+
+    # Disk cache of exact-match LLM calls (replays, tests, backfills)
+    llm_cache_enabled: bool = False
+    llm_cache_path: str = "./data/llm_cache.db"
+    llm_cache_max_mb: int = 256
+    # Also cache calls with temperature > 0
+    llm_cache_force: bool = False
+
+    # Micro-batching of concurrent LLM calls per node through the client's batch
+    # method. Gemini's is LangChain's per-input invoke loop, so this caps
+    # concurrency per node but does not cut provider requests; keep it off
+    llm_batching_enabled: bool = False
+    llm_batch_window_ms: float = 5.0
+    llm_batch_max_size: int = 16
+    llm_batch_max_concurrency: int = 8
+    # Threads running dispatched batches
+    llm_batch_workers: int = 8
+
+    # Escalation pre-screen: lexical triggers checked before the agent graph
+    escalation_prescreen: bool = True
+    escalation_rules_path: str = ""
+    # Let queries with no sensitive wording skip the escalation worker even when
+    # the supervisor picks it (a keyword miss isn't proof, so off by default)
+    escalation_skip_benign: bool = False
+    # Hand escalations to background workers through a durable SQLite queue;
+    # tickets go to the webhook if set, otherwise to a local JSONL inbox
+    escalation_queue_enabled: bool = True
+    escalation_queue_path: str = "./data/escalations.db"
+    escalation_workers: int = 2
+    escalation_max_attempts: int = 5
+    # Retry delay after the first failure, doubling after each further one
+    escalation_retry_base: float = 2.0
+    escalation_lease_seconds: float = 120.0
+    escalation_webhook_url: str = ""
+    escalation_inbox_path: str = "./data/escalation_inbox.jsonl"
+
+    # Request scheduler: queries running through the agent graph at once
+    # (the rest wait in per-class, per-session queues)
+    scheduler_concurrency: int = 16
+    # Waiting requests allowed per priority class before new ones get 503 (0: unbounded)
+    scheduler_max_queue: int = 256
+
+    # /ws frames: MessagePack binary for clients offering the "msgpack" subprotocol,
+    # and permessage-deflate for clients offering it (used by `python main.py`;
+    # pass --ws-per-message-deflate to the uvicorn CLI)
+    ws_msgpack_enabled: bool = True
+    ws_per_message_deflate: bool = True
+
+    # Token-bucket limits on /query and /ws messages: sustained requests per
+    # second and burst size, per session ID and per client IP
+    rate_limit_enabled: bool = False
+    session_rate_limit: PositiveFloat = 0.5
+    session_rate_burst: PositiveInt = 5
+    ip_rate_limit: PositiveFloat = 5.0
+    ip_rate_burst: PositiveInt = 20
+    # Comma-separated proxy addresses/CIDRs whose X-Forwarded-For is trusted for
+    # the client IP; without it every request behind a proxy shares one bucket
+    trusted_proxies: str = ""
+    # Buckets idle for this many seconds are dropped
+    rate_limit_idle_ttl: float = 600.0
+
+    # Estimated prompt tokens per node above which a warning is logged
+    prompt_budgets: Dict[str, int] = {
+        "supervisor": 1500,
+        "knowledge_worker": 2500,
+        "response_worker": 3000,
+        "escalation_worker": 3000,
+        "faq_polish": 1000,
+    }
+
+    # Per-request trace capture (JSONL, size-rotated) for replay.py
+    trace_enabled: bool = False
+    trace_path: str = "./data/traces.jsonl"
+    trace_max_mb: float = 50.0
+    trace_backups: int = 5
+    trace_sample_rate: float = 1.0
+
+    # On-demand request profiles (pstats + JSON summary), newest profile_keep kept
+    profile_dir: str = "./data/profiles"
+    profile_keep: int = 50
+
+    # Token required in the X-Admin-Token header for /admin endpoints (empty disables them)
+    admin_token: str = ""
+
+    # Chat sessions: "memory" (single worker) or "sqlite" (shared by all workers)
+    session_store: str = "memory"
+    session_db_path: str = "./data/sessions.db"
+    # Default page size of GET /session/{id}
+    session_page_size: int = 50
+
+    # Embeddings: "local" runs the model in-process, "service" uses embedding_service.py,
+    # "onnx" runs the int8 ONNX export from onnx_embeddings.py
+    embedding_backend: str = "local"
+    embedding_model: str = "sentence-transformers/all-MiniLM-L6-v2"
+    embedding_service_address: str = "/tmp/support-embeddings.sock"
+    # Shared secret between the embedding service and its clients (required for "service")
+    embedding_service_authkey: str = ""
+    embedding_service_workers: int = 2
+    embedding_batch_window_ms: float = 5.0
+    embedding_max_batch: int = 64
+    onnx_model_dir: str = "./models/all-MiniLM-L6-v2-int8"
+    onnx_threads: int = 0
+    onnx_min_cosine: float = 0.98
+
+    # Query embedding cache (number of cached query vectors, 0 disables)
+    embedding_cache_size: int = 4096
+
+
+settings = Settings()
@@ -0,0 +1,113 @@
+"""
+Near-duplicate chunk elimination (MinHash + LSH)
+
+Boilerplate copied between knowledge files and the splitter's chunk overlap
+produce many near-identical chunks. Each chunk gets a MinHash signature over
+word shingles; LSH banding finds candidate pairs, and candidates whose
+estimated Jaccard similarity reaches the threshold are collapsed into the
+earliest chunk of the group. The surviving chunk lists every source it
+stands for in ``metadata["sources"]``.
+"""
+from collections import defaultdict
+from typing import List, Tuple
+import re
+import zlib
+
+import numpy as np
+
+from config import settings
+
+_WORD = re.compile(r"\w+")
+_SEED = 20240611
+
+
+def _shingles(text: str, size: int) -> np.ndarray:
+    words = _WORD.findall(text.lower())
+    if len(words) <= size:
+        grams = [" ".join(words)]
+    else:
+        grams = {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+    return np.fromiter((zlib.crc32(g.encode()) for g in grams), dtype=np.uint64, count=len(grams))
+
+
+def minhash_signatures(texts: List[str], num_perm: int = 64, shingle_size: int = 5) -> np.ndarray:
+    """(len(texts), num_perm) MinHash signatures using multiply-shift hashing"""
+    rng = np.random.default_rng(_SEED)
+    a = rng.integers(1, 2 ** 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+    b = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+    signatures = np.empty((len(texts), num_perm), dtype=np.uint64)
+    for i, text in enumerate(texts):
+        hashes = _shingles(text, shingle_size)
+        # uint64 arithmetic wraps, which is exactly the multiply-shift family
+        signatures[i] = ((hashes[:, None] * a + b) >> np.uint64(32)).min(axis=0)
+    return signatures
+
+
+def near_duplicate_groups(texts: List[str], threshold: float = settings.dedup_threshold,
+                          num_perm: int = 64, bands: int = 16) -> List[List[int]]:
+    """Groups (size > 1) of near-duplicate text indices, earliest index first"""
+    if len(texts) < 2:
+        return []
+    signatures = minhash_signatures(texts, num_perm)
+    rows = num_perm // bands
+    buckets = defaultdict(list)
+    for i, signature in enumerate(signatures):
+        for band in range(bands):
+            buckets[(band, signature[band * rows:(band + 1) * rows].tobytes())].append(i)
+
+    candidates = defaultdict(set)
+    for members in buckets.values():
+        for i in members:
+            candidates[i].update(j for j in members if j > i)
+
+    assigned = set()
+    groups = []
+    for i in range(len(texts)):
+        if i in assigned or not candidates[i]:
+            continue
+        group = [i]
+        for j in sorted(candidates[i]):
+            if j not in assigned and np.mean(signatures[i] == signatures[j]) >= threshold:
+                group.append(j)
+        if len(group) > 1:
+            assigned.update(group)
+            groups.append(group)
+    return groups
+
+
+def chunk_sources(chunk: dict) -> List[str]:
+    """All knowledge files a (possibly collapsed) chunk stands for"""
+    return chunk["metadata"].get("sources") or [chunk["metadata"]["source"]]
+
+
+def collapse_duplicates(chunks: List[dict], threshold: float = settings.dedup_threshold
+                        ) -> Tuple[List[dict], dict]:
+    """
+    Drop near-duplicate chunks (``{"id", "text", "metadata"}`` dicts), keeping
+    the earliest of each group with the merged source list. Returns the
+    surviving chunks in their original order and a size report.
+    """
+    groups = near_duplicate_groups([chunk["text"] for chunk in chunks], threshold)
+    dropped = set()
+    merged = {}
+    for group in groups:
+        canonical = chunks[group[0]]
+        sources, duplicate_ids = [], list(canonical["metadata"].get("duplicate_ids", []))
+        for i in group:
+            sources.extend(s for s in chunk_sources(chunks[i]) if s not in sources)
+        for i in group[1:]:
+            duplicate_ids.append(chunks[i]["id"])
+            dropped.add(i)
+        merged[group[0]] = {
+            **canonical,
+            "metadata": {**canonical["metadata"], "sources": sources, "duplicate_ids": duplicate_ids},
+        }
+
+    survivors = [merged.get(i, chunk) for i, chunk in enumerate(chunks) if i not in dropped]
+    report = {
+        "chunks_before": len(chunks),
+        "chunks_after": len(survivors),
+        "removed": len(dropped),
+        "text_bytes_saved": sum(len(chunks[i]["text"].encode()) for i in dropped),
+    }
+    return survivors, report
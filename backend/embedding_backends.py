@@ -0,0 +1,25 @@
+"""
+Factory for the embeddings backend selected in settings
+"""
+from langchain_core.embeddings import Embeddings
+
+from config import settings
+
+
+def create_embeddings() -> Embeddings:
+    """Build the base (uncached) embeddings for ``settings.embedding_backend``"""
+    backend = settings.embedding_backend.lower()
+
+    if backend == "local":
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+        return HuggingFaceEmbeddings(model_name=settings.embedding_model)
+
+    if backend == "service":
+        from embedding_service import EmbeddingServiceClient
+        return EmbeddingServiceClient(settings.embedding_service_address)
+
+    if backend == "onnx":
+        from onnx_embeddings import OnnxEmbeddings
+        return OnnxEmbeddings(settings.onnx_model_dir)
+
+    raise ValueError(f"Unknown embedding backend: {settings.embedding_backend}")
@@ -0,0 +1,104 @@
+"""
+LRU cache of query embeddings shared by every component that embeds queries
+"""
+from collections import OrderedDict
+from threading import Lock
+from typing import List, Optional
+import re
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(text: str) -> str:
+    """Normalise query text so trivially different phrasings share a cache entry"""
+    return _WHITESPACE.sub(" ", text.strip().lower())
+
+
+class QueryEmbeddingCache:
+    """Bounded LRU of query vectors stored in a single preallocated float32 matrix"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._slots: "OrderedDict[str, int]" = OrderedDict()
+        self._free: List[int] = []
+        self._matrix: Optional[np.ndarray] = None
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        """Return a copy of the cached vector for ``text`` or None"""
+        key = normalize_query(text)
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is None:
+                self.misses += 1
+                return None
+            self._slots.move_to_end(key)
+            self.hits += 1
+            return self._matrix[slot].copy()
+
+    def put(self, text: str, vector) -> None:
+        """Store ``vector`` for ``text``, evicting the least recently used entry if full"""
+        if self.max_size <= 0:
+            return
+        key = normalize_query(text)
+        vector = np.asarray(vector, dtype=np.float32)
+        with self._lock:
+            if self._matrix is None:
+                self._matrix = np.zeros((self.max_size, vector.shape[0]), dtype=np.float32)
+                self._free = list(range(self.max_size - 1, -1, -1))
+            slot = self._slots.get(key)
+            if slot is None:
+                if not self._free:
+                    _, evicted = self._slots.popitem(last=False)
+                    self._free.append(evicted)
+                    self.evictions += 1
+                slot = self._free.pop()
+            self._slots[key] = slot
+            self._slots.move_to_end(key)
+            self._matrix[slot] = vector
+
+    def clear(self) -> None:
+        with self._lock:
+            self._slots.clear()
+            self._free = list(range(self.max_size - 1, -1, -1)) if self._matrix is not None else []
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._slots),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "bytes": self._matrix.nbytes if self._matrix is not None else 0,
+        }
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that serves ``embed_query`` from a QueryEmbeddingCache"""
+
+    def __init__(self, base: Embeddings, cache: QueryEmbeddingCache):
+        self.base = base
+        self.cache = cache
+
+    def embed_query_array(self, text: str) -> np.ndarray:
+        """Embed a query as a float32 array, using the cache when possible"""
+        vector = self.cache.get(text)
+        if vector is None:
+            vector = np.asarray(self.base.embed_query(text), dtype=np.float32)
+            self.cache.put(text, vector)
+        return vector
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_query_array(text).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.base.embed_documents(texts)
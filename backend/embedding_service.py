@@ -0,0 +1,257 @@
+"""
+Standalone embedding service
+
+Runs the sentence-transformers model in a process pool outside the API
+workers. API processes talk to it over a local socket; concurrent requests
+are micro-batched into single forward passes.
+
+Start it before the API:  python embedding_service.py
+Server and clients authenticate with EMBEDDING_SERVICE_AUTHKEY, which must be
+set (the connection carries pickled objects).
+"""
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing.connection import Client, Listener
+from typing import List
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from config import settings
+
+
+def _authkey() -> bytes:
+    if not settings.embedding_service_authkey:
+        raise RuntimeError("Set EMBEDDING_SERVICE_AUTHKEY to use the embedding service")
+    return settings.embedding_service_authkey.encode()
+
+
+# ---------------------------------------------------------------------------
+# Model worker processes
+# ---------------------------------------------------------------------------
+
+_model = None
+
+
+def _init_worker(model_name: str):
+    global _model
+    from sentence_transformers import SentenceTransformer
+    _model = SentenceTransformer(model_name)
+
+
+def _encode(texts: List[str], batch_size: int) -> np.ndarray:
+    """Encode ``texts`` in forward passes of at most ``batch_size``, however many a request sends"""
+    return np.asarray(_model.encode(texts, batch_size=batch_size), dtype=np.float32)
+
+
+# ---------------------------------------------------------------------------
+# Server
+# ---------------------------------------------------------------------------
+
+class _Pending:
+    __slots__ = ("texts", "enqueued_at", "future")
+
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.enqueued_at = time.perf_counter()
+        self.future: Future = Future()
+
+
+class EmbeddingService:
+    """Accepts embedding requests on a local socket and micro-batches them"""
+
+    def __init__(
+        self,
+        address: str = settings.embedding_service_address,
+        model_name: str = settings.embedding_model,
+        workers: int = settings.embedding_service_workers,
+        batch_window_ms: float = settings.embedding_batch_window_ms,
+        max_batch: int = settings.embedding_max_batch
+    ):
+        self.address = address
+        self.batch_window = batch_window_ms / 1000
+        self.max_batch = max_batch
+        self.model_name = model_name
+        self.workers = workers
+        self.pool = self._new_pool()
+        self.pool_restarts = 0
+        self._pool_broken = False
+        self._queue: "queue.Queue[_Pending]" = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self.batches = 0
+        self.texts = 0
+        self.max_batch_seen = 0
+        self.queue_time_total = 0.0
+        self.queue_time_max = 0.0
+        self.requests = 0
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(self.model_name,)
+        )
+
+    def _restart_pool(self):
+        """Replace a broken pool (e.g. a model worker was OOM-killed)"""
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        self.pool = self._new_pool()
+        self.pool_restarts += 1
+        self._pool_broken = False
+
+    def _collect_batch(self) -> List[_Pending]:
+        """Block for the first request, then gather more until the window closes"""
+        batch = [self._queue.get()]
+        size = len(batch[0].texts)
+        deadline = time.perf_counter() + self.batch_window
+        while size < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                pending = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(pending)
+            size += len(pending.texts)
+        return batch
+
+    def _batch_loop(self):
+        while True:
+            batch = self._collect_batch()
+            dispatched_at = time.perf_counter()
+            texts = [text for pending in batch for text in pending.texts]
+
+            with self._stats_lock:
+                self.batches += 1
+                self.texts += len(texts)
+                self.requests += len(batch)
+                self.max_batch_seen = max(self.max_batch_seen, len(texts))
+                for pending in batch:
+                    waited = dispatched_at - pending.enqueued_at
+                    self.queue_time_total += waited
+                    self.queue_time_max = max(self.queue_time_max, waited)
+
+            if self._pool_broken:  # a worker died during the previous batch
+                self._restart_pool()
+            try:
+                future = self.pool.submit(_encode, texts, self.max_batch)
+            except (BrokenProcessPool, RuntimeError) as e:
+                # Fail this batch rather than leave its clients waiting, then start fresh workers
+                print(f"Embedding worker pool unusable ({e}), restarting it")
+                for pending in batch:
+                    pending.future.set_exception(e)
+                self._restart_pool()
+                continue
+            future.add_done_callback(lambda done, batch=batch: self._fan_out(batch, done))
+
+    def _fan_out(self, batch: List[_Pending], done: Future):
+        try:
+            vectors = done.result()
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                self._pool_broken = True
+            for pending in batch:
+                pending.future.set_exception(e)
+            return
+        offset = 0
+        for pending in batch:
+            pending.future.set_result(vectors[offset:offset + len(pending.texts)])
+            offset += len(pending.texts)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "requests": self.requests,
+                "batches": self.batches,
+                "texts": self.texts,
+                "avg_batch_size": self.texts / self.batches if self.batches else 0.0,
+                "max_batch_size": self.max_batch_seen,
+                "avg_queue_ms": 1000 * self.queue_time_total / self.requests if self.requests else 0.0,
+                "max_queue_ms": 1000 * self.queue_time_max,
+                "queue_depth": self._queue.qsize(),
+                "pool_restarts": self.pool_restarts,
+            }
+
+    def _handle_connection(self, conn):
+        try:
+            while True:
+                request = conn.recv()
+                if request.get("op") == "stats":
+                    conn.send({"stats": self.stats()})
+                    continue
+                pending = _Pending(request["texts"])
+                self._queue.put(pending)
+                try:
+                    conn.send({"embeddings": pending.future.result()})
+                except Exception as e:
+                    conn.send({"error": str(e)})
+        except (EOFError, ConnectionResetError):
+            pass
+        finally:
+            conn.close()
+
+    def serve_forever(self):
+        """Accept client connections until interrupted"""
+        authkey = _authkey()
+        threading.Thread(target=self._batch_loop, daemon=True).start()
+        if os.path.exists(self.address):
+            os.unlink(self.address)  # stale socket from a previous run
+        with Listener(self.address, authkey=authkey) as listener:
+            print(f"Embedding service listening on {self.address}")
+            while True:
+                conn = listener.accept()
+                threading.Thread(target=self._handle_connection, args=(conn,), daemon=True).start()
+
+
+# ---------------------------------------------------------------------------
+# Client
+# ---------------------------------------------------------------------------
+
+class EmbeddingServiceClient(Embeddings):
+    """LangChain embeddings that delegate to a running EmbeddingService"""
+
+    def __init__(self, address: str = settings.embedding_service_address):
+        self.address = address
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = Client(self.address, authkey=_authkey())
+            self._local.conn = conn
+        return conn
+
+    def _request(self, request: dict) -> dict:
+        try:
+            conn = self._connection()
+            conn.send(request)
+            reply = conn.recv()
+        except (EOFError, OSError):
+            # Service restarted: reconnect once
+            self._local.conn = None
+            conn = self._connection()
+            conn.send(request)
+            reply = conn.recv()
+        if "error" in reply:
+            raise RuntimeError(f"Embedding service error: {reply['error']}")
+        return reply
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return self._request({"op": "embed", "texts": list(texts)})["embeddings"].tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._request({"op": "embed", "texts": [text]})["embeddings"][0].tolist()
+
+    def stats(self) -> dict:
+        return self._request({"op": "stats"})["stats"]
+
+
+if __name__ == "__main__":
+    EmbeddingService().serve_forever()
@@ -0,0 +1,264 @@
+"""
+Durable escalation hand-off queue
+
+Escalations are written to a local SQLite queue instead of being handled on
+the customer's request. Background worker threads claim them, write the
+ticket (running the escalation assessment first for pre-screened queries,
+which skip it on the request path) and deliver it to the agent desk:
+``ESCALATION_WEBHOOK_URL`` if set, otherwise a local JSONL inbox. Failed
+deliveries are retried with exponential backoff; jobs that keep failing are
+parked as ``dead``.
+
+Claims hold a lease, so jobs of a worker that dies mid-flight are picked up
+again, and every uvicorn process can run workers against the same file.
+"""
+from collections import deque
+from pathlib import Path
+from threading import Event, Lock, Thread, local
+from typing import Callable, List, Optional
+import json
+import re
+import sqlite3
+import time
+import urllib.request
+
+from config import settings
+
+PENDING = "pending"
+PROCESSING = "processing"
+DONE = "done"
+DEAD = "dead"
+STATUSES = (PENDING, PROCESSING, DONE, DEAD)
+
+_PRIORITY = re.compile(r"priority level\W*(high|medium|low)", re.IGNORECASE)
+
+
+def build_ticket(job: dict, assessment: str) -> dict:
+    """Ticket handed to the agent desk for a claimed job"""
+    priority = _PRIORITY.search(assessment)
+    return {
+        "ticket_id": job["id"],
+        "session_id": job.get("session_id", ""),
+        "created_at": job["created_at"],
+        "source": job.get("source", ""),
+        "priority": priority.group(1).lower() if priority else "high",
+        "query": job["query"],
+        "assessment": assessment,
+        "triggers": job.get("rules", []),
+        "chat_history": job.get("chat_history", ""),
+    }
+
+
+class EscalationQueue:
+    """SQLite-backed queue of escalation jobs with leases and retries"""
+
+    def __init__(self, path: str = settings.escalation_queue_path,
+                 max_attempts: int = settings.escalation_max_attempts,
+                 retry_base: float = settings.escalation_retry_base,
+                 lease_seconds: float = settings.escalation_lease_seconds):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.lease_seconds = lease_seconds
+        self._local = local()
+        self._lock = Lock()
+        self._finished = deque(maxlen=1000)  # (finished_at, seconds from enqueue to delivery)
+        self._counts = {"enqueued": 0, "delivered": 0, "retries": 0, "dead": 0}
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS escalations ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " created_at REAL NOT NULL,"
+                " payload TEXT NOT NULL,"
+                " status TEXT NOT NULL,"
+                " attempts INTEGER NOT NULL DEFAULT 0,"
+                " available_at REAL NOT NULL,"
+                " last_error TEXT,"
+                " finished_at REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_escalations_due ON escalations (status, available_at)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def enqueue(self, payload: dict) -> int:
+        """Persist a job; returns its ID (the customer-facing reference)"""
+        now = time.time()
+        cursor = self._conn().execute(
+            "INSERT INTO escalations (created_at, payload, status, available_at) VALUES (?, ?, ?, ?)",
+            (now, json.dumps(payload, ensure_ascii=False), PENDING, now)
+        )
+        with self._lock:
+            self._counts["enqueued"] += 1
+        return cursor.lastrowid
+
+    def claim(self) -> Optional[dict]:
+        """Lease the oldest due job (pending, or processing with an expired lease)"""
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT id, created_at, payload, attempts FROM escalations"
+                " WHERE status IN (?, ?) AND available_at <= ? ORDER BY id LIMIT 1",
+                (PENDING, PROCESSING, now)
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE escalations SET status = ?, attempts = attempts + 1, available_at = ? WHERE id = ?",
+                    (PROCESSING, now + self.lease_seconds, row[0])
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        if row is None:
+            return None
+        job_id, created_at, payload, attempts = row
+        return {"id": job_id, "created_at": created_at, "attempts": attempts + 1, **json.loads(payload)}
+
+    def complete(self, job: dict):
+        now = time.time()
+        self._conn().execute(
+            "UPDATE escalations SET status = ?, finished_at = ?, last_error = NULL WHERE id = ?",
+            (DONE, now, job["id"])
+        )
+        with self._lock:
+            self._counts["delivered"] += 1
+            self._finished.append((now, now - job["created_at"]))
+
+    def fail(self, job: dict, error: str):
+        """Schedule a retry with exponential backoff, or park the job once attempts run out"""
+        now = time.time()
+        if job["attempts"] >= self.max_attempts:
+            self._conn().execute(
+                "UPDATE escalations SET status = ?, finished_at = ?, last_error = ? WHERE id = ?",
+                (DEAD, now, error, job["id"])
+            )
+            with self._lock:
+                self._counts["dead"] += 1
+            print(f"Escalation #{job['id']} failed {job['attempts']} times, giving up: {error}")
+            return
+        delay = self.retry_base * 2 ** (job["attempts"] - 1)
+        self._conn().execute(
+            "UPDATE escalations SET status = ?, available_at = ?, last_error = ? WHERE id = ?",
+            (PENDING, now + delay, error, job["id"])
+        )
+        with self._lock:
+            self._counts["retries"] += 1
+
+    def jobs(self, status: str, limit: int = 50) -> List[dict]:
+        """Most recent jobs with the given status"""
+        rows = self._conn().execute(
+            "SELECT id, created_at, payload, attempts, last_error, finished_at FROM escalations"
+            " WHERE status = ? ORDER BY id DESC LIMIT ?",
+            (status, limit)
+        ).fetchall()
+        return [
+            {"id": job_id, "created_at": created_at, "attempts": attempts, "last_error": error,
+             "finished_at": finished_at, "payload": json.loads(payload)}
+            for job_id, created_at, payload, attempts, error, finished_at in rows
+        ]
+
+    def stats(self) -> dict:
+        """Backlog, lag of the oldest waiting job and recent delivery throughput"""
+        conn = self._conn()
+        now = time.time()
+        counts = dict(conn.execute("SELECT status, COUNT(*) FROM escalations GROUP BY status").fetchall())
+        oldest = conn.execute(
+            "SELECT MIN(created_at) FROM escalations WHERE status IN (?, ?)", (PENDING, PROCESSING)
+        ).fetchone()[0]
+        with self._lock:
+            recent = [latency for finished_at, latency in self._finished if now - finished_at <= 60]
+            totals = dict(self._counts)
+        return {
+            **{status: counts.get(status, 0) for status in STATUSES},
+            "lag_seconds": round(now - oldest, 3) if oldest is not None else 0.0,
+            "delivered_last_minute": len(recent),
+            "avg_handoff_seconds": round(sum(recent) / len(recent), 3) if recent else 0.0,
+            "max_handoff_seconds": round(max(recent), 3) if recent else 0.0,
+            # this process only
+            "totals": totals,
+        }
+
+
+class DeskNotifier:
+    """Delivers tickets to the agent desk webhook, or a local JSONL inbox"""
+
+    def __init__(self, webhook_url: str = settings.escalation_webhook_url,
+                 inbox_path: str = settings.escalation_inbox_path, timeout: float = 10.0):
+        self.webhook_url = webhook_url
+        self.inbox_path = inbox_path
+        self.timeout = timeout
+        self._lock = Lock()
+
+    def notify(self, ticket: dict):
+        body = json.dumps(ticket, ensure_ascii=False)
+        if self.webhook_url:
+            request = urllib.request.Request(
+                self.webhook_url, data=body.encode(), headers={"Content-Type": "application/json"}
+            )
+            with urllib.request.urlopen(request, timeout=self.timeout):
+                return
+        Path(self.inbox_path).parent.mkdir(parents=True, exist_ok=True)
+        with self._lock, open(self.inbox_path, "a", encoding="utf-8") as f:
+            f.write(body + "\n")
+
+
+class EscalationWorkers:
+    """Background threads that drain the queue through ``handler(job)``"""
+
+    def __init__(self, queue: EscalationQueue, handler: Callable[[dict], None],
+                 workers: int = settings.escalation_workers, poll_interval: float = 0.5):
+        self.queue = queue
+        self.handler = handler
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._wake = Event()
+        self._stop = Event()
+        self._threads: List[Thread] = []
+
+    def start(self):
+        if self._threads:
+            return
+        for i in range(self.workers):
+            thread = Thread(target=self._run, name=f"escalation-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def wake(self):
+        """Skip the poll wait after a local enqueue"""
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                job = self.queue.claim()
+            except sqlite3.Error as e:
+                print(f"Escalation queue unavailable: {e}")
+                job = None
+            if job is None:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+                continue
+            try:
+                self.handler(job)
+            except Exception as e:
+                self.queue.fail(job, f"{type(e).__name__}: {e}")
+            else:
+                self.queue.complete(job)
@@ -0,0 +1,128 @@
+"""
+Lexical pre-screen for escalation triggers
+
+Runs before the agent graph. All rules are compiled into one alternation
+regex, so a query is scanned once regardless of the number of rules.
+
+Rule actions:
+  escalate - unambiguous high-priority trigger, hand off to a human directly
+  review   - sensitive wording, let the supervisor/escalation worker decide
+A query that hits no escalate/review rule is screened benign; with
+ESCALATION_SKIP_BENIGN it may then skip the escalation worker. Rules are
+tried in order at each position, so keep escalate rules before review rules.
+
+Custom rules can be loaded from a JSON file (ESCALATION_RULES_PATH):
+    [{"name": "chargeback", "pattern": "\\bi will (file|start) a chargeback\\b", "action": "escalate"}]
+"""
+from collections import Counter
+from threading import Lock
+from typing import List, NamedTuple, Optional
+import json
+import re
+
+from config import settings
+
+ESCALATE = "escalate"
+REVIEW = "review"
+BENIGN = "benign"
+
+DEFAULT_RULES = [
+    # Escalate rules need threat/demand phrasing; bare topic words ("fraud",
+    # "court", "chargeback") are only reviewed, since questions use them too
+    # Legal issues
+    {"name": "legal_action", "action": ESCALATE,
+     "pattern": r"\b((i|we)('m| am|'re| are|'ll| will)( going to| gonna)? (sue|suing|take you to court)"
+                r"|my (lawyer|attorney)|(see|take) you (in|to) court|(file|filing) a lawsuit"
+                r"|legal action against|small claims)\b"},
+    {"name": "regulator", "action": ESCALATE,
+     "pattern": r"\b(report(ing)?|complain(ing)?|(file|filing) a complaint) (you |this )?(to|with) (the )?"
+                r"(consumer protection|ombudsman|better business bureau|bbb|data protection authority)\b"},
+    # Security concerns
+    {"name": "account_compromise", "action": ESCALATE,
+     "pattern": r"\b(my account (was |has been |got )?(hacked|compromised|taken over)|i('ve| have)? been hacked"
+                r"|someone (logged|got) into my account|(my )?identity (was |has been )?stolen)\b"},
+    {"name": "fraud", "action": ESCALATE,
+     "pattern": r"\b((unauthori[sz]ed|fraudulent) (charge|transaction|purchase)s? on my"
+                r"|my (card|credit card) (was |has been |got )?stolen|someone (used|charged) my card)\b"},
+    # Explicit refund demands and complaints
+    {"name": "refund_demand", "action": ESCALATE,
+     "pattern": r"\b(i (want|demand|need) (a |my )?(full )?refund|give me (a |my )?refund|refund me"
+                r"|i('ll| will)( be)? (file|filing|start|do) a chargeback)\b"},
+    {"name": "human_request", "action": ESCALATE,
+     "pattern": r"\b(speak|talk) (to|with) (a |an )?(human|person|manager|supervisor|real agent)\b"},
+    # Sensitive wording the LLM should still assess
+    {"name": "legal_mention", "action": REVIEW,
+     "pattern": r"\b(lawyer|attorney|lawsuit|sue|suing|legal|courts?|regulator|ombudsman|bbb|gdpr)\b"},
+    {"name": "security_mention", "action": REVIEW,
+     "pattern": r"\b(fraud|fraudulent|scam|hacked|compromised|unauthori[sz]ed|stolen|identity theft|chargebacks?)\b"},
+    {"name": "complaint", "action": REVIEW,
+     "pattern": r"\b(complain|complaint|unacceptable|terrible|worst|furious|angry|ridiculous|disappointed)\b"},
+    {"name": "refund_mention", "action": REVIEW,
+     "pattern": r"\b(refund|money back|reimburse)"},
+    {"name": "order_problem", "action": REVIEW,
+     "pattern": r"\b(damaged|broken|defective|never (arrived|received)|missing|wrong item|charged twice|double charged)\b"},
+    {"name": "account_problem", "action": REVIEW,
+     "pattern": r"\b(locked out|can'?t (log ?in|access)|delete my (account|data)|close my account)\b"},
+]
+
+
+class ScreenResult(NamedTuple):
+    decision: str
+    rules: List[str]
+
+
+class EscalationScreen:
+    """Compiled multi-pattern matcher with per-rule hit counters"""
+
+    def __init__(self, rules: Optional[List[dict]] = None):
+        self.rules = rules if rules is not None else DEFAULT_RULES
+        self._actions = {}
+        groups = []
+        for i, rule in enumerate(self.rules):
+            if rule["action"] not in (ESCALATE, REVIEW):
+                raise ValueError(f"Rule {rule['name']}: unknown action {rule['action']}")
+            group = f"r{i}"
+            self._actions[group] = rule
+            re.compile(rule["pattern"])  # report bad patterns per rule
+            groups.append(f"(?P<{group}>{rule['pattern']})")
+        self._regex = re.compile("|".join(groups), re.IGNORECASE) if groups else None
+        self._lock = Lock()
+        self.rule_hits: Counter = Counter()
+        self.decisions: Counter = Counter()
+
+    @classmethod
+    def from_settings(cls) -> "EscalationScreen":
+        if settings.escalation_rules_path:
+            with open(settings.escalation_rules_path) as f:
+                return cls(json.load(f))
+        return cls()
+
+    def screen(self, query: str, record: bool = True) -> ScreenResult:
+        """Classify ``query`` as escalate, review or benign (``record=False`` skips the counters)"""
+        matched = {}
+        if self._regex is not None:
+            for match in self._regex.finditer(query):
+                rule = self._actions[match.lastgroup]
+                matched[rule["name"]] = rule["action"]
+
+        actions = set(matched.values())
+        if ESCALATE in actions:
+            decision = ESCALATE
+        elif REVIEW in actions:
+            decision = REVIEW
+        else:
+            decision = BENIGN
+
+        if not record:
+            return ScreenResult(decision, list(matched))
+        with self._lock:
+            self.rule_hits.update(list(matched))
+            self.decisions[decision] += 1
+        return ScreenResult(decision, list(matched))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "decisions": dict(self.decisions),
+                "rule_hits": {rule["name"]: self.rule_hits[rule["name"]] for rule in self.rules},
+            }
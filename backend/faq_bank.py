@@ -0,0 +1,102 @@
+"""
+Question bank built from Q:/A: structured knowledge files
+
+Each canonical question is embedded at ingest time. At query time a
+high-similarity match returns the stored answer directly instead of running
+the agent graph.
+"""
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+import json
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+def parse_qa_pairs(text: str) -> List[Tuple[str, str]]:
+    """Extract (question, answer) pairs from ``Q:``/``A:`` formatted text"""
+    pairs = []
+    question, answer = None, None
+    for line in text.splitlines():
+        stripped = line.strip()
+        if stripped.startswith("Q:"):
+            if question and answer:
+                pairs.append((question, answer))
+            question, answer = stripped[2:].strip(), None
+        elif stripped.startswith("A:") and question:
+            answer = stripped[2:].strip()
+        elif stripped and answer is not None:
+            answer += " " + stripped  # answer continues on the next line
+        elif not stripped and answer is not None:
+            pairs.append((question, answer))
+            question, answer = None, None
+    if question and answer:
+        pairs.append((question, answer))
+    return pairs
+
+
+class FAQBank:
+    """Canonical questions, their answers and normalised question embeddings"""
+
+    def __init__(self, entries: List[dict], vectors: np.ndarray):
+        self.entries = entries
+        self.vectors = vectors
+
+    @classmethod
+    def empty(cls) -> "FAQBank":
+        return cls([], np.zeros((0, 0), dtype=np.float32))
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @classmethod
+    def from_files(cls, paths: Iterable[str], embeddings: Embeddings) -> "FAQBank":
+        entries = []
+        for path in paths:
+            for question, answer in parse_qa_pairs(Path(path).read_text()):
+                entries.append({"question": question, "answer": answer, "source": str(path)})
+        if not entries:
+            return cls.empty()
+        vectors = np.asarray(
+            embeddings.embed_documents([e["question"] for e in entries]), dtype=np.float32
+        )
+        vectors /= np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+        return cls(entries, vectors)
+
+    def without_sources(self, sources: Iterable[str]) -> "FAQBank":
+        """Copy of the bank with entries from ``sources`` removed"""
+        drop = set(sources)
+        keep = [i for i, e in enumerate(self.entries) if e["source"] not in drop]
+        return FAQBank([self.entries[i] for i in keep], np.asarray(self.vectors[keep]))
+
+    def extend(self, other: "FAQBank") -> "FAQBank":
+        if not len(other):
+            return self
+        if not len(self):
+            return other
+        return FAQBank(self.entries + other.entries, np.concatenate([self.vectors, other.vectors]))
+
+    def match(self, query_vector) -> Optional[Tuple[dict, float]]:
+        """Best matching entry and its cosine similarity"""
+        if not self.entries:
+            return None
+        query_vector = np.asarray(query_vector, dtype=np.float32)
+        scores = self.vectors @ (query_vector / max(float(np.linalg.norm(query_vector)), 1e-12))
+        best = int(np.argmax(scores))
+        return self.entries[best], float(scores[best])
+
+    def save(self, path: Path):
+        if not self.entries:
+            return
+        np.save(path / "faq_embeddings.npy", np.ascontiguousarray(self.vectors))
+        with open(path / "faq.jsonl", "w") as f:
+            for entry in self.entries:
+                f.write(json.dumps(entry) + "\n")
+
+    @classmethod
+    def load(cls, path: Path) -> "FAQBank":
+        if not (path / "faq.jsonl").exists():
+            return cls.empty()
+        with open(path / "faq.jsonl") as f:
+            entries = [json.loads(line) for line in f]
+        return cls(entries, np.load(path / "faq_embeddings.npy", mmap_mode="r"))
@@ -0,0 +1,109 @@
+"""
+Offline parallel ingestion
+
+Builds the knowledge index without starting the server. Files are loaded and
+split in a process pool, near-duplicate chunks are collapsed (dedup.py), then
+chunk texts and FAQ questions are embedded in batches across the same pool
+(one embeddings model per worker process). The result is published as a
+versioned index directory (see knowledge_base.py), which API workers open at
+start with INDEX_MODE=readonly.
+
+    python ingest.py --knowledge ../knowledge --out ./knowledge_index --workers 8
+
+The output directory is self-contained and can be copied to other hosts or
+baked into an image.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Tuple
+import argparse
+import os
+import time
+
+import numpy as np
+
+from config import settings
+from faq_bank import FAQBank, parse_qa_pairs
+from knowledge_base import (
+    VectorIndex, chunk_dicts, dedup_build_info, dedup_chunks, index_lock, knowledge_sources, load_chunks, publish_index
+)
+
+_embeddings = None
+
+
+def _init_worker(threads: int):
+    global _embeddings
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    from embedding_backends import create_embeddings
+    _embeddings = create_embeddings()
+
+
+def _split_file(path: str) -> Tuple[List[dict], List[dict]]:
+    """Chunks and FAQ entries of one knowledge file"""
+    chunks = chunk_dicts(load_chunks([path]))
+    faq = [
+        {"question": question, "answer": answer, "source": path}
+        for question, answer in parse_qa_pairs(Path(path).read_text())
+    ]
+    return chunks, faq
+
+
+def _embed_batch(texts: List[str]) -> np.ndarray:
+    return np.asarray(_embeddings.embed_documents(texts), dtype=np.float32).reshape(len(texts), -1)
+
+
+def ingest(knowledge_path: str, out: Path, workers: int, batch_size: int = 64) -> Optional[VectorIndex]:
+    """Split and embed every file under ``knowledge_path`` and publish the index to ``out``"""
+    sources = knowledge_sources(knowledge_path)
+    if not sources:
+        print(f"Warning: No documents found in {knowledge_path}")
+        return None
+
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    timings = {}
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(threads,)) as pool:
+        start = time.perf_counter()
+        chunks, faq_entries = [], []
+        for file_chunks, file_faq in pool.map(_split_file, sources, chunksize=max(1, len(sources) // (workers * 4))):
+            chunks.extend(file_chunks)
+            faq_entries.extend(file_faq)
+        chunks, report = dedup_chunks(chunks)
+        timings["split_s"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        texts = [chunk["text"] for chunk in chunks] + [entry["question"] for entry in faq_entries]
+        batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+        vectors = np.concatenate(list(pool.map(_embed_batch, batches)))
+        vectors /= np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+        timings["embed_s"] = time.perf_counter() - start
+
+    faq = FAQBank(faq_entries, vectors[len(chunks):]) if faq_entries else FAQBank.empty()
+    index = VectorIndex(vectors[:len(chunks)], chunks, embeddings=None, faq=faq)
+    build = {
+        "workers": workers,
+        "batch_size": batch_size,
+        **{k: round(v, 3) for k, v in timings.items()},
+        **dedup_build_info(report, index),
+    }
+
+    out.mkdir(parents=True, exist_ok=True)
+    with index_lock(out):
+        publish_index(index, out, sources, build=build)
+    print(f"Ingested {len(sources)} documents -> {len(chunks)} chunks, {len(faq_entries)} FAQ questions "
+          f"into {out / index.version} (split {timings['split_s']:.1f}s, embed {timings['embed_s']:.1f}s)")
+    return index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the knowledge index offline")
+    parser.add_argument("--knowledge", default=settings.knowledge_path, help="knowledge folder")
+    parser.add_argument("--out", default=settings.index_path, help="index directory to publish into")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--batch-size", type=int, default=64)
+    args = parser.parse_args()
+
+    ingest(args.knowledge, Path(args.out), args.workers, args.batch_size)
@@ -0,0 +1,379 @@
+"""
+Knowledge base index shared by all API workers
+
+The index is a flat, normalised float32 matrix plus a JSONL file of chunks,
+published into versioned directories under ``settings.index_path``:
+
+    knowledge_index/
+        CURRENT          -> name of the live version, e.g. "v3"
+        v3/embeddings.npy
+        v3/chunks.jsonl
+        v3/manifest.json
+        v3/faq.jsonl, v3/faq_embeddings.npy   (question bank, see faq_bank.py)
+        v3/embeddings_int8*.npy               (INDEX_QUANTIZATION=int8, see quantization.py)
+
+Workers memory-map ``embeddings.npy`` read-only, so N workers share one copy
+of the vectors through the page cache. Building is guarded by a file lock:
+one process (a pre-start step or the first worker) builds, the rest wait and
+then load the published version.
+
+Pre-build before starting workers:  python knowledge_base.py
+(or, for large corpora, the parallel offline build:  python ingest.py)
+"""
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import hashlib
+import json
+import os
+import shutil
+import time
+from contextlib import contextmanager
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_community.document_loaders import TextLoader
+
+from config import settings
+from dedup import chunk_sources, collapse_duplicates
+from faq_bank import FAQBank
+from quantization import Int8Vectors
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process only
+    fcntl = None
+
+CURRENT_FILE = "CURRENT"
+KEEP_VERSIONS = 2
+
+
+def chunk_id(source: str, text: str) -> str:
+    """Stable identifier for a chunk"""
+    return hashlib.sha1(f"{source}\0{text}".encode()).hexdigest()[:16]
+
+
+def knowledge_sources(knowledge_path: str = settings.knowledge_path) -> Dict[str, float]:
+    """Map of knowledge file path -> modification time"""
+    root = Path(knowledge_path)
+    if not root.exists():
+        return {}
+    return {str(p): p.stat().st_mtime for p in sorted(root.glob("**/*.txt"))}
+
+
+def load_chunks(paths: List[str]) -> List[Document]:
+    """Load and split the given knowledge files into chunks"""
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=1000,
+        chunk_overlap=200
+    )
+    documents = []
+    for path in paths:
+        documents.extend(TextLoader(path).load())
+    splits = text_splitter.split_documents(documents)
+    for doc in splits:
+        doc.metadata["id"] = chunk_id(doc.metadata["source"], doc.page_content)
+    return splits
+
+
+def chunk_dicts(documents: List[Document]) -> List[dict]:
+    return [
+        {"id": doc.metadata["id"], "text": doc.page_content, "metadata": doc.metadata}
+        for doc in documents
+    ]
+
+
+def dedup_chunks(chunks: List[dict]) -> Tuple[List[dict], dict]:
+    """Collapse near-duplicate chunks when DEDUP_ENABLED; returns (chunks, report)"""
+    if not settings.dedup_enabled:
+        return chunks, {}
+    chunks, report = collapse_duplicates(chunks)
+    if report["removed"]:
+        print(f"Dedup: {report['chunks_before']} -> {report['chunks_after']} chunks "
+              f"({report['removed']} near-duplicates, {report['text_bytes_saved'] / 1024:.1f} KiB of text)")
+    return chunks, report
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the ``k`` highest scores, best first"""
+    k = min(k, len(scores))
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.clip(norms, 1e-12, None)
+
+
+class VectorIndex:
+    """Exact cosine-similarity index over a (possibly memory-mapped) float32 matrix"""
+
+    def __init__(self, vectors: np.ndarray, chunks: List[dict], embeddings: Embeddings,
+                 manifest: Optional[dict] = None, faq: Optional[FAQBank] = None,
+                 quantized: Optional[Int8Vectors] = None):
+        self.vectors = vectors
+        self.chunks = chunks
+        self.embeddings = embeddings
+        self.manifest = manifest or {}
+        self.faq = faq if faq is not None else FAQBank.empty()
+        if quantized is None and settings.index_quantization == "int8" and chunks:
+            quantized = Int8Vectors.from_vectors(vectors)
+        # With int8 codes, search runs on them and the float32 matrix is only
+        # read for re-ranking
+        self.quantized = quantized
+
+    @property
+    def version(self) -> str:
+        return self.manifest.get("version", "")
+
+    @classmethod
+    def from_chunks(cls, chunks: List[dict], embeddings: Embeddings,
+                    batch_size: int = 64) -> "VectorIndex":
+        """Embed ``chunks`` and build an in-memory index"""
+        texts = [chunk["text"] for chunk in chunks]
+        vectors = []
+        for start in range(0, len(texts), batch_size):
+            vectors.extend(embeddings.embed_documents(texts[start:start + batch_size]))
+        matrix = _normalize(np.asarray(vectors, dtype=np.float32).reshape(len(texts), -1))
+        return cls(matrix, chunks, embeddings)
+
+    @classmethod
+    def from_documents(cls, documents: List[Document], embeddings: Embeddings,
+                       batch_size: int = 64) -> "VectorIndex":
+        return cls.from_chunks(chunk_dicts(documents), embeddings, batch_size)
+
+    def save(self, path: Path):
+        path.mkdir(parents=True)
+        np.save(path / "embeddings.npy", np.ascontiguousarray(self.vectors, dtype=np.float32))
+        with open(path / "chunks.jsonl", "w") as f:
+            for chunk in self.chunks:
+                f.write(json.dumps(chunk) + "\n")
+        with open(path / "manifest.json", "w") as f:
+            json.dump(self.manifest, f, indent=2)
+        if self.quantized is not None:
+            self.quantized.save(path)
+        self.faq.save(path)
+
+    @classmethod
+    def load(cls, path: Path, embeddings: Embeddings, mmap: bool = True) -> "VectorIndex":
+        vectors = np.load(path / "embeddings.npy", mmap_mode="r" if mmap else None)
+        with open(path / "chunks.jsonl") as f:
+            chunks = [json.loads(line) for line in f]
+        with open(path / "manifest.json") as f:
+            manifest = json.load(f)
+        quantized = Int8Vectors.load(path) if settings.index_quantization == "int8" else None
+        return cls(vectors, chunks, embeddings, manifest, FAQBank.load(path), quantized)
+
+    def _query_vector(self, query: str) -> np.ndarray:
+        embed_array = getattr(self.embeddings, "embed_query_array", None)
+        if embed_array:
+            return embed_array(query)
+        return np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+
+    def similarity_search_by_vector(self, vector, k: int = 4) -> List[Document]:
+        if not self.chunks:
+            return []
+        vector = np.asarray(vector, dtype=np.float32)
+        vector = vector / max(float(np.linalg.norm(vector)), 1e-12)
+        if self.quantized is not None:
+            top = self._quantized_search(vector, k)
+        else:
+            top = _top_k(self.vectors @ vector, k)
+        return [
+            Document(page_content=self.chunks[i]["text"], metadata=self.chunks[i]["metadata"])
+            for i in top
+        ]
+
+    def _quantized_search(self, vector: np.ndarray, k: int,
+                          rerank: int = settings.index_rerank) -> np.ndarray:
+        """Top-k over the int8 codes, optionally re-ranking ``rerank`` candidates exactly"""
+        candidates = _top_k(self.quantized.scores(vector), max(k, rerank))
+        if rerank <= 0:
+            return candidates[:k]
+        candidates = np.sort(candidates)  # sequential reads from the mmap
+        exact = np.asarray(self.vectors[candidates], dtype=np.float32) @ vector
+        return candidates[_top_k(exact, k)]
+
+    def similarity_search(self, query: str, k: int = 4) -> List[Document]:
+        return self.similarity_search_by_vector(self._query_vector(query), k)
+
+
+# ---------------------------------------------------------------------------
+# Versioned publishing
+# ---------------------------------------------------------------------------
+
+@contextmanager
+def index_lock(root: Path):
+    """Exclusive inter-process lock on the index directory"""
+    root.mkdir(parents=True, exist_ok=True)
+    with open(root / ".lock", "w") as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def current_version(root: Path) -> Optional[str]:
+    try:
+        return (root / CURRENT_FILE).read_text().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def publish_index(index: VectorIndex, root: Path, sources: Dict[str, float],
+                  build: Optional[dict] = None) -> str:
+    """Write ``index`` as a new version and atomically point CURRENT at it"""
+    versions = [int(p.name[1:]) for p in root.glob("v*") if p.name[1:].isdigit()]
+    version = f"v{max(versions, default=0) + 1}"
+    index.manifest = {
+        "version": version,
+        "built_at": time.time(),
+        "chunks": len(index.chunks),
+        "faq_questions": len(index.faq),
+        "dimensions": int(index.vectors.shape[1]) if index.chunks else 0,
+        "embedding_model": settings.embedding_model,
+        "quantization": "int8" if index.quantized is not None else "none",
+        "sources": sources,
+        "build": build or {},
+    }
+    index.save(root / version)
+
+    tmp = root / f"{CURRENT_FILE}.tmp"
+    tmp.write_text(version)
+    os.replace(tmp, root / CURRENT_FILE)
+
+    # Old versions stay on disk briefly: other workers may still have them mapped
+    for stale in sorted(versions)[:-(KEEP_VERSIONS - 1)]:
+        shutil.rmtree(root / f"v{stale}", ignore_errors=True)
+    return version
+
+
+def load_current_index(root: Path, embeddings: Embeddings) -> Optional[VectorIndex]:
+    version = current_version(root)
+    if version is None:
+        return None
+    index = VectorIndex.load(root / version, embeddings)
+    model = index.manifest.get("embedding_model")
+    if model and model != settings.embedding_model:
+        print(f"Warning: index {version} was embedded with {model}, but EMBEDDING_MODEL is {settings.embedding_model}")
+    return index
+
+
+def dedup_build_info(report: dict, index: VectorIndex) -> dict:
+    """Dedup report for the manifest, including the embedding bytes saved"""
+    if not report:
+        return {}
+    dims = int(index.vectors.shape[1]) if index.chunks else 0
+    return {"dedup": {**report, "vector_bytes_saved": report["removed"] * dims * 4}}
+
+
+def build_index(embeddings: Embeddings, root: Path = Path(settings.index_path)) -> Optional[VectorIndex]:
+    """Rebuild the index from the knowledge folder, publish it and return the mapped copy"""
+    sources = knowledge_sources()
+    if not sources:
+        print(f"Warning: No documents found in {settings.knowledge_path}")
+        return None
+    chunks, report = dedup_chunks(chunk_dicts(load_chunks(list(sources))))
+    index = VectorIndex.from_chunks(chunks, embeddings)
+    index.faq = FAQBank.from_files(sources, embeddings)
+    publish_index(index, root, sources, build=dedup_build_info(report, index))
+    print(f"Loaded {len(sources)} documents with {len(chunks)} chunks into index {index.version}")
+    # Serve the memory-mapped version like every other worker, not a private copy
+    return VectorIndex.load(root / index.version, embeddings)
+
+
+def refresh_index(current: Optional[VectorIndex], embeddings: Embeddings,
+                  root: Path = Path(settings.index_path)) -> Optional[VectorIndex]:
+    """
+    Publish a new index version reflecting the knowledge folder, re-embedding
+    only files that were added or modified since ``current`` was built, and
+    return it memory-mapped. Returns ``current`` unchanged when nothing changed.
+    """
+    with index_lock(root):
+        # Another process may already have published a newer version
+        latest = load_current_index(root, embeddings)
+        if latest is not None and (current is None or latest.version != current.version):
+            current = latest
+
+        sources = knowledge_sources()
+        previous = current.manifest.get("sources", {}) if current else {}
+        if current is not None and previous == sources:
+            return current
+        if current is None:
+            return build_index(embeddings, root)
+
+        changed = [path for path, mtime in sources.items() if previous.get(path) != mtime]
+        removed = [path for path in previous if path not in sources]
+
+        # A collapsed chunk stands for several files: if any of them changed,
+        # re-split all of them so no file loses its copy of the shared text
+        resplit = set(changed)
+        while True:
+            stale = set(resplit) | set(removed)
+            affected = {
+                source
+                for chunk in current.chunks if stale.intersection(chunk_sources(chunk))
+                for source in chunk_sources(chunk) if source in sources
+            }
+            if affected <= resplit:
+                break
+            resplit |= affected
+
+        keep = [
+            i for i, chunk in enumerate(current.chunks)
+            if not stale.intersection(chunk_sources(chunk))
+        ]
+        kept = {current.chunks[i]["id"]: i for i in keep}
+        candidates = [current.chunks[i] for i in keep] + chunk_dicts(load_chunks(sorted(resplit)))
+        chunks, report = dedup_chunks(candidates)
+
+        fresh = [chunk for chunk in chunks if chunk["id"] not in kept]
+        chunks = [c for c in chunks if c["id"] in kept] + fresh
+        vectors = np.asarray(current.vectors[[kept[c["id"]] for c in chunks[:len(chunks) - len(fresh)]]],
+                             dtype=np.float32)
+        if fresh:
+            fresh_vectors = VectorIndex.from_chunks(fresh, embeddings).vectors
+            vectors = np.concatenate([vectors, fresh_vectors]) if len(vectors) else fresh_vectors
+
+        faq = current.faq.without_sources(changed + removed).extend(
+            FAQBank.from_files(changed, embeddings)
+        )
+
+        index = VectorIndex(vectors, chunks, embeddings, faq=faq)
+        publish_index(index, root, sources, build=dedup_build_info(report, index))
+        print(f"Re-embedded {len(resplit)} documents ({len(fresh)} chunks) into index {index.version}")
+        return VectorIndex.load(root / index.version, embeddings)
+
+
+def open_index(embeddings: Embeddings, mode: str = settings.index_mode,
+               root: Path = Path(settings.index_path)) -> Optional[VectorIndex]:
+    """
+    Open the shared index according to ``mode``:
+      readonly - only load a published index (built by a pre-start step)
+      auto     - load it, building under the lock first if missing or stale
+      rebuild  - always rebuild under the lock
+    """
+    if mode == "readonly":
+        index = load_current_index(root, embeddings)
+        if index is None:
+            print(f"Warning: No index published in {root} - run: python knowledge_base.py")
+        return index
+
+    with index_lock(root):
+        if mode == "auto":
+            index = load_current_index(root, embeddings)
+            if index is not None and index.manifest.get("sources") == knowledge_sources():
+                return index
+        return build_index(embeddings, root)
+
+
+if __name__ == "__main__":
+    from embedding_backends import create_embeddings
+
+    with index_lock(Path(settings.index_path)):
+        build_index(create_embeddings())
@@ -0,0 +1,112 @@
+"""
+Background hot reload of the knowledge index
+
+Changed files under ``settings.knowledge_path`` are re-chunked and re-embedded
+off the request path; the orchestrator's index reference is then swapped in a
+single assignment, so in-flight queries finish on the index they started with.
+"""
+from pathlib import Path
+import threading
+import time
+
+from config import settings
+from knowledge_base import load_current_index, knowledge_sources, refresh_index
+
+
+class KnowledgeReloader:
+    """Detects knowledge changes and swaps the orchestrator's index atomically"""
+
+    def __init__(self, orchestrator, interval: float = settings.knowledge_watch_interval):
+        self.orchestrator = orchestrator
+        self.interval = interval
+        self.root = Path(settings.index_path)
+        self._lock = threading.Lock()
+        self.in_progress = False
+        self.reloads = 0
+        self.last_reload_at = None
+        self.last_duration = None
+        self.last_error = None
+        self._watcher = None
+
+    @property
+    def version(self) -> str:
+        index = self.orchestrator.vector_store
+        return index.version if index is not None else ""
+
+    def _is_stale(self) -> bool:
+        index = self.orchestrator.vector_store
+        if settings.index_mode == "readonly":
+            # Read-only workers follow whatever version the builder published
+            latest = (self.root / "CURRENT")
+            return latest.exists() and latest.read_text().strip() != self.version
+        if index is None:
+            return bool(knowledge_sources())
+        return index.manifest.get("sources") != knowledge_sources()
+
+    def reload(self) -> bool:
+        """Rebuild changed documents and swap the index (blocking); False if one is already running"""
+        if not self._lock.acquire(blocking=False):
+            return False
+        self.in_progress = True
+        self._reload_locked()
+        return True
+
+    def _reload_locked(self):
+        """Body of a reload; the caller holds ``_lock``, which is released here"""
+        start = time.perf_counter()
+        try:
+            current = self.orchestrator.vector_store
+            if settings.index_mode == "readonly":
+                index = load_current_index(self.root, self.orchestrator.embeddings)
+            else:
+                index = refresh_index(current, self.orchestrator.embeddings, self.root)
+            if index is not current:
+                self.orchestrator.vector_store = index
+                self.reloads += 1
+            self.last_error = None
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"Error reloading knowledge base: {e}")
+        finally:
+            self.last_duration = time.perf_counter() - start
+            self.last_reload_at = time.time()
+            self.in_progress = False
+            self._lock.release()
+
+    def trigger(self) -> bool:
+        """Start a reload in the background; False if one is already running"""
+        if not self._lock.acquire(blocking=False):
+            return False
+        self.in_progress = True
+        try:
+            threading.Thread(target=self._reload_locked, daemon=True).start()
+        except BaseException:
+            self.in_progress = False
+            self._lock.release()
+            raise
+        return True
+
+    def _watch(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                if self._is_stale():
+                    self.reload()
+            except Exception as e:
+                print(f"Knowledge watcher error: {e}")
+
+    def start_watcher(self):
+        if self.interval > 0 and self._watcher is None:
+            self._watcher = threading.Thread(target=self._watch, daemon=True)
+            self._watcher.start()
+
+    def status(self) -> dict:
+        return {
+            "version": self.version,
+            "in_progress": self.in_progress,
+            "reloads": self.reloads,
+            "last_reload_at": self.last_reload_at,
+            "last_reload_seconds": self.last_duration,
+            "last_error": self.last_error,
+            "watch_interval": self.interval,
+        }
@@ -0,0 +1,135 @@
+"""
+Micro-batching of concurrent LLM calls
+
+Calls for the same node and model that arrive within a short window are sent
+together through the client's ``batch`` method, and each result is handed back
+to the graph execution waiting for it.
+
+For ChatGoogleGenerativeAI that is LangChain's generic ``Runnable.batch``,
+which still makes one ``invoke`` (one provider request) per input on a thread
+pool. Batching therefore does not reduce request count or help against
+provider rate limits; what it gives is a cap on concurrent calls per node
+(``max_concurrency``) at the cost of the window's latency. It stays off by
+default and only pays off with a model whose ``batch`` is a real bulk call.
+"""
+from collections import defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Condition, Lock, Thread
+from typing import Dict, List, Tuple
+import time
+
+from config import settings
+
+
+class _Call:
+    __slots__ = ("messages", "enqueued_at", "future")
+
+    def __init__(self, messages):
+        self.messages = messages
+        self.enqueued_at = time.perf_counter()
+        self.future: Future = Future()
+
+
+class LLMBatcher:
+    """Collects concurrent ``invoke`` calls per (node, model) and dispatches them as batches"""
+
+    def __init__(self, window_ms: float = settings.llm_batch_window_ms,
+                 max_batch: int = settings.llm_batch_max_size,
+                 max_concurrency: int = settings.llm_batch_max_concurrency,
+                 workers: int = settings.llm_batch_workers):
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.max_concurrency = max_concurrency
+        self._pending: Dict[Tuple[str, int], List[_Call]] = {}
+        self._deadlines: Dict[Tuple[str, int], float] = {}
+        self._llms: Dict[Tuple[str, int], object] = {}
+        self._cond = Condition()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="llm-batch")
+        self._stats_lock = Lock()
+        self._stats = defaultdict(lambda: {
+            "calls": 0, "batches": 0, "max_batch_size": 0, "queue_ms_total": 0.0, "queue_ms_max": 0.0
+        })
+        Thread(target=self._dispatch_loop, daemon=True).start()
+
+    def invoke(self, node: str, llm, messages):
+        """Queue one call and block until its batch has been answered"""
+        key = (node, id(llm))
+        call = _Call(messages)
+        with self._cond:
+            calls = self._pending.setdefault(key, [])
+            if not calls:
+                self._deadlines[key] = call.enqueued_at + self.window
+                self._llms[key] = llm
+            calls.append(call)
+            self._cond.notify()
+        return call.future.result()
+
+    def _take_due(self) -> List[Tuple[Tuple[str, int], List[_Call]]]:
+        """Remove and return groups whose window closed or that are full"""
+        now = time.perf_counter()
+        due = [
+            key for key, calls in self._pending.items()
+            if calls and (len(calls) >= self.max_batch or self._deadlines[key] <= now)
+        ]
+        batches = []
+        for key in due:
+            calls = self._pending.pop(key)
+            self._deadlines.pop(key)
+            for start in range(0, len(calls), self.max_batch):
+                batches.append((key, calls[start:start + self.max_batch]))
+        return batches
+
+    def _dispatch_loop(self):
+        while True:
+            with self._cond:
+                batches = self._take_due()
+                while not batches:
+                    if self._deadlines:
+                        timeout = max(0.0, min(self._deadlines.values()) - time.perf_counter())
+                    else:
+                        timeout = None
+                    self._cond.wait(timeout)
+                    batches = self._take_due()
+                llms = {key: self._llms[key] for key, _ in batches}
+            for key, calls in batches:
+                self._executor.submit(self._run_batch, key, llms[key], calls)
+
+    def _run_batch(self, key, llm, calls: List[_Call]):
+        dispatched_at = time.perf_counter()
+        with self._stats_lock:
+            stats = self._stats[key[0]]
+            stats["calls"] += len(calls)
+            stats["batches"] += 1
+            stats["max_batch_size"] = max(stats["max_batch_size"], len(calls))
+            for call in calls:
+                waited = (dispatched_at - call.enqueued_at) * 1000
+                stats["queue_ms_total"] += waited
+                stats["queue_ms_max"] = max(stats["queue_ms_max"], waited)
+
+        try:
+            results = llm.batch(
+                [call.messages for call in calls],
+                config={"max_concurrency": self.max_concurrency},
+                return_exceptions=True
+            )
+        except Exception as e:
+            results = [e] * len(calls)
+        for call, result in zip(calls, results):
+            if isinstance(result, Exception):
+                call.future.set_exception(result)
+            else:
+                call.future.set_result(result)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                node: {
+                    "calls": s["calls"],
+                    "batches": s["batches"],
+                    "avg_batch_size": s["calls"] / s["batches"] if s["batches"] else 0.0,
+                    "max_batch_size": s["max_batch_size"],
+                    "avg_queue_ms": s["queue_ms_total"] / s["calls"] if s["calls"] else 0.0,
+                    "max_queue_ms": s["queue_ms_max"],
+                }
+                for node, s in self._stats.items()
+            }
@@ -0,0 +1,149 @@
+"""
+Persistent exact-match cache for LLM calls
+
+Keyed by model name, temperature and a SHA-256 of the rendered prompt, stored
+in a local SQLite file with size-based LRU eviction. The byte total is kept
+in memory, so inserts don't scan the table; once it passes the limit the
+least recently used entries are dropped in one batch, down to
+``EVICT_TO`` of the limit. Sampled calls
+(temperature > 0) bypass the cache unless ``force`` is set, since their
+outputs aren't meant to repeat.
+"""
+from collections import defaultdict
+from pathlib import Path
+from threading import Lock, local
+from typing import List, Optional
+import hashlib
+import math
+import sqlite3
+import time
+
+from langchain_core.messages import BaseMessage
+
+from config import settings
+
+# Eviction frees space down to this share of max_bytes, so it runs in batches
+EVICT_TO = 0.9
+
+
+def llm_identity(llm) -> tuple:
+    """(model name, temperature) of a LangChain chat model"""
+    model = getattr(llm, "model", None) or getattr(llm, "model_name", None) or type(llm).__name__
+    return str(model), getattr(llm, "temperature", None)
+
+
+def prompt_key(model: str, temperature, messages: List[BaseMessage]) -> str:
+    digest = hashlib.sha256(f"{model}\0{temperature}\0".encode())
+    for message in messages:
+        digest.update(f"{message.type}\0{message.content}\0".encode())
+    return digest.hexdigest()
+
+
+class LLMCallCache:
+    """SQLite-backed prompt -> completion cache with per-node hit rates"""
+
+    def __init__(self, path: str = settings.llm_cache_path,
+                 max_bytes: int = settings.llm_cache_max_mb * 1024 * 1024,
+                 force: bool = settings.llm_cache_force):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.force = force
+        self._local = local()
+        self._size_lock = Lock()
+        self._stats_lock = Lock()
+        self._stats = defaultdict(lambda: {"hits": 0, "misses": 0, "bypassed": 0})
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            " key TEXT PRIMARY KEY,"
+            " model TEXT NOT NULL,"
+            " node TEXT NOT NULL,"
+            " content TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_access ON llm_cache (last_access)")
+        conn.commit()
+        self._bytes = conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, node: str, field: str):
+        with self._stats_lock:
+            self._stats[node][field] += 1
+
+    def cacheable(self, llm) -> bool:
+        temperature = llm_identity(llm)[1]
+        return self.force or not temperature
+
+    def get(self, llm, messages: List[BaseMessage], node: str) -> Optional[str]:
+        """Cached completion for this exact call, or None (counts a miss/bypass)"""
+        if not self.cacheable(llm):
+            self._count(node, "bypassed")
+            return None
+        key = prompt_key(*llm_identity(llm), messages)
+        conn = self._conn()
+        row = conn.execute("SELECT content FROM llm_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self._count(node, "misses")
+            return None
+        with conn:
+            conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (time.time(), key))
+        self._count(node, "hits")
+        return row[0]
+
+    def put(self, llm, messages: List[BaseMessage], node: str, content: str):
+        if not self.cacheable(llm):
+            return
+        model, temperature = llm_identity(llm)
+        key = prompt_key(model, temperature, messages)
+        size = len(key) + len(content.encode())
+        conn = self._conn()
+        with conn:
+            old = conn.execute("SELECT size FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, model, node, content, size, last_access)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, node, content, size, time.time())
+            )
+        with self._size_lock:
+            self._bytes += size - (old[0] if old else 0)
+            if self._bytes > self.max_bytes:
+                self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection):
+        """Drop least recently used entries until the cache is back under EVICT_TO of max_bytes"""
+        # Other workers write to the same file, so resync the total before sizing the batch
+        entries, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+        target = int(self.max_bytes * EVICT_TO)
+        while total > target and entries:
+            batch = max(1, math.ceil((total - target) * entries / total))
+            with conn:
+                freed = conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN"
+                    " (SELECT key FROM llm_cache ORDER BY last_access LIMIT ?) RETURNING size",
+                    (batch,)
+                ).fetchall()
+            if not freed:
+                break
+            total -= sum(size for (size,) in freed)
+            entries -= len(freed)
+        self._bytes = total
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            nodes = {}
+            for node, counts in self._stats.items():
+                lookups = counts["hits"] + counts["misses"]
+                nodes[node] = {**counts, "hit_rate": counts["hits"] / lookups if lookups else 0.0}
+        row = self._conn().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+        return {"entries": row[0], "bytes": row[1], "max_bytes": self.max_bytes, "nodes": nodes}
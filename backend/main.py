@@ -1,15 +1,23 @@
 """
 FastAPI Backend for Customer Support Orchestrator
 """
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Header, Depends, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import List, Optional
-import json
+from typing import List, Literal, Optional
 from datetime import datetime
 
 from agents import CustomerSupportOrchestrator
 from config import settings
+from escalation_screen import BENIGN
+from memory_report import TracemallocTracker, memory_report
+from profiling import list_profiles, profile_path
+from rate_limit import RequestThrottle
+from scheduler import RequestScheduler, SchedulerFull, priority_class
+from session_store import create_session_store, history_text, new_turn, to_ref, to_wire
+from ws_codec import FrameCodec, negotiate
 
 app = FastAPI(
     title="Customer Support Orchestrator",
@@ -29,13 +37,38 @@ app.add_middleware(
 # Initialize orchestrator
 orchestrator = CustomerSupportOrchestrator()
 
-# Store chat sessions in memory (in production, use Redis or database)
-chat_sessions = {}
+# Chat sessions: in-process dict, or a SQLite file shared by all workers
+session_store = create_session_store()
+
+# Priority queues in front of orchestrator.process_query
+scheduler = RequestScheduler()
+
+# tracemalloc snapshots taken through /admin/memory
+memory_tracker = TracemallocTracker()
+
+# Per-session / per-IP token buckets
+throttle = RequestThrottle() if settings.rate_limit_enabled else None
+
+
+def require_admin(x_admin_token: Optional[str] = Header(default=None)):
+    """Guard for /admin endpoints"""
+    if not settings.admin_token:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (set ADMIN_TOKEN)")
+    if x_admin_token != settings.admin_token:
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+def request_class(query: str, mode: str) -> str:
+    """Scheduler class for a query; anything the escalation screen flags jumps ahead"""
+    screen = orchestrator.escalation_screen
+    flagged = screen is not None and screen.screen(query, record=False).decision != BENIGN
+    return priority_class(mode, flagged)
 
 
 class QueryRequest(BaseModel):
     query: str
     session_id: Optional[str] = None
+    priority: Literal["interactive", "batch"] = "interactive"
 
 
 class QueryResponse(BaseModel):
@@ -44,6 +77,7 @@ class QueryResponse(BaseModel):
     knowledge_used: str
     session_id: str
     timestamp: str
+    messages: List[dict] = []
 
 
 @app.get("/")
@@ -55,69 +89,194 @@ async def root():
     }
 
 
+@app.get("/metrics")
+async def get_metrics():
+    """Runtime metrics (cache hit rates etc.)"""
+    return {
+        **orchestrator.get_stats(),
+        "scheduler": scheduler.stats(),
+        "rate_limit": throttle.stats() if throttle else {},
+    }
+
+
+@app.post("/admin/knowledge/reload", dependencies=[Depends(require_admin)])
+async def reload_knowledge():
+    """Re-embed changed knowledge files in the background and swap the index"""
+    started = orchestrator.knowledge_reloader.trigger()
+    return {
+        "started": started,
+        **orchestrator.knowledge_reloader.status()
+    }
+
+
+@app.get("/admin/knowledge", dependencies=[Depends(require_admin)])
+async def knowledge_status():
+    """Current knowledge index version and last reload timing"""
+    return orchestrator.knowledge_reloader.status()
+
+
+@app.get("/admin/tokens", dependencies=[Depends(require_admin)])
+async def token_summary():
+    """Token usage per node and per route, with each node's share of the total"""
+    return orchestrator.token_meter.summary()
+
+
+@app.get("/admin/profiles", dependencies=[Depends(require_admin)])
+async def profiles():
+    """Stored request profiles (per-node wall/CPU split), newest first"""
+    return list_profiles()
+
+
+@app.get("/admin/profiles/{profile_id}", dependencies=[Depends(require_admin)])
+async def download_profile(profile_id: str):
+    """pstats file of a profiled request (open with python -m pstats or snakeviz)"""
+    path = profile_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="application/octet-stream", filename=path.name)
+
+
+@app.get("/admin/memory", dependencies=[Depends(require_admin)])
+async def memory_usage():
+    """Memory by component: sessions, knowledge index, embedding model, caches"""
+    report = await run_in_threadpool(memory_report, orchestrator, session_store)
+    return {**report, "tracemalloc": memory_tracker.status()}
+
+
+@app.post("/admin/memory/tracemalloc/start", dependencies=[Depends(require_admin)])
+async def tracemalloc_start(frames: int = 10):
+    """Start tracing allocations (slows the process down while on)"""
+    return memory_tracker.start(frames)
+
+
+@app.post("/admin/memory/tracemalloc/stop", dependencies=[Depends(require_admin)])
+async def tracemalloc_stop():
+    """Stop tracing and drop stored snapshots"""
+    return memory_tracker.stop()
+
+
+@app.post("/admin/memory/snapshots", dependencies=[Depends(require_admin)])
+async def take_memory_snapshot(label: str = "", limit: int = 20,
+                               group_by: Literal["filename", "lineno", "traceback"] = "lineno"):
+    """Take a tracemalloc snapshot and return its largest allocation sites"""
+    try:
+        return await run_in_threadpool(memory_tracker.snapshot, label, limit, group_by)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@app.get("/admin/memory/diff", dependencies=[Depends(require_admin)])
+async def memory_diff(before: int, after: int, limit: int = 20,
+                      group_by: Literal["filename", "lineno", "traceback"] = "lineno"):
+    """Allocation growth between two snapshots"""
+    diff = await run_in_threadpool(memory_tracker.diff, before, after, limit, group_by)
+    if diff is None:
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    return diff
+
+
+@app.get("/admin/escalations", dependencies=[Depends(require_admin)])
+async def escalation_queue(status: Literal["pending", "processing", "done", "dead"] = "dead",
+                           limit: int = 50):
+    """Escalation queue lag and throughput, plus the latest jobs with ``status``"""
+    if orchestrator.escalations is None:
+        raise HTTPException(status_code=404, detail="Escalation queue is disabled")
+    return {
+        **orchestrator.escalations.stats(),
+        "jobs": orchestrator.escalations.jobs(status, limit)
+    }
+
+
 @app.post("/query", response_model=QueryResponse)
-async def process_query(request: QueryRequest):
-    """Process a customer support query"""
+async def process_query(request: QueryRequest, http_request: Request, response: Response,
+                        profile: bool = False,
+                        x_profile: Optional[str] = Header(default=None),
+                        x_admin_token: Optional[str] = Header(default=None)):
+    """
+    Process a customer support query. With ``?profile=true`` or ``X-Profile: 1``
+    (admin token required) the request is profiled and the profile id is
+    returned in the ``X-Profile-Id`` header.
+    """
+    profile = profile or x_profile in ("1", "true")
+    if profile:
+        require_admin(x_admin_token)
+    if throttle:
+        client_ip = throttle.client_ip(http_request.client, http_request.headers)
+        retry_after = throttle.check(request.session_id, client_ip, "query")
+        if retry_after:
+            raise HTTPException(
+                status_code=429,
+                detail="Too many requests, slow down",
+                headers={"Retry-After": throttle.retry_after_header(retry_after)}
+            )
+
     try:
         session_id = request.session_id or f"session_{datetime.now().timestamp()}"
         
         # Get chat history for this session
-        chat_history = chat_sessions.get(session_id, [])
-        chat_history_str = "\n".join([
-            f"{'User' if msg['role'] == 'user' else 'Assistant'}: {msg['content']}"
-            for msg in chat_history[-5:]  # Last 5 messages
-        ])
+        chat_history_str = history_text(session_store.recent(session_id, 5))  # Last 5 messages
         
-        # Process query
-        result = orchestrator.process_query(
+        # Process query (queued by priority, run in a worker thread)
+        result = await scheduler.submit(
+            orchestrator.process_query,
             query=request.query,
-            chat_history=chat_history_str
+            chat_history=chat_history_str,
+            profile=profile,
+            session_id=session_id,
+            fairness_key=session_id,
+            request_class=request_class(request.query, request.priority)
         )
+        if "profile_id" in result:
+            response.headers["X-Profile-Id"] = result["profile_id"]
         
         # Update chat history
-        if session_id not in chat_sessions:
-            chat_sessions[session_id] = []
-        
-        chat_sessions[session_id].append({
-            "role": "user",
-            "content": request.query,
-            "timestamp": datetime.now().isoformat()
-        })
-        chat_sessions[session_id].append({
-            "role": "assistant",
-            "content": result["response"],
-            "timestamp": datetime.now().isoformat()
-        })
+        stored = session_store.append(session_id, new_turn(request.query, result["response"]))
         
         return QueryResponse(
             response=result["response"],
             escalation_needed=result["escalation_needed"],
             knowledge_used=result["knowledge_used"],
             session_id=session_id,
-            timestamp=datetime.now().isoformat()
+            timestamp=datetime.now().isoformat(),
+            messages=[to_ref(m) for m in stored]
         )
     
+    except SchedulerFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/session/{session_id}")
-async def get_session_history(session_id: str):
-    """Get chat history for a session"""
-    if session_id not in chat_sessions:
+async def get_session_history(session_id: str, response: Response,
+                              before: Optional[int] = None, after: Optional[int] = None,
+                              limit: int = Query(default=settings.session_page_size, ge=1, le=500),
+                              if_none_match: Optional[str] = Header(default=None)):
+    """
+    Get a page of chat history: the newest ``limit`` messages, those before
+    message ID ``before``, or those after ``after`` (oldest first). The ETag
+    changes whenever the session does; a matching ``If-None-Match`` gets 304.
+    """
+    version = session_store.version(session_id)
+    if version is None:
         raise HTTPException(status_code=404, detail="Session not found")
-    
+    etag = f'"{version[0]}-{version[1]}"'
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    messages, has_more = session_store.page(session_id, before=before, after=after, limit=limit)
+    response.headers["ETag"] = etag
     return {
         "session_id": session_id,
-        "messages": chat_sessions[session_id]
+        "messages": [to_wire(m) for m in messages],
+        "has_more": has_more
     }
 
 
 @app.delete("/session/{session_id}")
 async def clear_session(session_id: str):
     """Clear a chat session"""
-    if session_id in chat_sessions:
-        del chat_sessions[session_id]
+    if session_store.delete(session_id):
         return {"message": f"Session {session_id} cleared"}
     
     raise HTTPException(status_code=404, detail="Session not found")
@@ -125,53 +284,60 @@ async def clear_session(session_id: str):
 
 @app.websocket("/ws/{session_id}")
 async def websocket_endpoint(websocket: WebSocket, session_id: str):
-    """WebSocket endpoint for real-time chat"""
-    await websocket.accept()
+    """
+    WebSocket endpoint for real-time chat. Frames are JSON text by default,
+    or MessagePack binary when the client offers the ``msgpack`` subprotocol.
+    """
+    subprotocol = negotiate(websocket.scope.get("subprotocols", []))
+    await websocket.accept(subprotocol=subprotocol)
+    codec = FrameCodec(subprotocol)
     
     try:
         while True:
             # Receive message from client
-            data = await websocket.receive_text()
-            query_data = json.loads(data)
+            query_data = await codec.receive(websocket)
             query = query_data.get("query", "")
             
             if not query:
-                await websocket.send_json({"error": "Empty query"})
+                await codec.send(websocket, {"error": "Empty query"})
                 continue
+
+            if throttle:
+                client_ip = throttle.client_ip(websocket.client, websocket.headers)
+                retry_after = throttle.check(session_id, client_ip, "ws")
+                if retry_after:
+                    await codec.send(websocket, {
+                        "error": "rate_limited",
+                        "retry_after": round(retry_after, 2)
+                    })
+                    continue
             
             # Get chat history
-            chat_history = chat_sessions.get(session_id, [])
-            chat_history_str = "\n".join([
-                f"{'User' if msg['role'] == 'user' else 'Assistant'}: {msg['content']}"
-                for msg in chat_history[-5:]
-            ])
+            chat_history_str = history_text(session_store.recent(session_id, 5))
             
             # Process query
-            result = orchestrator.process_query(
-                query=query,
-                chat_history=chat_history_str
-            )
+            try:
+                result = await scheduler.submit(
+                    orchestrator.process_query,
+                    query=query,
+                    chat_history=chat_history_str,
+                    session_id=session_id,
+                    fairness_key=session_id,
+                    request_class=request_class(query, "interactive")
+                )
+            except SchedulerFull:
+                await codec.send(websocket, {"error": "overloaded", "retry_after": 1})
+                continue
             
             # Update session
-            if session_id not in chat_sessions:
-                chat_sessions[session_id] = []
-            
-            chat_sessions[session_id].append({
-                "role": "user",
-                "content": query,
-                "timestamp": datetime.now().isoformat()
-            })
-            chat_sessions[session_id].append({
-                "role": "assistant",
-                "content": result["response"],
-                "timestamp": datetime.now().isoformat()
-            })
+            stored = session_store.append(session_id, new_turn(query, result["response"]))
             
             # Send response
-            await websocket.send_json({
+            await codec.send(websocket, {
                 "response": result["response"],
                 "escalation_needed": result["escalation_needed"],
-                "timestamp": datetime.now().isoformat()
+                "timestamp": datetime.now().isoformat(),
+                "messages": [to_ref(m) for m in stored]
             })
     
     except WebSocketDisconnect:
@@ -183,5 +349,5 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8888)
+    uvicorn.run(app, host="0.0.0.0", port=8888, ws_per_message_deflate=settings.ws_per_message_deflate)
 
@@ -0,0 +1,188 @@
+"""
+Memory accounting and leak diagnostics
+
+``memory_report`` breaks the process's memory down by component: session
+store, knowledge index, embedding model, caches. ``TracemallocTracker``
+takes tracemalloc snapshots on demand and diffs any two of them, so growth
+can be traced to source lines in a running worker without a debugger.
+"""
+from collections import OrderedDict
+from pathlib import Path
+from threading import Lock
+from typing import Optional
+import gc
+import time
+import tracemalloc
+
+import numpy as np
+
+from config import settings
+
+MAX_SNAPSHOTS = 4
+
+
+def process_memory() -> dict:
+    """Resident and peak resident set size of this process"""
+    memory = {}
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(("VmRSS:", "VmHWM:", "RssAnon:", "RssFile:")):
+                    name, value = line.split(":", 1)
+                    memory[name.lower() + "_bytes"] = int(value.split()[0]) * 1024
+    except FileNotFoundError:  # not Linux
+        import resource
+        memory["maxrss_bytes"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return memory
+
+
+def index_memory(index) -> dict:
+    """Vector index footprint; memory-mapped vectors live in the shared page cache"""
+    if index is None:
+        return {}
+    mapped = isinstance(index.vectors, np.memmap)
+    quantized = getattr(index, "quantized", None)
+    return {
+        "version": index.version,
+        "chunks": len(index.chunks),
+        "vectors_bytes": int(index.vectors.nbytes),
+        "vectors_memory_mapped": mapped,
+        "quantized_bytes": quantized.nbytes if quantized is not None else 0,
+        "chunk_text_bytes": sum(len(chunk["text"].encode()) for chunk in index.chunks),
+        "faq_questions": len(index.faq),
+        "faq_vectors_bytes": int(index.faq.vectors.nbytes),
+    }
+
+
+def embedding_model_memory(embeddings) -> dict:
+    """Parameter bytes of the in-process embedding model, if there is one"""
+    base = getattr(embeddings, "base", embeddings)
+    backend = settings.embedding_backend
+    client = getattr(base, "client", None)
+    if client is not None and hasattr(client, "parameters"):
+        params = list(client.parameters())
+        return {
+            "backend": backend,
+            "parameters": sum(p.numel() for p in params),
+            "parameter_bytes": sum(p.numel() * p.element_size() for p in params),
+        }
+    if backend == "onnx":
+        from onnx_embeddings import MODEL_FILE
+        model = Path(settings.onnx_model_dir) / MODEL_FILE
+        return {"backend": backend, "model_file_bytes": model.stat().st_size if model.exists() else 0}
+    return {"backend": backend, "note": "model runs out of process" if backend == "service" else ""}
+
+
+def memory_report(orchestrator, session_store) -> dict:
+    """Memory usage by component"""
+    llm_cache = {}
+    if orchestrator.llm_cache is not None:
+        stats = orchestrator.llm_cache.stats()
+        path = Path(orchestrator.llm_cache.path)
+        llm_cache = {
+            "entries": stats["entries"],
+            "bytes": stats["bytes"],
+            "file_bytes": path.stat().st_size if path.exists() else 0,
+        }
+    return {
+        "process": process_memory(),
+        "gc": {"objects": len(gc.get_objects()), "counts": gc.get_count()},
+        "session_store": session_store.usage(),
+        "knowledge_index": index_memory(orchestrator.vector_store),
+        "embedding_model": embedding_model_memory(orchestrator.embeddings),
+        "caches": {
+            "query_embeddings": {
+                key: value for key, value in orchestrator.embedding_cache.stats().items()
+                if key in ("size", "max_size", "bytes")
+            },
+            "knowledge_memo": orchestrator.knowledge_memo.usage(),
+            "llm_cache": llm_cache,
+        },
+    }
+
+
+class TracemallocTracker:
+    """On-demand tracemalloc snapshots, kept in memory for diffing"""
+
+    def __init__(self, max_snapshots: int = MAX_SNAPSHOTS):
+        self.max_snapshots = max_snapshots
+        self._snapshots: "OrderedDict[int, tuple]" = OrderedDict()
+        self._next_id = 1
+        self._lock = Lock()
+
+    def start(self, frames: int = 10) -> dict:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        return self.status()
+
+    def stop(self) -> dict:
+        with self._lock:
+            self._snapshots.clear()
+        tracemalloc.stop()
+        return self.status()
+
+    def snapshot(self, label: str = "", limit: int = 20, group_by: str = "lineno") -> dict:
+        """Take a snapshot (dropping the oldest beyond max_snapshots) and return its top allocations"""
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc is not running")
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        with self._lock:
+            snapshot_id = self._next_id
+            self._next_id += 1
+            self._snapshots[snapshot_id] = (label, time.time(), snapshot)
+            while len(self._snapshots) > self.max_snapshots:
+                self._snapshots.popitem(last=False)
+        stats = snapshot.statistics(group_by)
+        return {
+            "id": snapshot_id,
+            "label": label,
+            "traced_bytes": sum(stat.size for stat in stats),
+            "top": [
+                {"where": str(stat.traceback[0]), "bytes": stat.size, "blocks": stat.count}
+                for stat in stats[:limit]
+            ],
+        }
+
+    def diff(self, before: int, after: int, limit: int = 20, group_by: str = "lineno") -> Optional[dict]:
+        """Largest allocation changes between two snapshots"""
+        with self._lock:
+            first = self._snapshots.get(before)
+            second = self._snapshots.get(after)
+        if first is None or second is None:
+            return None
+        stats = second[2].compare_to(first[2], group_by)
+        return {
+            "before": before,
+            "after": after,
+            "seconds": round(second[1] - first[1], 1),
+            "size_diff_bytes": sum(stat.size_diff for stat in stats),
+            "top": [
+                {
+                    "where": str(stat.traceback[0]),
+                    "size_diff_bytes": stat.size_diff,
+                    "bytes": stat.size,
+                    "count_diff": stat.count_diff,
+                }
+                for stat in stats[:limit]
+            ],
+        }
+
+    def status(self) -> dict:
+        tracing = tracemalloc.is_tracing()
+        current, peak = tracemalloc.get_traced_memory() if tracing else (0, 0)
+        with self._lock:
+            snapshots = [
+                {"id": snapshot_id, "label": label, "taken_at": taken_at}
+                for snapshot_id, (label, taken_at, _) in self._snapshots.items()
+            ]
+        return {
+            "tracing": tracing,
+            "traced_bytes": current,
+            "traced_peak_bytes": peak,
+            "overhead_bytes": tracemalloc.get_tracemalloc_memory() if tracing else 0,
+            "snapshots": snapshots,
+        }
+
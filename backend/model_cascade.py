@@ -0,0 +1,105 @@
+"""
+Tiered model cascade
+
+A cheap, fast model answers first; a verifier heuristic decides whether the
+answer is good enough or the call should be re-run on the next (larger) tier.
+Latency, tokens and estimated cost are tracked per tier.
+"""
+from collections import Counter
+from threading import Lock
+from typing import Callable, List, Optional, Tuple
+import re
+import time
+
+from config import settings
+from token_accounting import call_cost, call_usage
+
+UNCERTAIN_MARKERS = (
+    "i don't know",
+    "i do not know",
+    "i'm not sure",
+    "i am not sure",
+    "i don't have information",
+    "i do not have information",
+    "unable to find",
+    "no relevant information",
+    "cannot help with",
+    "can't help with",
+)
+
+LOW_CONFIDENCE = re.compile(r"confidence\W*low", re.IGNORECASE)
+
+
+def low_knowledge_confidence(knowledge: str) -> bool:
+    """True if the knowledge worker marked its findings as low confidence"""
+    return bool(LOW_CONFIDENCE.search(knowledge or ""))
+
+
+def verify_response(text: str, min_chars: int = settings.cascade_min_chars) -> Optional[str]:
+    """Reason to reject a fast-tier answer, or None if it looks acceptable"""
+    if len(text.strip()) < min_chars:
+        return "too_short"
+    lowered = text.lower()
+    if any(marker in lowered for marker in UNCERTAIN_MARKERS):
+        return "uncertain"
+    return None
+
+
+class ModelCascade:
+    """Runs a call on successive tiers until the verifier accepts the answer"""
+
+    def __init__(self, tiers: List[Tuple[str, object]], prices: Optional[dict] = None):
+        self.tiers = tiers
+        self.prices = prices if prices is not None else settings.model_prices
+        self._lock = Lock()
+        self._stats = {
+            name: {"calls": 0, "accepted": 0, "rejected": 0, "latency_ms": 0.0,
+                   "input_tokens": 0, "output_tokens": 0, "cost_usd": 0.0}
+            for name, _ in tiers
+        }
+        self.reject_reasons: Counter = Counter()
+
+    def _record(self, tier: str, llm, messages, response, elapsed: float, accepted: bool):
+        input_tokens, output_tokens, _ = call_usage(messages, response)
+        with self._lock:
+            stats = self._stats[tier]
+            stats["calls"] += 1
+            stats["accepted" if accepted else "rejected"] += 1
+            stats["latency_ms"] += elapsed * 1000
+            stats["input_tokens"] += input_tokens
+            stats["output_tokens"] += output_tokens
+            stats["cost_usd"] += call_cost(llm, input_tokens, output_tokens, self.prices)
+
+    def run(self, messages, invoke: Callable, knowledge: str = ""):
+        """
+        Return (response, tier name). ``invoke(llm, messages)`` performs the
+        call so caching/batching still apply. Low-confidence knowledge skips
+        straight to the last tier.
+        """
+        tiers = self.tiers
+        if low_knowledge_confidence(knowledge):
+            with self._lock:
+                self.reject_reasons["low_knowledge_confidence"] += 1
+            tiers = tiers[-1:]
+
+        for position, (name, llm) in enumerate(tiers):
+            start = time.perf_counter()
+            response = invoke(llm, messages)
+            elapsed = time.perf_counter() - start
+            last = position == len(tiers) - 1
+            reason = None if last else verify_response(response.content)
+            self._record(name, llm, messages, response, elapsed, accepted=reason is None)
+            if reason is None:
+                return response, name
+            with self._lock:
+                self.reject_reasons[reason] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            tiers = {}
+            for name, s in self._stats.items():
+                tiers[name] = {
+                    **s,
+                    "avg_latency_ms": s["latency_ms"] / s["calls"] if s["calls"] else 0.0,
+                }
+            return {"tiers": tiers, "reject_reasons": dict(self.reject_reasons)}
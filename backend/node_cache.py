@@ -0,0 +1,107 @@
+"""
+Memoisation of graph node outputs
+
+Entries are keyed by a fingerprint of the node's real inputs, bounded by size
+(LRU) and TTL, and dropped wholesale when the knowledge index version changes.
+"""
+from collections import OrderedDict
+from threading import Lock
+from typing import Callable, Iterable
+import hashlib
+import re
+import time
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset("""
+a an the is are was were be been am do does did i me my we our you your it its
+of to in on for at by with from about as and or but if so can could would should
+will what how when where which who why this that these those there please hi hello
+""".split())
+
+
+def query_intent(query: str) -> str:
+    """Order- and filler-insensitive form of a query: sorted, crudely stemmed content words"""
+    words = set()
+    for word in _WORD.findall(query.lower()):
+        if word in STOPWORDS:
+            continue
+        if len(word) > 4 and word.endswith("ing"):
+            word = word[:-3]
+        elif len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        words.add(word)
+    return " ".join(sorted(words))
+
+
+def fingerprint(*parts: Iterable[str]) -> str:
+    """Stable hash of the given input parts"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class NodeMemo:
+    """Size- and TTL-bounded memo table for one graph node"""
+
+    def __init__(self, name: str, max_size: int, ttl: float):
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self.version = None
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def sync_version(self, version: str):
+        """Clear the table if the knowledge index version changed"""
+        with self._lock:
+            if version != self.version:
+                if self._entries:
+                    self.invalidations += 1
+                self._entries.clear()
+                self.version = version
+
+    def get_or_compute(self, key: str, compute: Callable):
+        if self.max_size <= 0:
+            return compute()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        value = compute()
+        with self._lock:
+            self._entries[key] = (now + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return value
+
+    def usage(self) -> dict:
+        """Entry count and approximate bytes of the memoised values"""
+        with self._lock:
+            values = [entry[1] for entry in self._entries.values()]
+        return {
+            "entries": len(values),
+            "bytes": sum(len(v) if isinstance(v, str) else 0 for v in values),
+        }
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "index_version": self.version,
+        }
@@ -0,0 +1,159 @@
+"""
+Int8-quantised ONNX embeddings for CPU-only nodes
+
+Runs an ONNX export of all-MiniLM-L6-v2 with onnxruntime and a local
+tokenizer.json, so workers don't need to load PyTorch at all.
+
+Create the model once (needs torch/transformers, e.g. on a build machine):
+    python onnx_embeddings.py export
+
+Check that it agrees with the PyTorch model on the knowledge base:
+    python onnx_embeddings.py check
+"""
+from pathlib import Path
+from typing import List
+import argparse
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from config import settings
+
+MODEL_FILE = "model_int8.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+
+
+class OnnxEmbeddings(Embeddings):
+    """Sentence embeddings from a quantised ONNX model (mean pooling + L2 norm)"""
+
+    def __init__(
+        self,
+        model_dir: str = settings.onnx_model_dir,
+        max_length: int = 256,
+        threads: int = settings.onnx_threads
+    ):
+        try:
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise ImportError(
+                "The onnx embedding backend needs onnxruntime and tokenizers: "
+                "pip install -r requirements-optional.txt"
+            ) from e
+
+        model_dir = Path(model_dir)
+        if not (model_dir / MODEL_FILE).exists():
+            raise FileNotFoundError(
+                f"{model_dir / MODEL_FILE} not found - run: python onnx_embeddings.py export"
+            )
+
+        self.tokenizer = Tokenizer.from_file(str(model_dir / TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding()
+
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(
+            str(model_dir / MODEL_FILE),
+            sess_options=options,
+            providers=["CPUExecutionProvider"]
+        )
+        self._input_names = {i.name for i in self.session.get_inputs()}
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Embed ``texts`` into a (n, dim) float32 array"""
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self._input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+
+        hidden = self.session.run(None, feeds)[0]
+        mask = attention_mask[..., None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return (pooled / np.clip(norms, 1e-12, None)).astype(np.float32)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return self.encode(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.encode([text])[0].tolist()
+
+
+def export_quantized(model_name: str, output_dir: str):
+    """Export ``model_name`` to ONNX and quantise its weights to int8"""
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    output = Path(output_dir)
+    output.mkdir(parents=True, exist_ok=True)
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name).eval()
+    sample = tokenizer(["export sample"], return_tensors="pt")
+
+    fp32_path = output / "model_fp32.onnx"
+    torch.onnx.export(
+        model,
+        (sample["input_ids"], sample["attention_mask"], sample["token_type_ids"]),
+        str(fp32_path),
+        input_names=["input_ids", "attention_mask", "token_type_ids"],
+        output_names=["last_hidden_state"],
+        dynamic_axes={
+            "input_ids": {0: "batch", 1: "sequence"},
+            "attention_mask": {0: "batch", 1: "sequence"},
+            "token_type_ids": {0: "batch", 1: "sequence"},
+            "last_hidden_state": {0: "batch", 1: "sequence"},
+        },
+        opset_version=14
+    )
+    quantize_dynamic(str(fp32_path), str(output / MODEL_FILE), weight_type=QuantType.QInt8)
+    fp32_path.unlink()
+    tokenizer.backend_tokenizer.save(str(output / TOKENIZER_FILE))
+    print(f"Wrote {output / MODEL_FILE} and {output / TOKENIZER_FILE}")
+
+
+def check_compatibility(texts: List[str], tolerance: float = settings.onnx_min_cosine) -> dict:
+    """Compare ONNX vectors with the PyTorch model; returns cosine similarity stats"""
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+
+    reference = np.asarray(
+        HuggingFaceEmbeddings(model_name=settings.embedding_model).embed_documents(texts),
+        dtype=np.float32
+    )
+    candidate = OnnxEmbeddings().encode(texts)
+    reference /= np.linalg.norm(reference, axis=1, keepdims=True)
+    cosines = (reference * candidate).sum(axis=1)
+    return {
+        "texts": len(texts),
+        "min_cosine": float(cosines.min()),
+        "mean_cosine": float(cosines.mean()),
+        "tolerance": tolerance,
+        "compatible": bool(cosines.min() >= tolerance),
+    }
+
+
+def _knowledge_samples(limit: int = 200) -> List[str]:
+    samples = []
+    for path in sorted(Path(settings.knowledge_path).glob("**/*.txt")):
+        samples.extend(p.strip() for p in path.read_text().split("\n\n") if p.strip())
+    return samples[:limit]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ONNX embedding model tools")
+    parser.add_argument("command", choices=["export", "check"])
+    parser.add_argument("--model", default=settings.embedding_model)
+    parser.add_argument("--output", default=settings.onnx_model_dir)
+    args = parser.parse_args()
+
+    if args.command == "export":
+        export_quantized(args.model, args.output)
+    else:
+        print(check_compatibility(_knowledge_samples()))
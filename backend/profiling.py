@@ -0,0 +1,163 @@
+"""
+On-demand profiling of a single request
+
+An admin can ask for one /query to be profiled. That request runs under
+cProfile in every thread it touches (LangGraph may run nodes outside the
+request thread), and each graph node's wall time is split into CPU time and
+waiting (network, locks). The merged pstats file and a JSON summary are
+stored under PROFILE_DIR for download.
+
+Requests that aren't profiled only pay one ContextVar lookup per node.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from threading import Lock, get_ident
+from typing import List, Optional
+import cProfile
+import io
+import json
+import pstats
+import time
+import uuid
+
+from config import settings
+
+_current: ContextVar[Optional["ProfileSession"]] = ContextVar("profile_session", default=None)
+
+
+class ProfileSession:
+    """cProfile data and per-node timings collected for one request"""
+
+    def __init__(self, label: str = ""):
+        self.id = uuid.uuid4().hex[:12]
+        self.label = label
+        self.nodes: List[dict] = []
+        self._profiles: List[cProfile.Profile] = []
+        self._active_threads = set()
+        self._lock = Lock()
+        self._wall = 0.0
+        self._cpu = 0.0
+
+    @contextmanager
+    def _thread_profile(self):
+        """Profile the current thread unless it already is"""
+        thread = get_ident()
+        with self._lock:
+            if thread in self._active_threads:
+                thread = None
+            else:
+                self._active_threads.add(thread)
+        if thread is None:
+            yield
+            return
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:  # another profiler owns this thread
+            profile = None
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+            with self._lock:
+                self._active_threads.discard(thread)
+                if profile is not None:
+                    self._profiles.append(profile)
+
+    @contextmanager
+    def run(self):
+        """Profile the enclosed request"""
+        token = _current.set(self)
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            with self._thread_profile():
+                yield self
+        finally:
+            self._wall = time.perf_counter() - wall
+            self._cpu = time.thread_time() - cpu
+            _current.reset(token)
+
+    @contextmanager
+    def node(self, name: str):
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            with self._thread_profile():
+                yield
+        finally:
+            wall_ms = (time.perf_counter() - wall) * 1000
+            cpu_ms = (time.thread_time() - cpu) * 1000
+            with self._lock:
+                self.nodes.append({
+                    "node": name,
+                    "wall_ms": round(wall_ms, 3),
+                    "cpu_ms": round(cpu_ms, 3),
+                    "wait_ms": round(max(0.0, wall_ms - cpu_ms), 3),
+                })
+
+    def save(self, directory: str = settings.profile_dir, top: int = 30) -> dict:
+        """Write ``<id>.pstats`` and ``<id>.json``; returns the summary"""
+        path = Path(directory)
+        path.mkdir(parents=True, exist_ok=True)
+        summary = {
+            "id": self.id,
+            "label": self.label,
+            "created_at": time.time(),
+            # CPU of the request thread only; nodes run elsewhere report their own
+            "wall_ms": round(self._wall * 1000, 3),
+            "request_thread_cpu_ms": round(self._cpu * 1000, 3),
+            "nodes": self.nodes,
+            "threads_profiled": len(self._profiles),
+        }
+        if self._profiles:
+            stats = pstats.Stats(self._profiles[0])
+            for profile in self._profiles[1:]:
+                stats.add(profile)
+            stats.dump_stats(str(path / f"{self.id}.pstats"))
+            out = io.StringIO()
+            stats.stream = out
+            stats.sort_stats("cumulative").print_stats(top)
+            summary["top_functions"] = out.getvalue()
+        with open(path / f"{self.id}.json", "w") as f:
+            json.dump(summary, f, indent=2)
+        _prune(path, settings.profile_keep)
+        return summary
+
+
+def _prune(path: Path, keep: int):
+    """Delete all but the ``keep`` newest profiles"""
+    summaries = sorted(path.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True)
+    for stale in summaries[keep:]:
+        stale.unlink(missing_ok=True)
+        stale.with_suffix(".pstats").unlink(missing_ok=True)
+
+
+@contextmanager
+def profile_node(name: str):
+    """Time/profile a graph node if the current request is being profiled"""
+    session = _current.get()
+    if session is None:
+        yield
+        return
+    with session.node(name):
+        yield
+
+
+def list_profiles(directory: str = settings.profile_dir) -> List[dict]:
+    """Summaries of stored profiles, newest first"""
+    summaries = []
+    for path in Path(directory).glob("*.json"):
+        with open(path) as f:
+            summary = json.load(f)
+        summary.pop("top_functions", None)
+        summaries.append(summary)
+    return sorted(summaries, key=lambda s: s["created_at"], reverse=True)
+
+
+def profile_path(profile_id: str, directory: str = settings.profile_dir) -> Optional[Path]:
+    """Path of a stored pstats file, or None (ids are hex, so no path tricks)"""
+    if not profile_id.isalnum():
+        return None
+    path = Path(directory) / f"{profile_id}.pstats"
+    return path if path.exists() else None
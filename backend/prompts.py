@@ -24,7 +24,8 @@ Decision Guidelines:
 Current Query: {query}
 Chat History: {chat_history}
 
-Based on the query, decide the next action and which worker should handle it.
+Based on the query, decide which worker should handle it.
+Answer with exactly one label and nothing else: knowledge_worker, response_worker, escalation_worker or FINISH
 """
 
 KNOWLEDGE_WORKER_PROMPT = """You are a Knowledge Retrieval Specialist for customer support.
@@ -97,3 +98,30 @@ If escalation is needed, draft a brief summary for the human agent.
 If not, suggest how the AI should proceed.
 """
 
+
+FAQ_POLISH_PROMPT = """You are a Customer Response Specialist AI.
+
+The customer's question matches this FAQ entry:
+Q: {question}
+A: {answer}
+
+Customer Query: {query}
+
+Rewrite the FAQ answer as a short, friendly reply to the customer's exact query.
+Do not add any facts that are not in the FAQ answer.
+"""
+
+ESCALATION_HANDOFF_TEMPLATE = """This query requires human assistance. A support agent will contact you shortly.
+
+Assessment:
+1. **Escalation Needed**: Yes
+2. **Priority Level**: High
+3. **Reason**: Matched escalation triggers: {rules}
+4. **Recommended Action**: Route to a human agent with the summary below
+
+Summary for human agent: Customer wrote: "{query}"
+"""
+
+ESCALATION_REFERENCE_TEMPLATE = """
+
+Your reference number is #{ticket_id}."""
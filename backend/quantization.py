@@ -0,0 +1,62 @@
+"""
+Scalar int8 quantisation of the knowledge index vectors
+
+Each dimension is scaled symmetrically into [-127, 127], cutting the resident
+vector matrix to a quarter of its float32 size. Search is asymmetric: the
+query stays float32 and is multiplied by the per-dimension scales, so only
+the stored side loses precision. The top candidates can then be re-ranked
+exactly against the float32 matrix, which stays memory-mapped on disk and
+is only paged in for those rows.
+"""
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+CODES_FILE = "embeddings_int8.npy"
+SCALES_FILE = "embeddings_int8_scales.npy"
+
+
+class Int8Vectors:
+    """int8 codes plus per-dimension float32 scales"""
+
+    def __init__(self, codes: np.ndarray, scales: np.ndarray, block_rows: int = 16384):
+        self.codes = codes
+        self.scales = scales
+        self.block_rows = block_rows
+
+    @classmethod
+    def from_vectors(cls, vectors: np.ndarray) -> "Int8Vectors":
+        vectors = np.asarray(vectors, dtype=np.float32)
+        scales = np.abs(vectors).max(axis=0) / 127 if len(vectors) else np.ones(vectors.shape[1], np.float32)
+        scales = np.where(scales > 0, scales, 1.0).astype(np.float32)
+        codes = np.clip(np.rint(vectors / scales), -127, 127).astype(np.int8)
+        return cls(codes, scales)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + self.scales.nbytes
+
+    def scores(self, query: np.ndarray) -> np.ndarray:
+        """Approximate dot products of every stored vector with ``query``"""
+        weighted = (np.asarray(query, dtype=np.float32) * self.scales).astype(np.float32)
+        out = np.empty(len(self.codes), dtype=np.float32)
+        # Blocks bound the temporary float32 copy of the codes
+        for start in range(0, len(self.codes), self.block_rows):
+            block = self.codes[start:start + self.block_rows]
+            out[start:start + len(block)] = block.astype(np.float32) @ weighted
+        return out
+
+    def save(self, path: Path):
+        np.save(path / CODES_FILE, self.codes)
+        np.save(path / SCALES_FILE, self.scales)
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["Int8Vectors"]:
+        """Codes saved under ``path``, or None if the index has none"""
+        if not (path / CODES_FILE).exists():
+            return None
+        return cls(np.load(path / CODES_FILE), np.load(path / SCALES_FILE))
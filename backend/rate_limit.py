@@ -0,0 +1,148 @@
+"""
+Token-bucket rate limiting per session ID and per client IP
+
+Buckets live in memory (one set per worker) and are dropped after sitting
+idle, so abandoned sessions don't accumulate. Behind a reverse proxy the
+client IP is taken from X-Forwarded-For, but only for hops through
+TRUSTED_PROXIES.
+"""
+from collections import Counter
+from threading import Lock
+from typing import Dict, List, Optional, Union
+import ipaddress
+import math
+import time
+
+from config import settings
+
+
+class RateLimiter:
+    """Token buckets keyed by an arbitrary string (session ID, IP, ...)"""
+
+    def __init__(self, rate: float, burst: int, idle_ttl: float = settings.rate_limit_idle_ttl):
+        if rate <= 0 or burst < 1:
+            raise ValueError(f"Rate limit needs rate > 0 and burst >= 1, got rate={rate}, burst={burst}")
+        self.rate = rate
+        self.burst = burst
+        self.idle_ttl = idle_ttl
+        self._buckets: Dict[str, List[float]] = {}  # key -> [tokens, last refill]
+        self._lock = Lock()
+        self._last_sweep = time.monotonic()
+        self.allowed = 0
+        self.throttled = 0
+        self.evicted = 0
+
+    def check(self, key: str, consume: bool = True) -> float:
+        """
+        Return 0 if ``key`` has a token (taking it when ``consume``), else the
+        seconds until one is available
+        """
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_sweep > self.idle_ttl:
+                self._sweep(now)
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(self.burst), now]
+            else:
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+            if bucket[0] >= 1:
+                if consume:
+                    bucket[0] -= 1
+                    self.allowed += 1
+                return 0.0
+            self.throttled += 1
+            return (1 - bucket[0]) / self.rate
+
+    def _sweep(self, now: float):
+        idle = [key for key, (_, last) in self._buckets.items() if now - last > self.idle_ttl]
+        for key in idle:
+            del self._buckets[key]
+        self.evicted += len(idle)
+        self._last_sweep = now
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "rate": self.rate,
+                "burst": self.burst,
+                "buckets": len(self._buckets),
+                "allowed": self.allowed,
+                "throttled": self.throttled,
+                "evicted": self.evicted,
+            }
+
+
+def parse_networks(spec: str) -> List[Union[ipaddress.IPv4Network, ipaddress.IPv6Network]]:
+    """Networks from a comma-separated list of addresses/CIDRs"""
+    return [ipaddress.ip_network(part.strip(), strict=False) for part in spec.split(",") if part.strip()]
+
+
+def _trusted(address: str, networks) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in networks)
+
+
+def client_ip(peer: Optional[str], forwarded_for: Optional[str], trusted) -> Optional[str]:
+    """
+    Address to rate limit: the peer, or - when the peer is a trusted proxy - the
+    nearest X-Forwarded-For hop that isn't one (earlier hops are client-supplied)
+    """
+    if not peer or not forwarded_for or not _trusted(peer, trusted):
+        return peer
+    for hop in reversed([h.strip() for h in forwarded_for.split(",") if h.strip()]):
+        if not _trusted(hop, trusted):
+            return hop
+    return peer
+
+
+class RequestThrottle:
+    """Session and client-IP limits applied together to /query and /ws messages"""
+
+    def __init__(self):
+        self.session = RateLimiter(settings.session_rate_limit, settings.session_rate_burst)
+        self.ip = RateLimiter(settings.ip_rate_limit, settings.ip_rate_burst)
+        self.trusted_proxies = parse_networks(settings.trusted_proxies)
+        self.events: Counter = Counter()
+        self._lock = Lock()
+
+    def check(self, session_id: Optional[str], client_ip: Optional[str], path: str) -> float:
+        """
+        Seconds the caller must wait (0 if the request may proceed). Tokens are
+        only taken when both limits allow the request, so a throttled session
+        doesn't use up its IP's quota.
+        """
+        limits = [(scope, limiter, key)
+                  for scope, limiter, key in (("ip", self.ip, client_ip), ("session", self.session, session_id))
+                  if key]
+        with self._lock:
+            retry_after = 0.0
+            for scope, limiter, key in limits:
+                wait = limiter.check(key, consume=False)
+                if wait:
+                    self.events[f"{path}:{scope}"] += 1
+                    retry_after = max(retry_after, wait)
+            if retry_after:
+                return retry_after
+            for _, limiter, key in limits:
+                limiter.check(key)
+        return 0.0
+
+    def client_ip(self, client, headers) -> Optional[str]:
+        """Client IP of a Starlette request or WebSocket (``client``, ``headers``)"""
+        return client_ip(client.host if client else None, headers.get("x-forwarded-for"), self.trusted_proxies)
+
+    @staticmethod
+    def retry_after_header(retry_after: float) -> str:
+        return str(max(1, math.ceil(retry_after)))
+
+    def stats(self) -> dict:
+        return {
+            "session": self.session.stats(),
+            "ip": self.ip.stats(),
+            "throttle_events": dict(self.events),
+        }
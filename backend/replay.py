@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Replay captured traces through the orchestrator
+
+Feeds queries recorded by TRACE_ENABLED back through
+CustomerSupportOrchestrator. Stand-in chat models replace Gemini: each one
+sleeps for the latency recorded for that node's LLM call and returns output
+of the recorded size, while routing labels and escalation verdicts follow
+the recorded route. Retrieval, the pre-screen, the FAQ fast path and the
+graph itself run for real, so orchestration changes can be compared
+against production traffic shapes without API calls.
+
+Usage: python replay.py data/traces.jsonl* [--concurrency 8] [--speed 1] [--limit 500]
+"""
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from typing import Any, List, Optional, Tuple
+import argparse
+import json
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from agents import CustomerSupportOrchestrator
+from config import settings
+from tracing import RequestTrace, activate
+
+_script: ContextVar[Optional["ReplayScript"]] = ContextVar("replay_script", default=None)
+
+
+class ReplayScript:
+    """Recorded LLM calls of one trace, handed out per node in order"""
+
+    def __init__(self, trace: dict, fallback_ms: dict):
+        self.trace = trace
+        self.fallback_ms = fallback_ms
+        self.calls = defaultdict(deque)
+        for call in trace.get("llm_calls", []):
+            self.calls[call["node"]].append(call)
+
+    def next_call(self, nodes: Tuple[str, ...]) -> Tuple[str, Optional[dict]]:
+        for node in nodes:
+            if self.calls[node]:
+                return node, self.calls[node].popleft()
+        return nodes[0], None
+
+    def content(self, node: str, call: Optional[dict]) -> str:
+        route = self.trace.get("route", [])
+        if node == "supervisor":
+            return route[1] if len(route) > 1 else "FINISH"
+        if node == "escalation_worker":
+            after = route[route.index("escalation_worker") + 1:] if "escalation_worker" in route else []
+            escalated = self.trace.get("escalation_needed") and "response_worker" not in after
+            return f"Escalation needed: {'yes' if escalated else 'no'}"
+        chars = (call or {}).get("output_chars") or 400
+        return ("lorem ipsum " * (chars // 12 + 1))[:chars]
+
+
+class ReplayChatModel(BaseChatModel):
+    """Chat model that replays recorded latency and output size"""
+
+    nodes: Tuple[str, ...]
+    model: str = "replay"
+    temperature: float = 0.0
+    latency_scale: float = 1.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        script = _script.get()
+        if script is None:
+            node, call = self.nodes[0], None
+            content, delay = "FINISH" if node == "supervisor" else "", 0.0
+        else:
+            node, call = script.next_call(self.nodes)
+            content = script.content(node, call)
+            delay = (call["ms"] if call else script.fallback_ms.get(node, 0.0)) / 1000
+        time.sleep(delay * self.latency_scale)
+
+        call = call or {}
+        usage = {
+            "input_tokens": call.get("input_tokens") or 0,
+            "output_tokens": call.get("output_tokens") or max(1, len(content) // 4),
+        }
+        usage["total_tokens"] = usage["input_tokens"] + usage["output_tokens"]
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content, usage_metadata=usage))])
+
+
+def load_traces(paths: List[str], limit: int = 0) -> List[dict]:
+    traces = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            traces.extend(json.loads(line) for line in f if line.strip())
+    traces.sort(key=lambda t: t["ts"])
+    return traces[:limit] if limit else traces
+
+
+def fallback_latencies(traces: List[dict]) -> dict:
+    """Median recorded latency per node, for calls the recording didn't make (e.g. memo hits)"""
+    samples = defaultdict(list)
+    for trace in traces:
+        for call in trace.get("llm_calls", []):
+            if not call.get("cached"):
+                samples[call["node"]].append(call["ms"])
+    return {node: statistics.median(values) for node, values in samples.items()}
+
+
+def synthetic_history(chars: int, turns: int) -> str:
+    if not chars:
+        return ""
+    turns = max(1, turns)
+    line = "x" * max(1, chars // turns - 6)
+    return "\n".join(f"{'User' if i % 2 == 0 else 'Assistant'}: {line}" for i in range(turns))[:chars]
+
+
+def make_orchestrator(latency_scale: float) -> CustomerSupportOrchestrator:
+    def stand_in(*nodes):
+        return ReplayChatModel(nodes=nodes, latency_scale=latency_scale)
+
+    models = {
+        "supervisor": stand_in("supervisor"),
+        "knowledge": stand_in("knowledge_worker"),
+        "response": stand_in("response_worker", "faq_polish"),
+        "escalation": stand_in("escalation_worker"),
+    }
+    if settings.response_cascade_enabled:
+        models["response_fast"] = stand_in("response_worker")
+    return CustomerSupportOrchestrator(models=models)
+
+
+def replay_one(orchestrator, trace: dict, fallback_ms: dict) -> dict:
+    recorded = RequestTrace(trace["query"], "")
+    token = _script.set(ReplayScript(trace, fallback_ms))
+    try:
+        history = synthetic_history(trace.get("context_chars", 0), trace.get("context_turns", 0))
+        with activate(recorded):
+            result = orchestrator.process_query(trace["query"], history)
+            recorded.finish(result)
+    finally:
+        _script.reset(token)
+    replayed = recorded.record
+    return {
+        "query": trace["query"],
+        "recorded_ms": trace.get("total_ms", 0.0),
+        "replayed_ms": replayed["total_ms"],
+        "recorded_path": trace.get("path"),
+        "replayed_path": replayed["path"],
+        "route_match": trace.get("route") == replayed["route"] and trace.get("path") == replayed["path"],
+        "chunks_match": trace.get("chunk_ids") == replayed["chunk_ids"],
+    }
+
+
+def percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] if values else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay captured request traces")
+    parser.add_argument("traces", nargs="+", help="trace JSONL files (including rotated ones)")
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--speed", type=float, default=0.0,
+                        help="replay arrival times at this multiple of real time (0: as fast as possible)")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="scale recorded LLM latencies")
+    parser.add_argument("--limit", type=int, default=0)
+    parser.add_argument("--out", help="write per-trace comparisons to this JSONL file")
+    args = parser.parse_args()
+
+    settings.trace_enabled = False  # don't capture the replay itself
+    settings.llm_cache_enabled = False
+    settings.llm_batching_enabled = False  # the batch thread wouldn't see the replay script
+    settings.escalation_queue_enabled = False  # replayed escalations mustn't reach the desk
+
+    traces = load_traces(args.traces, args.limit)
+    if not traces:
+        print("No traces found")
+        return
+    fallback_ms = fallback_latencies(traces)
+    orchestrator = make_orchestrator(args.latency_scale)
+
+    started = time.perf_counter()
+    first_ts = traces[0]["ts"]
+    results = []
+    lock = threading.Lock()
+
+    def run(trace):
+        if args.speed > 0:
+            delay = (trace["ts"] - first_ts) / args.speed - (time.perf_counter() - started)
+            if delay > 0:
+                time.sleep(delay)
+        outcome = replay_one(orchestrator, trace, fallback_ms)
+        with lock:
+            results.append(outcome)
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(run, traces))
+    elapsed = time.perf_counter() - started
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            for outcome in results:
+                f.write(json.dumps(outcome) + "\n")
+
+    recorded = [r["recorded_ms"] for r in results]
+    replayed = [r["replayed_ms"] for r in results]
+    paths = defaultdict(int)
+    for r in results:
+        paths[r["replayed_path"]] += 1
+    print(f"Replayed {len(results)} traces in {elapsed:.1f}s "
+          f"({len(results) / elapsed:.1f} req/s, concurrency {args.concurrency})")
+    print(f"paths: {dict(paths)}")
+    print(f"route match: {sum(r['route_match'] for r in results) / len(results):.1%}, "
+          f"retrieval match: {sum(r['chunks_match'] for r in results) / len(results):.1%}")
+    print(f"{'':<10}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for name, values in (("recorded", recorded), ("replayed", replayed)):
+        print(f"{name:<10}{statistics.mean(values):>10.1f}{percentile(values, 0.5):>10.1f}"
+              f"{percentile(values, 0.95):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
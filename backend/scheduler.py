@@ -0,0 +1,144 @@
+"""
+Priority-aware request scheduler with per-session fairness
+
+Sits in front of ``orchestrator.process_query``. Requests are queued by
+priority class (interactive before batch, escalation-flagged before routine);
+within a class each session has its own FIFO and sessions are served
+round-robin, so one chatty session can't starve the others. At most
+``concurrency`` requests run at once, in a dedicated thread pool, and each
+class holds at most ``max_queue`` waiting requests; beyond that ``submit``
+raises ``SchedulerFull`` so callers can shed load.
+
+All queue operations happen on the event loop, so no locking is needed.
+"""
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Optional
+import asyncio
+import time
+
+from config import settings
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+
+# Highest priority first
+PRIORITY_CLASSES = (
+    "interactive_escalation",
+    "interactive",
+    "batch_escalation",
+    "batch",
+)
+
+
+class SchedulerFull(Exception):
+    """The request's priority class already has ``max_queue`` requests waiting"""
+
+    def __init__(self, request_class: str):
+        super().__init__(f"Too many queued {request_class} requests")
+        self.request_class = request_class
+
+
+def priority_class(mode: str, escalation: bool) -> str:
+    """Priority class for a request mode (interactive/batch) and escalation flag"""
+    base = BATCH if mode == BATCH else INTERACTIVE
+    return f"{base}_escalation" if escalation else base
+
+
+class _Job:
+    __slots__ = ("call", "future", "enqueued_at", "request_class")
+
+    def __init__(self, call: Callable, future: asyncio.Future, request_class: str):
+        self.call = call
+        self.future = future
+        self.enqueued_at = time.perf_counter()
+        self.request_class = request_class
+
+
+class RequestScheduler:
+    """Runs submitted calls by priority class, round-robin across sessions"""
+
+    def __init__(self, concurrency: int = settings.scheduler_concurrency,
+                 max_queue: int = settings.scheduler_max_queue):
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.running = 0
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="scheduler")
+        self._queues = {cls: OrderedDict() for cls in PRIORITY_CLASSES}
+        self._depth = {cls: 0 for cls in PRIORITY_CLASSES}
+        self._stats = {
+            cls: {"submitted": 0, "started": 0, "rejected": 0, "wait_ms_total": 0.0, "wait_ms_max": 0.0}
+            for cls in PRIORITY_CLASSES
+        }
+
+    async def submit(self, fn: Callable, *args, fairness_key: str, request_class: str = INTERACTIVE,
+                     **kwargs):
+        """
+        Queue ``fn(*args, **kwargs)`` and wait for its result. ``fairness_key``
+        (e.g. the session ID) picks the round-robin queue; it isn't passed to ``fn``.
+        """
+        if self.max_queue and self._depth[request_class] >= self.max_queue:
+            self._stats[request_class]["rejected"] += 1
+            raise SchedulerFull(request_class)
+        loop = asyncio.get_running_loop()
+        job = _Job(partial(fn, *args, **kwargs), loop.create_future(), request_class)
+        self._queues[request_class].setdefault(fairness_key, deque()).append(job)
+        self._depth[request_class] += 1
+        self._stats[request_class]["submitted"] += 1
+        self._dispatch()
+        return await job.future
+
+    def _next_job(self) -> Optional[_Job]:
+        for request_class in PRIORITY_CLASSES:
+            sessions = self._queues[request_class]
+            while sessions:
+                key, jobs = sessions.popitem(last=False)
+                job = jobs.popleft()
+                self._depth[request_class] -= 1
+                if jobs:
+                    sessions[key] = jobs  # back of the round-robin
+                if not job.future.cancelled():
+                    return job
+        return None
+
+    def _dispatch(self):
+        while self.running < self.concurrency:
+            job = self._next_job()
+            if job is None:
+                return
+            self.running += 1
+            waited = (time.perf_counter() - job.enqueued_at) * 1000
+            stats = self._stats[job.request_class]
+            stats["started"] += 1
+            stats["wait_ms_total"] += waited
+            stats["wait_ms_max"] = max(stats["wait_ms_max"], waited)
+
+            loop = asyncio.get_running_loop()
+            task = loop.run_in_executor(self._executor, job.call)
+            task.add_done_callback(partial(self._finish, job))
+
+    def _finish(self, job: _Job, task: asyncio.Future):
+        self.running -= 1
+        if not job.future.cancelled():
+            if task.exception() is not None:
+                job.future.set_exception(task.exception())
+            else:
+                job.future.set_result(task.result())
+        self._dispatch()
+
+    def stats(self) -> dict:
+        classes = {}
+        for request_class, sessions in self._queues.items():
+            s = self._stats[request_class]
+            classes[request_class] = {
+                "queue_depth": self._depth[request_class],
+                "waiting_sessions": len(sessions),
+                "submitted": s["submitted"],
+                "started": s["started"],
+                "rejected": s["rejected"],
+                "avg_wait_ms": s["wait_ms_total"] / s["started"] if s["started"] else 0.0,
+                "max_wait_ms": s["wait_ms_max"],
+            }
+        return {"concurrency": self.concurrency, "max_queue": self.max_queue, "running": self.running,
+                "classes": classes}
@@ -0,0 +1,216 @@
+"""
+Chat session storage
+
+``memory`` keeps sessions in a per-process dict (single worker only).
+``sqlite`` keeps them in a local SQLite file in WAL mode so every uvicorn
+worker on the host sees the same sessions.
+
+Messages are stored compactly - an integer role code and an epoch timestamp -
+and every message gets an ID that only ever increases, so history can be
+paged with ``before``/``after`` cursors and a session's state is identified
+by (message count, last ID) for ETags. ``to_wire`` is the message format of
+the history API; replies that have just stored an exchange only return
+``to_ref`` (ID, role, ts), since the client already has the text.
+"""
+from bisect import bisect_left, bisect_right
+from itertools import count
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import sqlite3
+import sys
+import threading
+import time
+
+from config import settings
+
+ROLE_USER = 0
+ROLE_ASSISTANT = 1
+ROLE_NAMES = {ROLE_USER: "User", ROLE_ASSISTANT: "Assistant"}
+
+# (id, role, content, ts)
+Message = Tuple[int, int, str, float]
+
+
+def to_wire(message: Message) -> dict:
+    """API representation of a stored message"""
+    message_id, role, content, ts = message
+    return {"id": message_id, "role": role, "content": content, "ts": round(ts, 3)}
+
+
+def to_ref(message: Message) -> dict:
+    """ID, role and timestamp of a stored message, without its text"""
+    message_id, role, _, ts = message
+    return {"id": message_id, "role": role, "ts": round(ts, 3)}
+
+
+def history_text(messages: List[Message]) -> str:
+    """Render messages as the chat-history string the orchestrator expects"""
+    return "\n".join(f"{ROLE_NAMES[role]}: {content}" for _, role, content, _ in messages)
+
+
+def new_turn(query: str, response: str) -> List[Tuple[int, str, float]]:
+    """(role, content, ts) pairs for one question/answer exchange"""
+    now = time.time()
+    return [(ROLE_USER, query, now), (ROLE_ASSISTANT, response, now)]
+
+
+class MemorySessionStore:
+    """Sessions held in this process's memory"""
+
+    def __init__(self):
+        self._sessions: Dict[str, List[Message]] = {}
+        self._ids = count(1)  # process-wide, so IDs aren't reused after a delete
+
+    def recent(self, session_id: str, limit: int) -> List[Message]:
+        return self._sessions.get(session_id, [])[-limit:] if limit > 0 else []
+
+    def page(self, session_id: str, before: Optional[int] = None, after: Optional[int] = None,
+             limit: int = settings.session_page_size) -> Tuple[List[Message], bool]:
+        """Up to ``limit`` messages after ``after`` (oldest first) or else before
+        ``before`` (newest page); also returns whether more lie in that direction"""
+        history = self._sessions.get(session_id, [])
+        lo = bisect_right(history, after, key=lambda m: m[0]) if after is not None else 0
+        hi = bisect_left(history, before, key=lambda m: m[0]) if before is not None else len(history)
+        if after is not None:
+            return history[lo:min(hi, lo + limit)], hi - lo > limit
+        return history[max(lo, hi - limit):hi], hi - lo > limit
+
+    def version(self, session_id: str) -> Optional[Tuple[int, int]]:
+        """(message count, last message ID), or None for an unknown session"""
+        history = self._sessions.get(session_id)
+        return (len(history), history[-1][0]) if history else None
+
+    def exists(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def append(self, session_id: str, messages: List[Tuple[int, str, float]]) -> List[Message]:
+        """Store (role, content, ts) messages; returns them with their IDs"""
+        stored = [(next(self._ids), role, content, ts) for role, content, ts in messages]
+        self._sessions.setdefault(session_id, []).extend(stored)
+        return stored
+
+    def delete(self, session_id: str) -> bool:
+        return self._sessions.pop(session_id, None) is not None
+
+    def usage(self) -> dict:
+        """Session/message counts and approximate bytes held"""
+        messages = 0
+        size = sys.getsizeof(self._sessions)
+        for session_id, history in list(self._sessions.items()):
+            messages += len(history)
+            size += sys.getsizeof(session_id) + sys.getsizeof(history)
+            for message in history:
+                size += sys.getsizeof(message) + sum(sys.getsizeof(v) for v in message)
+        return {"backend": "memory", "sessions": len(self._sessions), "messages": messages, "bytes": size}
+
+
+class SqliteSessionStore:
+    """Sessions in a SQLite database shared by all local worker processes"""
+
+    def __init__(self, path: str = settings.session_db_path):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS messages ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " session_id TEXT NOT NULL,"
+                " role INTEGER NOT NULL,"
+                " content TEXT NOT NULL,"
+                " ts REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_messages_session ON messages (session_id, id)"
+            )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def recent(self, session_id: str, limit: int) -> List[Message]:
+        rows = self._conn().execute(
+            "SELECT id, role, content, ts FROM messages WHERE session_id = ?"
+            " ORDER BY id DESC LIMIT ?",
+            (session_id, max(limit, 0))
+        ).fetchall()
+        return rows[::-1]
+
+    def page(self, session_id: str, before: Optional[int] = None, after: Optional[int] = None,
+             limit: int = settings.session_page_size) -> Tuple[List[Message], bool]:
+        """Up to ``limit`` messages after ``after`` (oldest first) or else before
+        ``before`` (newest page); also returns whether more lie in that direction"""
+        where, params = "session_id = ?", [session_id]
+        if after is not None:
+            where += " AND id > ?"
+            params.append(after)
+        if before is not None:
+            where += " AND id < ?"
+            params.append(before)
+        order = "ASC" if after is not None else "DESC"
+        rows = self._conn().execute(
+            f"SELECT id, role, content, ts FROM messages WHERE {where}"
+            f" ORDER BY id {order} LIMIT ?",
+            (*params, limit + 1)
+        ).fetchall()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return (rows if after is not None else rows[::-1]), has_more
+
+    def version(self, session_id: str) -> Optional[Tuple[int, int]]:
+        """(message count, last message ID), or None for an unknown session"""
+        count_, last_id = self._conn().execute(
+            "SELECT COUNT(*), MAX(id) FROM messages WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return (count_, last_id) if count_ else None
+
+    def exists(self, session_id: str) -> bool:
+        row = self._conn().execute(
+            "SELECT 1 FROM messages WHERE session_id = ? LIMIT 1", (session_id,)
+        ).fetchone()
+        return row is not None
+
+    def append(self, session_id: str, messages: List[Tuple[int, str, float]]) -> List[Message]:
+        """Store (role, content, ts) messages; returns them with their IDs"""
+        conn = self._conn()
+        stored = []
+        with conn:
+            for role, content, ts in messages:
+                cursor = conn.execute(
+                    "INSERT INTO messages (session_id, role, content, ts) VALUES (?, ?, ?, ?)",
+                    (session_id, role, content, ts)
+                )
+                stored.append((cursor.lastrowid, role, content, ts))
+        return stored
+
+    def delete(self, session_id: str) -> bool:
+        conn = self._conn()
+        with conn:
+            cursor = conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+        return cursor.rowcount > 0
+
+    def usage(self) -> dict:
+        """Session/message counts and database file size (held on disk, not in RAM)"""
+        conn = self._conn()
+        sessions, messages = conn.execute(
+            "SELECT COUNT(DISTINCT session_id), COUNT(*) FROM messages"
+        ).fetchone()
+        page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        return {"backend": "sqlite", "sessions": sessions, "messages": messages,
+                "file_bytes": page_count * page_size}
+
+
+def create_session_store():
+    """Build the session store selected by ``settings.session_store``"""
+    if settings.session_store == "memory":
+        return MemorySessionStore()
+    if settings.session_store == "sqlite":
+        return SqliteSessionStore(settings.session_db_path)
+    raise ValueError(f"Unknown session store: {settings.session_store}")
@@ -61,7 +61,7 @@ GOOGLE_API_KEY={api_key}
 
 # Optional: Customize these if needed
 # KNOWLEDGE_PATH=../knowledge
-# CHROMA_DB_PATH=./chroma_db
+# INDEX_PATH=./knowledge_index
 """
     
     env_path = Path(".env")
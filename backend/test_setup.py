@@ -31,7 +31,6 @@ def test_imports():
         ("langgraph", "LangGraph"),
         ("langchain_openai", "LangChain OpenAI"),
         ("langchain_community", "LangChain Community"),
-        ("chromadb", "ChromaDB"),
         ("sentence_transformers", "Sentence Transformers"),
         ("dotenv", "Python Dotenv"),
     ]
@@ -247,7 +246,7 @@ def test_config():
         
         print_status("Configuration loaded successfully", "success")
         print_status(f"Knowledge Path: {settings.knowledge_path}", "info")
-        print_status(f"ChromaDB Path: {settings.chroma_db_path}", "info")
+        print_status(f"Index Path: {settings.index_path}", "info")
         
         # Check if API key is loaded
         if settings.google_api_key:
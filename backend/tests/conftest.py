@@ -0,0 +1,66 @@
+"""
+Shared test setup
+
+Settings bind their defaults at import time, so every path the code writes to
+is pointed at a scratch directory before any backend module is imported.
+"""
+from pathlib import Path
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+BACKEND = Path(__file__).resolve().parent.parent
+SCRATCH = Path(tempfile.mkdtemp(prefix="support-tests-"))
+
+os.environ.update({
+    "GOOGLE_API_KEY": "test",
+    "KNOWLEDGE_PATH": str(SCRATCH / "knowledge"),
+    "INDEX_PATH": str(SCRATCH / "knowledge_index"),
+    "SESSION_DB_PATH": str(SCRATCH / "sessions.db"),
+    "ESCALATION_QUEUE_PATH": str(SCRATCH / "escalations.db"),
+    "ESCALATION_INBOX_PATH": str(SCRATCH / "escalation_inbox.jsonl"),
+    "TRACE_PATH": str(SCRATCH / "traces.jsonl"),
+})
+sys.path.insert(0, str(BACKEND))
+
+
+@pytest.fixture
+def knowledge_dir():
+    """The (emptied) folder KNOWLEDGE_PATH points at"""
+    path = SCRATCH / "knowledge"
+    shutil.rmtree(path, ignore_errors=True)
+    path.mkdir(parents=True)
+    yield path
+    shutil.rmtree(path, ignore_errors=True)
+
+
+@pytest.fixture
+def embeddings():
+    from langchain_core.embeddings import DeterministicFakeEmbedding
+
+    return DeterministicFakeEmbedding(size=384)
+
+
+@pytest.fixture
+def make_orchestrator(monkeypatch, embeddings):
+    """Builds a CustomerSupportOrchestrator with stand-in models and no knowledge base"""
+    from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+    from agents import CustomerSupportOrchestrator
+    from config import settings
+
+    for flag in ("node_cache_enabled", "llm_cache_enabled", "llm_batching_enabled", "response_cascade_enabled",
+                 "trace_enabled", "escalation_queue_enabled", "faq_fast_path"):
+        monkeypatch.setattr(settings, flag, False)
+
+    def make(supervisor: str = "knowledge_worker", answer: str = "Returns are accepted within 30 days."):
+        model = FakeListChatModel(responses=[answer])
+        return CustomerSupportOrchestrator(
+            models={"supervisor": FakeListChatModel(responses=[supervisor]),
+                    "knowledge": model, "response": model, "escalation": model},
+            embeddings=embeddings
+        )
+    return make
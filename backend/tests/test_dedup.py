@@ -0,0 +1,68 @@
+"""MinHash near-duplicate collapsing"""
+import os
+import random
+
+from dedup import chunk_sources, collapse_duplicates, near_duplicate_groups
+from knowledge_base import refresh_index
+
+WORDS = ("order refund parcel courier warranty invoice account label carrier return exchange store "
+         "credit receipt payment address tracking delivery package customer support item size colour").split()
+
+
+def prose(seed: int, words: int = 200) -> str:
+    rng = random.Random(seed)
+    return " ".join(rng.choice(WORDS) + str(rng.randint(0, 9)) for _ in range(words))
+
+
+def chunk(chunk_id: str, text: str, source: str) -> dict:
+    return {"id": chunk_id, "text": text, "metadata": {"id": chunk_id, "source": source}}
+
+
+def test_distinct_texts_are_not_grouped():
+    assert near_duplicate_groups([prose(i) for i in range(20)]) == []
+
+
+def test_near_duplicates_collapse_into_the_earliest_chunk():
+    boilerplate = prose(1)
+    edited = boilerplate.replace(boilerplate.split()[100], "changed", 1)
+    chunks = [
+        chunk("a", prose(0), "faq.txt"),
+        chunk("b", boilerplate, "returns.txt"),
+        chunk("c", prose(2), "shipping.txt"),
+        chunk("d", edited, "shipping.txt"),
+        chunk("e", boilerplate, "privacy.txt"),
+    ]
+
+    survivors, report = collapse_duplicates(chunks)
+
+    assert [c["id"] for c in survivors] == ["a", "b", "c"]
+    assert chunk_sources(survivors[1]) == ["returns.txt", "shipping.txt", "privacy.txt"]
+    assert survivors[1]["metadata"]["duplicate_ids"] == ["d", "e"]
+    assert report["removed"] == 2
+    assert report["text_bytes_saved"] == len(edited.encode()) + len(boilerplate.encode())
+
+
+def test_threshold_controls_what_counts_as_duplicate():
+    text = prose(3)
+    words = text.split()
+    half_changed = " ".join(words[:100] + prose(4).split()[100:])
+
+    assert near_duplicate_groups([text, half_changed], threshold=0.95) == []
+    assert collapse_duplicates([chunk("a", text, "a.txt"), chunk("b", text, "b.txt")], threshold=1.0)[1]["removed"] == 1
+
+
+def test_changing_one_source_of_a_shared_chunk_keeps_it_for_the_other(knowledge_dir, tmp_path, embeddings):
+    shared = prose(5, 100)
+    (knowledge_dir / "returns.txt").write_text(prose(6, 100) + "\n\n" + shared)
+    (knowledge_dir / "shipping.txt").write_text(prose(7, 100) + "\n\n" + shared)
+    for name in ("returns.txt", "shipping.txt"):
+        os.utime(knowledge_dir / name, (1000, 1000))
+    first = refresh_index(None, embeddings, tmp_path)
+    assert any(len(chunk_sources(c)) == 2 for c in first.chunks)
+
+    (knowledge_dir / "returns.txt").write_text(prose(8, 100))
+    second = refresh_index(first, embeddings, tmp_path)
+
+    holders = [c for c in second.chunks if shared in c["text"]]
+    assert holders and all(os.path.basename(s) == "shipping.txt" for c in holders for s in chunk_sources(c))
+    assert len(second.vectors) == len(second.chunks)
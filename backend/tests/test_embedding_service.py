@@ -0,0 +1,32 @@
+"""Embedding service forward-pass size"""
+import numpy as np
+
+import embedding_service
+
+
+class FakeModel:
+    """Splits like SentenceTransformer.encode and records each forward pass"""
+
+    def __init__(self):
+        self.passes = []
+
+    def encode(self, texts, batch_size=32):
+        vectors = []
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start:start + batch_size]
+            self.passes.append(len(batch))
+            vectors.extend([float(len(text)), 1.0] for text in batch)
+        return np.asarray(vectors)
+
+
+def test_large_requests_are_encoded_in_bounded_passes(monkeypatch):
+    model = FakeModel()
+    monkeypatch.setattr(embedding_service, "_model", model)
+    texts = [f"text {i}" for i in range(150)]
+
+    vectors = embedding_service._encode(texts, batch_size=64)
+
+    assert model.passes == [64, 64, 22]
+    assert vectors.dtype == np.float32
+    assert vectors.shape == (150, 2)
+    assert vectors[149, 0] == len("text 149")
@@ -0,0 +1,123 @@
+"""Escalation queue leases, retries and dead-lettering"""
+import json
+import time
+
+import pytest
+
+import escalation_queue
+from escalation_queue import DEAD, DONE, PENDING, DeskNotifier, EscalationQueue, EscalationWorkers, build_ticket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(escalation_queue, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def queue(tmp_path, clock):
+    return EscalationQueue(str(tmp_path / "escalations.db"), max_attempts=3, retry_base=10, lease_seconds=60)
+
+
+def test_jobs_are_claimed_in_order_and_leased(queue, clock):
+    first = queue.enqueue({"query": "I want a refund now", "session_id": "s1"})
+    second = queue.enqueue({"query": "my account was hacked", "session_id": "s2"})
+
+    job = queue.claim()
+    assert (job["id"], job["attempts"], job["query"]) == (first, 1, "I want a refund now")
+    assert queue.claim()["id"] == second
+    assert queue.claim() is None
+
+    # a worker that died mid-flight loses its lease
+    clock.now += 61
+    reclaimed = queue.claim()
+    assert (reclaimed["id"], reclaimed["attempts"]) == (first, 2)
+
+
+def test_failures_back_off_then_park_the_job(queue, clock):
+    job_id = queue.enqueue({"query": "lawsuit"})
+
+    job = queue.claim()
+    queue.fail(job, "desk down")
+    assert queue.claim() is None
+    clock.now += 10
+    job = queue.claim()
+    assert job["attempts"] == 2
+
+    queue.fail(job, "desk down")
+    clock.now += 19
+    assert queue.claim() is None  # second retry waits twice as long
+    clock.now += 1
+    job = queue.claim()
+    assert job["attempts"] == 3
+
+    queue.fail(job, "desk still down")
+    clock.now += 1000
+    assert queue.claim() is None
+    dead = queue.jobs(DEAD)
+    assert [(j["id"], j["attempts"], j["last_error"]) for j in dead] == [(job_id, 3, "desk still down")]
+
+    stats = queue.stats()
+    assert (stats[PENDING], stats[DEAD]) == (0, 1)
+    assert stats["totals"]["retries"] == 2
+    assert stats["totals"]["dead"] == 1
+
+
+def test_completed_jobs_leave_the_backlog(queue, clock):
+    job_id = queue.enqueue({"query": "I will sue"})
+    clock.now += 2
+    assert queue.stats()["lag_seconds"] == 2
+
+    job = queue.claim()
+    clock.now += 1
+    queue.complete(job)
+
+    stats = queue.stats()
+    assert (stats[PENDING], stats["processing"], stats[DONE]) == (0, 0, 1)
+    assert stats["lag_seconds"] == 0.0
+    assert stats["delivered_last_minute"] == 1
+    assert stats["avg_handoff_seconds"] == 3
+    assert queue.jobs(DONE)[0]["id"] == job_id
+
+
+def test_build_ticket_reads_the_assessed_priority():
+    job = {"id": 7, "created_at": 1.0, "query": "refund", "rules": ["refund_demand"], "session_id": "s1"}
+    assert build_ticket(job, "**Priority Level**: Medium")["priority"] == "medium"
+    assert build_ticket(job, "no priority given")["priority"] == "high"
+    assert build_ticket(job, "")["triggers"] == ["refund_demand"]
+
+
+def test_workers_retry_and_deliver(tmp_path):
+    queue = EscalationQueue(str(tmp_path / "escalations.db"), max_attempts=3, retry_base=0.01, lease_seconds=60)
+    notifier = DeskNotifier(webhook_url="", inbox_path=str(tmp_path / "inbox.jsonl"))
+    calls = []
+
+    def handler(job):
+        calls.append(job["attempts"])
+        if len(calls) == 1:
+            raise ConnectionError("desk unavailable")
+        notifier.notify(build_ticket(job, "Priority Level: low"))
+
+    workers = EscalationWorkers(queue, handler, workers=1, poll_interval=0.01)
+    job_id = queue.enqueue({"query": "cancel my account or I call my lawyer", "session_id": "s1"})
+    workers.start()
+    try:
+        deadline = time.monotonic() + 5
+        while queue.stats()[DONE] == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        workers.stop()
+
+    assert calls == [1, 2]
+    assert queue.jobs(DONE)[0]["last_error"] is None
+    tickets = [json.loads(line) for line in (tmp_path / "inbox.jsonl").read_text().splitlines()]
+    assert [(t["ticket_id"], t["priority"]) for t in tickets] == [(job_id, "low")]
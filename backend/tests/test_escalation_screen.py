@@ -0,0 +1,93 @@
+"""Escalation pre-screen decisions and the skip-benign routing switch"""
+import pytest
+
+from config import Settings, settings
+from escalation_screen import BENIGN, ESCALATE, REVIEW, EscalationScreen
+
+
+@pytest.fixture(scope="module")
+def screen():
+    return EscalationScreen()
+
+
+@pytest.mark.parametrize("query, rule", [
+    ("I will sue you over this", "legal_action"),
+    ("I'm going to sue if this isn't fixed", "legal_action"),
+    ("My lawyer will be in touch", "legal_action"),
+    ("I am reporting you to the BBB", "regulator"),
+    ("I'll file a complaint with the consumer protection office", "regulator"),
+    ("My account was hacked last night", "account_compromise"),
+    ("There is an unauthorized charge on my card", "fraud"),
+    ("I want a full refund right now", "refund_demand"),
+    ("I will file a chargeback", "refund_demand"),
+    ("Let me speak to a manager", "human_request"),
+])
+def test_threats_and_demands_escalate(screen, query, rule):
+    result = screen.screen(query, record=False)
+    assert result.decision == ESCALATE
+    assert rule in result.rules
+
+
+@pytest.mark.parametrize("query", [
+    "What is your refund policy?",
+    "Is it legal to resell items I bought from you?",
+    "How do I report fraud on a marketplace listing?",
+    "What happens with a chargeback?",
+    "Do you comply with GDPR?",
+    "My package arrived damaged",
+    "I can't log in to the app",
+])
+def test_topic_words_are_only_reviewed(screen, query):
+    assert screen.screen(query, record=False).decision == REVIEW
+
+
+@pytest.mark.parametrize("query", [
+    "What are your shipping times?",
+    "How do I track my order?",
+    "I'll pursue this with the courier, no issue",
+    "Thanks for the courtesy call",
+    "",
+])
+def test_ordinary_questions_are_benign(screen, query):
+    assert screen.screen(query, record=False) == (BENIGN, [])
+
+
+def test_counters_and_custom_rules():
+    screen = EscalationScreen([
+        {"name": "chargeback", "pattern": r"\bchargeback\b", "action": ESCALATE},
+        {"name": "pricing", "pattern": r"\bprice\b", "action": REVIEW},
+    ])
+    screen.screen("What is the price?")
+    screen.screen("Price aside, I want a chargeback")
+    screen.screen("hello", record=False)
+
+    stats = screen.stats()
+    assert stats["decisions"] == {REVIEW: 1, ESCALATE: 1}
+    assert stats["rule_hits"] == {"chargeback": 1, "pricing": 2}
+    with pytest.raises(ValueError):
+        EscalationScreen([{"name": "bad", "pattern": "x", "action": "drop"}])
+
+
+def test_skip_benign_is_off_by_default():
+    assert Settings.model_fields["escalation_skip_benign"].default is False
+
+
+@pytest.mark.parametrize("skip_benign, decision, expected", [
+    (False, BENIGN, "escalation_worker"),
+    (True, BENIGN, "knowledge_worker"),
+    (True, REVIEW, "escalation_worker"),
+])
+def test_skip_benign_routing(make_orchestrator, monkeypatch, skip_benign, decision, expected):
+    monkeypatch.setattr(settings, "escalation_skip_benign", skip_benign)
+    orchestrator = make_orchestrator(supervisor="escalation_worker")
+    state = {"query": "Where is my parcel?", "chat_history": "", "screen_decision": decision}
+
+    assert orchestrator.supervisor_node(state)["next_worker"] == expected
+
+
+def test_prescreened_escalation_skips_the_graph(make_orchestrator):
+    orchestrator = make_orchestrator(supervisor="knowledge_worker")
+    result = orchestrator.process_query("I will sue you", session_id="s1")
+
+    assert result["escalation_needed"] is True
+    assert orchestrator.supervisor_stats["decisions"] == 0
@@ -0,0 +1,52 @@
+"""Background knowledge reloads"""
+import threading
+from types import SimpleNamespace
+
+import knowledge_reload
+from knowledge_reload import KnowledgeReloader
+
+
+def wait_idle(reloader: KnowledgeReloader, timeout: float = 5.0):
+    assert reloader._lock.acquire(timeout=timeout)
+    reloader._lock.release()
+    assert not reloader.in_progress
+
+
+def test_only_one_reload_runs_at_a_time(monkeypatch, tmp_path):
+    started, release = threading.Event(), threading.Event()
+    new_index = SimpleNamespace(version="v2", manifest={})
+
+    def slow_refresh(current, embeddings, root):
+        started.set()
+        release.wait(5)
+        return new_index
+
+    monkeypatch.setattr(knowledge_reload, "refresh_index", slow_refresh)
+    orchestrator = SimpleNamespace(vector_store=None, embeddings=None)
+    reloader = KnowledgeReloader(orchestrator, interval=0)
+
+    assert reloader.trigger() is True
+    assert reloader.status()["in_progress"] is True
+    assert started.wait(5)
+    assert reloader.trigger() is False
+    assert reloader.reload() is False
+
+    release.set()
+    wait_idle(reloader)
+    assert orchestrator.vector_store is new_index
+    assert reloader.status()["reloads"] == 1
+    assert reloader.trigger() is True
+    wait_idle(reloader)
+
+
+def test_reload_picks_up_knowledge_changes(knowledge_dir, embeddings, monkeypatch, tmp_path):
+    orchestrator = SimpleNamespace(vector_store=None, embeddings=embeddings)
+    reloader = KnowledgeReloader(orchestrator, interval=0)
+    monkeypatch.setattr(reloader, "root", tmp_path)
+    (knowledge_dir / "returns.txt").write_text("Items can be returned within 30 days of delivery.")
+
+    assert reloader._is_stale()
+    assert reloader.reload() is True
+    assert reloader.version == "v1"
+    assert not reloader._is_stale()
+    assert reloader.status()["last_error"] is None
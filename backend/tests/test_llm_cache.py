@@ -0,0 +1,56 @@
+"""LLM call cache size accounting and LRU eviction"""
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import HumanMessage
+
+import llm_cache
+from llm_cache import LLMCallCache
+
+LLM = FakeListChatModel(responses=["unused"])
+
+
+def prompt(i: int):
+    return [HumanMessage(content=f"question {i}")]
+
+
+def table_bytes(cache: LLMCallCache) -> int:
+    return cache._conn().execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+
+
+def test_inserts_do_not_scan_the_table(tmp_path):
+    cache = LLMCallCache(str(tmp_path / "cache.db"), max_bytes=1_000_000)
+    statements = []
+    cache._conn().set_trace_callback(statements.append)
+
+    for i in range(50):
+        cache.put(LLM, prompt(i), "supervisor", "answer")
+
+    assert not any("SUM(" in s or "ORDER BY" in s for s in statements)
+    assert cache._bytes == table_bytes(cache)
+
+
+def test_replacing_an_entry_counts_its_size_once(tmp_path):
+    cache = LLMCallCache(str(tmp_path / "cache.db"), max_bytes=1_000_000)
+    cache.put(LLM, prompt(1), "supervisor", "short")
+    cache.put(LLM, prompt(1), "supervisor", "a much longer answer")
+
+    assert cache._bytes == table_bytes(cache)
+    assert LLMCallCache(str(tmp_path / "cache.db"))._bytes == cache._bytes  # seeded at open
+
+
+def test_evicts_least_recently_used_below_the_limit(tmp_path, monkeypatch):
+    clock = iter(range(1, 10_000))
+    monkeypatch.setattr(llm_cache.time, "time", lambda: next(clock))
+    entry = len("0" * 64) + len("x" * 36)  # key + content
+    cache = LLMCallCache(str(tmp_path / "cache.db"), max_bytes=10 * entry)
+
+    for i in range(10):
+        cache.put(LLM, prompt(i), "supervisor", "x" * 36)
+    assert cache.get(LLM, prompt(0), "supervisor") == "x" * 36  # now the most recently used
+    cache.put(LLM, prompt(10), "supervisor", "x" * 36)
+
+    assert cache._bytes == table_bytes(cache) <= 10 * entry * llm_cache.EVICT_TO
+    assert cache.get(LLM, prompt(0), "supervisor") is not None
+    assert cache.get(LLM, prompt(10), "supervisor") is not None
+    assert cache.get(LLM, prompt(1), "supervisor") is None
+    assert cache.get(LLM, prompt(2), "supervisor") is None
+    assert cache.stats()["entries"] == 9
@@ -0,0 +1,61 @@
+"""int8 index quantisation and re-ranked search"""
+import numpy as np
+import pytest
+
+from config import settings
+from knowledge_base import VectorIndex, _normalize, _top_k, open_index
+from quantization import CODES_FILE, Int8Vectors
+
+
+@pytest.fixture
+def vectors():
+    rng = np.random.default_rng(0)
+    return _normalize(rng.standard_normal((500, 64)).astype(np.float32))
+
+
+def test_scores_approximate_exact_dot_products(vectors):
+    quantized = Int8Vectors.from_vectors(vectors)
+    query = vectors[7]
+
+    assert quantized.codes.dtype == np.int8
+    assert quantized.nbytes < vectors.nbytes / 3
+    np.testing.assert_allclose(quantized.scores(query), vectors @ query, atol=0.02)
+
+
+def test_save_and_load(vectors, tmp_path):
+    assert Int8Vectors.load(tmp_path) is None
+
+    Int8Vectors.from_vectors(vectors).save(tmp_path)
+    loaded = Int8Vectors.load(tmp_path)
+    np.testing.assert_array_equal(loaded.codes, Int8Vectors.from_vectors(vectors).codes)
+
+
+def test_rerank_matches_exact_search(vectors):
+    index = VectorIndex(vectors, [], embeddings=None, quantized=Int8Vectors.from_vectors(vectors))
+    rng = np.random.default_rng(1)
+    for query in _normalize(vectors[:50] + 0.05 * rng.standard_normal((50, 64)).astype(np.float32)):
+        exact = _top_k(vectors @ query, 5)
+        np.testing.assert_array_equal(index._quantized_search(query, 5, rerank=50), exact)
+        assert set(index._quantized_search(query, 5, rerank=0)) & set(exact)
+
+
+def test_published_int8_index_is_memory_mapped(knowledge_dir, tmp_path, embeddings, monkeypatch):
+    monkeypatch.setattr(settings, "index_quantization", "int8")
+    (knowledge_dir / "policy.txt").write_text(
+        "\n\n".join(f"policy rule {i}: orders of type {i * 7} follow schedule {i % 5}." for i in range(80))
+    )
+
+    index = open_index(embeddings, mode="auto", root=tmp_path)
+
+    assert (tmp_path / index.version / CODES_FILE).exists()
+    assert isinstance(index.vectors, np.memmap)
+    assert index.quantized is not None
+    assert index.manifest["quantization"] == "int8"
+
+    exact = np.asarray(index.vectors)
+    for i in range(0, len(index.chunks), 3):
+        query = np.asarray(embeddings.embed_query(index.chunks[i]["text"]), dtype=np.float32)
+        query /= np.linalg.norm(query)
+        np.testing.assert_array_equal(index._quantized_search(query, 3, rerank=len(index.chunks)),
+                                      _top_k(exact @ query, 3))
+        assert index.similarity_search_by_vector(query, k=1)[0].page_content == index.chunks[i]["text"]
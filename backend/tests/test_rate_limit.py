@@ -0,0 +1,123 @@
+"""Token-bucket refill and the combined session/IP throttle"""
+import pytest
+from pydantic import ValidationError
+
+import rate_limit
+from config import Settings, settings
+from rate_limit import RateLimiter, RequestThrottle, client_ip, parse_networks
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limit, "time", clock)
+    return clock
+
+
+def test_burst_then_refill(clock):
+    limiter = RateLimiter(rate=2.0, burst=3)
+
+    assert [limiter.check("s1") for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert limiter.check("s1") == pytest.approx(0.5)
+
+    clock.now += 0.5
+    assert limiter.check("s1") == 0.0
+    assert limiter.check("s1") == pytest.approx(0.5)
+
+    clock.now += 60  # refill stops at the burst size
+    assert [limiter.check("s1") for _ in range(4)][-1] == pytest.approx(0.5)
+    assert limiter.check("s2") == 0.0  # keys are independent
+
+
+def test_check_without_consuming(clock):
+    limiter = RateLimiter(rate=1.0, burst=1)
+
+    assert limiter.check("s1", consume=False) == 0.0
+    assert limiter.check("s1", consume=False) == 0.0
+    assert limiter.check("s1") == 0.0
+    assert limiter.check("s1", consume=False) == pytest.approx(1.0)
+    assert limiter.stats()["allowed"] == 1
+
+
+def test_idle_buckets_are_evicted(clock):
+    limiter = RateLimiter(rate=1.0, burst=1, idle_ttl=10)
+    limiter.check("old")
+    clock.now += 11
+    limiter.check("new")
+
+    stats = limiter.stats()
+    assert stats["buckets"] == 1
+    assert stats["evicted"] == 1
+
+
+def test_throttled_session_does_not_spend_ip_tokens(clock, monkeypatch):
+    monkeypatch.setattr(settings, "session_rate_limit", 1.0)
+    monkeypatch.setattr(settings, "session_rate_burst", 1)
+    monkeypatch.setattr(settings, "ip_rate_limit", 1.0)
+    monkeypatch.setattr(settings, "ip_rate_burst", 3)
+    throttle = RequestThrottle()
+
+    assert throttle.check("chatty", "10.0.0.1", "/query") == 0.0
+    for _ in range(5):
+        assert throttle.check("chatty", "10.0.0.1", "/query") == pytest.approx(1.0)
+
+    # the other two IP tokens are still there for other sessions behind the same IP
+    assert throttle.check("quiet-1", "10.0.0.1", "/query") == 0.0
+    assert throttle.check("quiet-2", "10.0.0.1", "/query") == 0.0
+    assert throttle.check("quiet-3", "10.0.0.1", "/query") == pytest.approx(1.0)
+
+    stats = throttle.stats()
+    assert stats["throttle_events"] == {"/query:session": 5, "/query:ip": 1}
+    assert stats["ip"]["allowed"] == 3
+
+
+def test_throttle_without_session_or_ip(clock, monkeypatch):
+    monkeypatch.setattr(settings, "ip_rate_limit", 1.0)
+    monkeypatch.setattr(settings, "ip_rate_burst", 1)
+    throttle = RequestThrottle()
+
+    assert throttle.check(None, None, "/ws") == 0.0
+    assert throttle.check(None, "10.0.0.2", "/ws") == 0.0
+    assert throttle.check(None, "10.0.0.2", "/ws") == pytest.approx(1.0)
+
+
+@pytest.mark.parametrize("rate, burst", [(0, 5), (-1.0, 5), (1.0, 0)])
+def test_non_positive_limits_are_rejected(rate, burst):
+    with pytest.raises(ValueError):
+        RateLimiter(rate=rate, burst=burst)
+    with pytest.raises(ValidationError):
+        Settings(session_rate_limit=rate, session_rate_burst=burst)
+
+
+def test_rate_limiting_is_off_by_default():
+    assert Settings.model_fields["rate_limit_enabled"].default is False
+
+
+PROXIES = parse_networks("127.0.0.1, 172.16.0.0/12")
+
+
+@pytest.mark.parametrize("peer, forwarded_for, expected", [
+    ("203.0.113.5", None, "203.0.113.5"),
+    # an untrusted peer can't pick its own bucket
+    ("203.0.113.5", "198.51.100.1", "203.0.113.5"),
+    ("172.18.0.2", "198.51.100.1", "198.51.100.1"),
+    # spoofed hops before the nearest untrusted one are ignored
+    ("172.18.0.2", "10.9.9.9, 198.51.100.1, 127.0.0.1", "198.51.100.1"),
+    ("127.0.0.1", "not-an-ip", "not-an-ip"),
+    ("127.0.0.1", "172.18.0.3", "127.0.0.1"),
+    (None, "198.51.100.1", None),
+])
+def test_client_ip_behind_trusted_proxies(peer, forwarded_for, expected):
+    assert client_ip(peer, forwarded_for, PROXIES) == expected
+
+
+def test_without_trusted_proxies_the_peer_is_used():
+    assert client_ip("127.0.0.1", "198.51.100.1", []) == "127.0.0.1"
@@ -0,0 +1,99 @@
+"""Incremental knowledge index refresh"""
+import os
+
+import numpy as np
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from knowledge_base import _normalize, refresh_index
+
+
+class CountingEmbedding(DeterministicFakeEmbedding):
+    """Stand-in embeddings that remember which texts they embedded"""
+    embedded: list = []
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return super().embed_documents(texts)
+
+
+@pytest.fixture
+def counting():
+    return CountingEmbedding(size=384, embedded=[])
+
+
+def write(knowledge_dir, name, topic, mtime):
+    path = knowledge_dir / name
+    path.write_text(
+        "\n\n".join(f"{topic} rule {i}: orders of type {i * 7} follow the {topic} schedule." for i in range(40))
+    )
+    os.utime(path, (mtime, mtime))
+
+
+def assert_aligned(index, embeddings):
+    """Every row of the matrix is the embedding of the chunk at the same position"""
+    assert len(index.vectors) == len(index.chunks)
+    expected = _normalize(np.asarray(embeddings.embed_documents([c["text"] for c in index.chunks]),
+                                     dtype=np.float32))
+    np.testing.assert_allclose(index.vectors, expected, rtol=1e-5, atol=1e-6)
+
+
+def sources(index):
+    return {os.path.basename(c["metadata"]["source"]) for c in index.chunks}
+
+
+def test_unchanged_knowledge_keeps_the_index(knowledge_dir, tmp_path, counting):
+    write(knowledge_dir, "returns.txt", "returns", 1000)
+    first = refresh_index(None, counting, tmp_path)
+    counting.embedded.clear()
+
+    assert refresh_index(first, counting, tmp_path) is first
+    assert counting.embedded == []
+
+
+def test_only_changed_files_are_re_embedded(knowledge_dir, tmp_path, counting):
+    write(knowledge_dir, "returns.txt", "returns", 1000)
+    write(knowledge_dir, "shipping.txt", "shipping", 1000)
+    first = refresh_index(None, counting, tmp_path)
+    counting.embedded.clear()
+
+    write(knowledge_dir, "shipping.txt", "delivery", 2000)
+    second = refresh_index(first, counting, tmp_path)
+
+    assert second.version == "v2"
+    assert isinstance(second.vectors, np.memmap)
+    assert counting.embedded and all("delivery" in text for text in counting.embedded)
+    assert sources(second) == {"returns.txt", "shipping.txt"}
+    assert not any("shipping rule" in c["text"] for c in second.chunks)
+    assert_aligned(second, counting)
+
+
+def test_vectors_stay_aligned_after_a_delete(knowledge_dir, tmp_path, counting):
+    write(knowledge_dir, "faq.txt", "faq", 1000)
+    write(knowledge_dir, "returns.txt", "returns", 1000)
+    write(knowledge_dir, "shipping.txt", "shipping", 1000)
+    first = refresh_index(None, counting, tmp_path)
+    counting.embedded.clear()
+
+    (knowledge_dir / "returns.txt").unlink()
+    second = refresh_index(first, counting, tmp_path)
+
+    assert counting.embedded == []
+    assert sources(second) == {"faq.txt", "shipping.txt"}
+    assert len(second.chunks) < len(first.chunks)
+    assert_aligned(second, counting)
+
+    target = next(c for c in second.chunks if "shipping" in c["text"])
+    found = second.similarity_search_by_vector(counting.embed_query(target["text"]), k=1)
+    assert found[0].page_content == target["text"]
+
+
+def test_picks_up_a_version_published_by_another_worker(knowledge_dir, tmp_path, counting):
+    write(knowledge_dir, "returns.txt", "returns", 1000)
+    stale = refresh_index(None, counting, tmp_path)
+    write(knowledge_dir, "returns.txt", "refunds", 2000)
+    latest = refresh_index(stale, counting, tmp_path)
+    counting.embedded.clear()
+
+    assert refresh_index(stale, counting, tmp_path).version == latest.version
+    assert counting.embedded == []
@@ -0,0 +1,103 @@
+"""Priority classes, per-session round-robin and queue bounds of RequestScheduler"""
+import asyncio
+import threading
+
+import pytest
+
+from scheduler import BATCH, INTERACTIVE, RequestScheduler, SchedulerFull, priority_class
+
+
+async def run_blocked(scheduler: RequestScheduler, submissions):
+    """
+    Occupy the only worker, queue ``submissions`` of (label, fairness_key,
+    request_class) behind it, then release it; returns the labels in run order
+    """
+    gate = threading.Event()
+    order = []
+    blocker = asyncio.create_task(scheduler.submit(gate.wait, fairness_key="blocker"))
+    await asyncio.sleep(0)
+    tasks = [
+        asyncio.create_task(scheduler.submit(order.append, label, fairness_key=key, request_class=cls))
+        for label, key, cls in submissions
+    ]
+    await asyncio.sleep(0)
+    gate.set()
+    await asyncio.gather(blocker, *tasks)
+    return order
+
+
+def test_priority_class():
+    assert priority_class("interactive", escalation=False) == "interactive"
+    assert priority_class("batch", escalation=True) == "batch_escalation"
+    assert priority_class("anything", escalation=True) == "interactive_escalation"
+
+
+def test_higher_classes_run_first():
+    scheduler = RequestScheduler(concurrency=1, max_queue=0)
+    order = asyncio.run(run_blocked(scheduler, [
+        ("batch", "s1", BATCH),
+        ("interactive", "s2", INTERACTIVE),
+        ("batch_escalation", "s3", priority_class(BATCH, True)),
+        ("interactive_escalation", "s4", priority_class(INTERACTIVE, True)),
+    ]))
+    assert order == ["interactive_escalation", "interactive", "batch_escalation", "batch"]
+
+
+def test_sessions_take_turns_within_a_class():
+    scheduler = RequestScheduler(concurrency=1, max_queue=0)
+    order = asyncio.run(run_blocked(scheduler, [
+        ("a1", "a", INTERACTIVE), ("a2", "a", INTERACTIVE), ("a3", "a", INTERACTIVE),
+        ("b1", "b", INTERACTIVE), ("c1", "c", INTERACTIVE), ("b2", "b", INTERACTIVE),
+    ]))
+    assert order == ["a1", "b1", "c1", "a2", "b2", "a3"]
+
+
+def test_kwargs_reach_the_call_but_not_the_fairness_key():
+    async def main():
+        scheduler = RequestScheduler(concurrency=2, max_queue=0)
+        return await scheduler.submit(lambda query, session_id=None: (query, session_id), "hi",
+                                      session_id="s1", fairness_key="s1")
+
+    assert asyncio.run(main()) == ("hi", "s1")
+
+
+def test_full_class_rejects_new_requests():
+    async def main():
+        scheduler = RequestScheduler(concurrency=1, max_queue=2)
+        gate = threading.Event()
+        running = asyncio.create_task(scheduler.submit(gate.wait, fairness_key="s0"))
+        await asyncio.sleep(0)
+        queued = [asyncio.create_task(scheduler.submit(lambda: None, fairness_key=f"s{i}")) for i in (1, 2)]
+        await asyncio.sleep(0)
+
+        with pytest.raises(SchedulerFull) as full:
+            await scheduler.submit(lambda: None, fairness_key="s3")
+        # other classes have their own bound
+        batch = asyncio.create_task(scheduler.submit(lambda: "batch", fairness_key="s3", request_class=BATCH))
+        await asyncio.sleep(0)
+        stats = scheduler.stats()["classes"]
+
+        gate.set()
+        await asyncio.gather(running, *queued)
+        return full.value, stats, await batch
+
+    error, stats, batch_result = asyncio.run(main())
+    assert error.request_class == INTERACTIVE
+    assert stats[INTERACTIVE]["queue_depth"] == 2
+    assert stats[INTERACTIVE]["rejected"] == 1
+    assert stats[BATCH]["queue_depth"] == 1
+    assert batch_result == "batch"
+
+
+def test_errors_propagate_and_free_the_worker():
+    async def main():
+        scheduler = RequestScheduler(concurrency=1, max_queue=0)
+
+        def fail():
+            raise ValueError("boom")
+
+        with pytest.raises(ValueError):
+            await scheduler.submit(fail, fairness_key="s1")
+        return await scheduler.submit(lambda: "ok", fairness_key="s1"), scheduler.running
+
+    assert asyncio.run(main()) == ("ok", 0)
@@ -0,0 +1,92 @@
+"""Session history paging and ETags"""
+import pytest
+from fastapi.testclient import TestClient
+
+from session_store import MemorySessionStore, SqliteSessionStore, new_turn
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemorySessionStore()
+    return SqliteSessionStore(str(tmp_path / "sessions.db"))
+
+
+def fill(store, session_id: str, turns: int) -> list:
+    """Store ``turns`` exchanges; returns the message IDs"""
+    ids = []
+    for i in range(turns):
+        ids.extend(m[0] for m in store.append(session_id, new_turn(f"question {i}", f"answer {i}")))
+    return ids
+
+
+def ids(page) -> list:
+    return [m[0] for m in page[0]]
+
+
+def test_pages_back_and_forward(store):
+    store.append("other", new_turn("unrelated", "interleaved"))
+    all_ids = fill(store, "s1", 5)
+    assert all_ids == sorted(all_ids)
+
+    newest = store.page("s1", limit=4)
+    assert ids(newest) == all_ids[-4:] and newest[1] is True
+    older = store.page("s1", before=all_ids[-4], limit=4)
+    assert ids(older) == all_ids[2:6] and older[1] is True
+    oldest = store.page("s1", before=all_ids[2], limit=4)
+    assert ids(oldest) == all_ids[:2] and oldest[1] is False
+
+    caught_up = store.page("s1", after=all_ids[3], limit=4)
+    assert ids(caught_up) == all_ids[4:8] and caught_up[1] is True
+    assert store.page("s1", after=all_ids[-1]) == ([], False)
+    assert store.page("missing") == ([], False)
+
+
+def test_version_tracks_changes(store):
+    assert store.version("s1") is None
+    first = fill(store, "s1", 1)
+    assert store.version("s1") == (2, first[-1])
+    second = fill(store, "s1", 1)
+    assert store.version("s1") == (4, second[-1])
+
+    store.delete("s1")
+    assert store.version("s1") is None
+    assert fill(store, "s1", 1)[0] > second[-1]  # IDs are never reused
+
+
+@pytest.fixture(scope="module")
+def api():
+    import agents
+    from langchain_core.embeddings import DeterministicFakeEmbedding
+
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(agents, "create_embeddings", lambda: DeterministicFakeEmbedding(size=384))
+        import main
+    return main
+
+
+def test_history_endpoint_etag(api):
+    client = TestClient(api.app)
+    session_id = "etag-session"
+    all_ids = fill(api.session_store, session_id, 3)
+
+    page = client.get(f"/session/{session_id}", params={"limit": 4})
+    assert page.status_code == 200
+    body = page.json()
+    assert [m["id"] for m in body["messages"]] == all_ids[-4:]
+    assert body["has_more"] is True
+    assert set(body["messages"][0]) == {"id", "role", "content", "ts"}
+    etag = page.headers["ETag"]
+
+    cached = client.get(f"/session/{session_id}", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["ETag"] == etag
+
+    fill(api.session_store, session_id, 1)
+    changed = client.get(f"/session/{session_id}", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+    older = client.get(f"/session/{session_id}", params={"before": all_ids[2], "limit": 4}).json()
+    assert [m["id"] for m in older["messages"]] == all_ids[:2]
+    assert client.get("/session/missing").status_code == 404
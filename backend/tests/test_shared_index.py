@@ -0,0 +1,55 @@
+"""Published index shared between workers, and the SQLite session store"""
+import numpy as np
+
+from knowledge_base import open_index
+from session_store import ROLE_ASSISTANT, ROLE_USER, SqliteSessionStore, new_turn
+
+
+def write_policy(knowledge_dir, name, topic):
+    (knowledge_dir / name).write_text(
+        "\n\n".join(f"{topic} rule {i}: orders of type {i * 7} follow the {topic} schedule." for i in range(40))
+    )
+
+
+def test_readonly_without_published_index(tmp_path, embeddings):
+    assert open_index(embeddings, mode="readonly", root=tmp_path / "index") is None
+
+
+def test_readonly_opens_what_auto_published(knowledge_dir, tmp_path, embeddings):
+    write_policy(knowledge_dir, "returns.txt", "returns")
+    write_policy(knowledge_dir, "shipping.txt", "shipping")
+    root = tmp_path / "index"
+
+    built = open_index(embeddings, mode="auto", root=root)
+    shared = open_index(embeddings, mode="readonly", root=root)
+
+    assert shared.version == built.version == "v1"
+    assert isinstance(built.vectors, np.memmap)
+    assert isinstance(shared.vectors, np.memmap)
+    assert [c["id"] for c in shared.chunks] == [c["id"] for c in built.chunks]
+    np.testing.assert_allclose(shared.vectors, built.vectors)
+
+    query = embeddings.embed_query(shared.chunks[3]["text"])
+    assert shared.similarity_search_by_vector(query, k=1)[0].page_content == shared.chunks[3]["text"]
+
+
+def test_auto_reuses_an_up_to_date_index(knowledge_dir, tmp_path, embeddings):
+    write_policy(knowledge_dir, "returns.txt", "returns")
+    root = tmp_path / "index"
+
+    assert open_index(embeddings, mode="auto", root=root).version == "v1"
+    assert open_index(embeddings, mode="auto", root=root).version == "v1"
+    assert open_index(embeddings, mode="rebuild", root=root).version == "v2"
+
+
+def test_sqlite_sessions_are_visible_to_other_workers(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    worker_a, worker_b = SqliteSessionStore(path), SqliteSessionStore(path)
+
+    stored = worker_a.append("s1", new_turn("Where is my order?", "It ships tomorrow."))
+
+    assert [role for _, role, _, _ in stored] == [ROLE_USER, ROLE_ASSISTANT]
+    assert worker_b.exists("s1")
+    assert worker_b.recent("s1", 10) == stored
+    assert worker_b.delete("s1")
+    assert not worker_a.exists("s1")
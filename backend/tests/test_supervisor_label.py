@@ -0,0 +1,61 @@
+"""Early-exit parsing of the supervisor's routing label"""
+import pytest
+
+from agents import parse_worker_label
+
+
+@pytest.mark.parametrize("text", ["", "k", "Re", " e", "**", "the", "I think", "worker"])
+def test_undecided_prefixes(text):
+    assert parse_worker_label(text) is None
+
+
+@pytest.mark.parametrize("text, label", [
+    ("kno", "knowledge_worker"),
+    ("res", "response_worker"),
+    ("escal", "escalation_worker"),
+    ("fin", "FINISH"),
+    ("knowledge_worker", "knowledge_worker"),
+    ("response_worker", "response_worker"),
+    ("escalation_worker", "escalation_worker"),
+    ("FINISH", "FINISH"),
+])
+def test_prefixes_and_exact_labels(text, label):
+    assert parse_worker_label(text) == label
+
+
+@pytest.mark.parametrize("text, label", [
+    ("Knowledge_Worker.", "knowledge_worker"),
+    ("**ESCALATION_WORKER**", "escalation_worker"),
+    ("  response_worker\n", "response_worker"),
+    ("Knowledge Worker", "knowledge_worker"),
+    ("escalation-worker", "escalation_worker"),
+    ("`finish`", "FINISH"),
+    ("1. knowledge_worker", "knowledge_worker"),
+    ("knowledge_worker, because the customer asks about returns", "knowledge_worker"),
+])
+def test_case_and_punctuation(text, label):
+    assert parse_worker_label(text) == label
+
+
+def supervise(orchestrator) -> str:
+    return orchestrator.supervisor_node({"query": "Where is my parcel?", "chat_history": ""})["next_worker"]
+
+
+def test_streamed_label_exits_early(make_orchestrator):
+    orchestrator = make_orchestrator(supervisor="knowledge_worker")
+
+    assert supervise(orchestrator) == "knowledge_worker"
+    assert orchestrator.supervisor_stats["early_exits"] == 1
+    assert orchestrator.supervisor_stats["output_tokens"] < len("knowledge_worker") // 4 + 1
+
+
+@pytest.mark.parametrize("answer, label", [
+    ("I think the Escalation Worker should take this.", "escalation_worker"),
+    ("Route to: response_worker", "response_worker"),
+    ("Not sure.", "FINISH"),
+])
+def test_off_format_answers_fall_back_to_a_search(make_orchestrator, answer, label):
+    orchestrator = make_orchestrator(supervisor=answer)
+
+    assert supervise(orchestrator) == label
+    assert orchestrator.supervisor_stats["early_exits"] == 0
@@ -0,0 +1,192 @@
+"""
+Per-node token accounting and prompt-size budgets
+
+Every LLM call is counted under its graph node, using the provider's usage
+metadata when present and a ~4 characters/token estimate otherwise. Counts
+are also rolled up per route (the path a request took through the graph), so
+it's visible which prompt dominates cost and latency. Rendered prompts larger
+than the node's budget in PROMPT_BUDGETS log a warning.
+"""
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+import math
+
+from config import settings
+from llm_cache import llm_identity
+
+_request: ContextVar[Optional["RequestUsage"]] = ContextVar("request_usage", default=None)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count when the provider reports none"""
+    return math.ceil(len(text) / 4) if text else 0
+
+
+def prompt_text(messages) -> str:
+    return "\n".join(m.content if isinstance(m.content, str) else str(m.content) for m in messages)
+
+
+def call_usage(messages, response, prompt_tokens: Optional[int] = None) -> Tuple[int, int, bool]:
+    """(input tokens, output tokens, estimated) of one LLM call"""
+    usage = getattr(response, "usage_metadata", None) or {}
+    input_tokens = usage.get("input_tokens")
+    output_tokens = usage.get("output_tokens")
+    estimated = not input_tokens or not output_tokens
+    if not input_tokens:
+        input_tokens = prompt_tokens if prompt_tokens is not None else estimate_tokens(prompt_text(messages))
+    if not output_tokens:
+        content = getattr(response, "content", "")
+        output_tokens = estimate_tokens(content if isinstance(content, str) else str(content))
+    return input_tokens, output_tokens, estimated
+
+
+def call_cost(llm, input_tokens: int, output_tokens: int,
+              prices: Optional[Dict[str, Tuple[float, float]]] = None) -> float:
+    """Estimated USD cost of a call from the per-million-token price table"""
+    prices = prices if prices is not None else settings.model_prices
+    price_in, price_out = prices.get(llm_identity(llm)[0].split("/")[-1], (0.0, 0.0))
+    return (input_tokens * price_in + output_tokens * price_out) / 1_000_000
+
+
+class RequestUsage:
+    """Route and token counts of the request being processed"""
+
+    def __init__(self):
+        self.path = "graph"
+        self.route: List[str] = []
+        self.nodes: Dict[str, List[int]] = defaultdict(lambda: [0, 0])
+
+
+def note_path(path: str):
+    """Mark the current request as answered outside the graph (prescreen, faq)"""
+    usage = _request.get()
+    if usage is not None:
+        usage.path = path
+
+
+def note_node(node: str):
+    """Append a graph node to the current request's route"""
+    usage = _request.get()
+    if usage is not None:
+        usage.route.append(node)
+
+
+class TokenMeter:
+    """Aggregates input/output tokens per node and per route"""
+
+    def __init__(self, budgets: Optional[Dict[str, int]] = None,
+                 prices: Optional[Dict[str, Tuple[float, float]]] = None):
+        self.budgets = budgets if budgets is not None else settings.prompt_budgets
+        self.prices = prices if prices is not None else settings.model_prices
+        self._lock = Lock()
+        self._nodes = defaultdict(lambda: {
+            "calls": 0, "cached_calls": 0, "estimated_calls": 0, "input_tokens": 0, "output_tokens": 0,
+            "max_input_tokens": 0, "cost_usd": 0.0, "budget_warnings": 0,
+        })
+        self._routes = defaultdict(lambda: {
+            "requests": 0, "input_tokens": 0, "output_tokens": 0,
+            "nodes": defaultdict(lambda: {"input_tokens": 0, "output_tokens": 0}),
+        })
+
+    @contextmanager
+    def request(self):
+        """Collect the enclosed request's usage and fold it into its route on exit"""
+        usage = RequestUsage()
+        token = _request.set(usage)
+        try:
+            yield usage
+        finally:
+            _request.reset(token)
+            self._close(usage)
+
+    def _close(self, usage: RequestUsage):
+        key = " > ".join(usage.route) if usage.path == "graph" else usage.path
+        with self._lock:
+            route = self._routes[key]
+            route["requests"] += 1
+            for node, (input_tokens, output_tokens) in usage.nodes.items():
+                route["input_tokens"] += input_tokens
+                route["output_tokens"] += output_tokens
+                route["nodes"][node]["input_tokens"] += input_tokens
+                route["nodes"][node]["output_tokens"] += output_tokens
+
+    def check_prompt(self, node: str, messages) -> int:
+        """Estimated prompt size; warns when it exceeds the node's budget"""
+        tokens = estimate_tokens(prompt_text(messages))
+        budget = self.budgets.get(node)
+        if budget and tokens > budget:
+            with self._lock:
+                self._nodes[node]["budget_warnings"] += 1
+            print(f"Warning: {node} prompt is ~{tokens} tokens, over its budget of {budget}")
+        return tokens
+
+    def record(self, node: str, llm, messages, response, cached: bool = False,
+               prompt_tokens: Optional[int] = None):
+        """Count one LLM call; cached answers are tallied but cost nothing"""
+        input_tokens, output_tokens, estimated = call_usage(messages, response, prompt_tokens)
+
+        with self._lock:
+            stats = self._nodes[node]
+            if cached:
+                stats["cached_calls"] += 1
+                return
+            stats["calls"] += 1
+            stats["estimated_calls"] += int(estimated)
+            stats["input_tokens"] += input_tokens
+            stats["output_tokens"] += output_tokens
+            stats["max_input_tokens"] = max(stats["max_input_tokens"], input_tokens)
+            stats["cost_usd"] += call_cost(llm, input_tokens, output_tokens, self.prices)
+
+        request = _request.get()
+        if request is not None:
+            request.nodes[node][0] += input_tokens
+            request.nodes[node][1] += output_tokens
+
+    def stats(self) -> dict:
+        """Per-node totals (for /metrics)"""
+        with self._lock:
+            return {
+                node: {
+                    **s,
+                    "avg_input_tokens": s["input_tokens"] / s["calls"] if s["calls"] else 0.0,
+                    "avg_output_tokens": s["output_tokens"] / s["calls"] if s["calls"] else 0.0,
+                    "budget": self.budgets.get(node),
+                }
+                for node, s in self._nodes.items()
+            }
+
+    def summary(self) -> dict:
+        """Per-node shares of all tokens plus per-route averages (admin report)"""
+        nodes = self.stats()
+        total_input = sum(s["input_tokens"] for s in nodes.values())
+        total_output = sum(s["output_tokens"] for s in nodes.values())
+        for s in nodes.values():
+            s["input_share"] = s["input_tokens"] / total_input if total_input else 0.0
+            s["output_share"] = s["output_tokens"] / total_output if total_output else 0.0
+
+        with self._lock:
+            routes = {
+                key: {
+                    "requests": r["requests"],
+                    "avg_input_tokens": r["input_tokens"] / r["requests"],
+                    "avg_output_tokens": r["output_tokens"] / r["requests"],
+                    "nodes": {
+                        node: {
+                            "avg_input_tokens": n["input_tokens"] / r["requests"],
+                            "avg_output_tokens": n["output_tokens"] / r["requests"],
+                        }
+                        for node, n in r["nodes"].items()
+                    },
+                }
+                for key, r in self._routes.items()
+            }
+        return {
+            "total_input_tokens": total_input,
+            "total_output_tokens": total_output,
+            "total_cost_usd": sum(s["cost_usd"] for s in nodes.values()),
+            "nodes": nodes,
+            "routes": routes,
+        }
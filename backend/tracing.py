@@ -0,0 +1,182 @@
+"""
+Request trace capture
+
+When TRACE_ENABLED is set, every processed query produces one JSON line with
+the query, chat-context size, the path it took (pre-screen, FAQ, graph), the
+graph nodes visited, retrieved chunk IDs, per-node timings and per-LLM-call
+latency and token counts. Lines go to a size-rotated JSONL file that
+``replay.py`` can feed back through the orchestrator.
+
+The active trace lives in a context variable, so graph nodes record into it
+without it being threaded through the agent state. With tracing off the
+module-level helpers are a single ContextVar lookup.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from threading import Lock
+from typing import Optional
+import json
+import os
+import random
+import time
+
+from config import settings
+from llm_cache import llm_identity
+
+_current: ContextVar[Optional["RequestTrace"]] = ContextVar("request_trace", default=None)
+
+
+class RequestTrace:
+    """Everything recorded about one process_query call"""
+
+    def __init__(self, query: str, chat_history: str):
+        self._start = time.perf_counter()
+        self.record = {
+            "ts": time.time(),
+            "query": query,
+            "context_chars": len(chat_history),
+            "context_turns": chat_history.count("\n") + 1 if chat_history else 0,
+            "path": "graph",
+            "route": [],
+            "chunk_ids": [],
+            "nodes": [],
+            "llm_calls": [],
+        }
+
+    def offset_ms(self) -> float:
+        return (time.perf_counter() - self._start) * 1000
+
+    def finish(self, result: Optional[dict], error: Optional[BaseException] = None):
+        self.record["total_ms"] = round(self.offset_ms(), 3)
+        if result is not None:
+            self.record["escalation_needed"] = result.get("escalation_needed", False)
+            self.record["response_chars"] = len(result.get("response", ""))
+        if error is not None:
+            self.record["error"] = f"{type(error).__name__}: {error}"
+
+
+def current_trace() -> Optional[RequestTrace]:
+    return _current.get()
+
+
+@contextmanager
+def activate(trace: RequestTrace):
+    """Make ``trace`` the active trace for the enclosed block"""
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+
+
+def annotate(**fields):
+    """Set top-level fields on the active trace, if any"""
+    trace = _current.get()
+    if trace is not None:
+        trace.record.update(fields)
+
+
+@contextmanager
+def node_span(node: str):
+    """Time a graph node into the active trace"""
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    trace.record["route"].append(node)
+    offset = trace.offset_ms()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.record["nodes"].append({
+            "node": node,
+            "offset_ms": round(offset, 3),
+            "wall_ms": round((time.perf_counter() - start) * 1000, 3),
+        })
+
+
+def record_llm_call(node: str, llm, response, elapsed: float, cached: bool = False):
+    """Add one LLM call (latency, token usage) to the active trace"""
+    trace = _current.get()
+    if trace is None:
+        return
+    usage = getattr(response, "usage_metadata", None) or {}
+    trace.record["llm_calls"].append({
+        "node": node,
+        "model": llm_identity(llm)[0],
+        "ms": round(elapsed * 1000, 3),
+        "input_tokens": usage.get("input_tokens"),
+        "output_tokens": usage.get("output_tokens"),
+        "output_chars": len(response.content) if isinstance(getattr(response, "content", None), str) else 0,
+        "cached": cached,
+    })
+
+
+class TraceWriter:
+    """Samples requests and appends their traces to a size-rotated JSONL file"""
+
+    def __init__(self, path: str = settings.trace_path,
+                 max_bytes: int = int(settings.trace_max_mb * 1024 * 1024),
+                 backups: int = settings.trace_backups,
+                 sample_rate: float = settings.trace_sample_rate):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.sample_rate = sample_rate
+        self._lock = Lock()
+        self.written = 0
+        self.rotations = 0
+
+    @contextmanager
+    def capture(self, query: str, chat_history: str):
+        """Make a trace active for the enclosed processing and write it afterwards"""
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            yield None
+            return
+        trace = RequestTrace(query, chat_history)
+        try:
+            with activate(trace):
+                yield trace
+        except BaseException as e:
+            trace.finish(None, e)
+            raise
+        finally:
+            if "total_ms" not in trace.record:
+                trace.finish(None)
+            self.write(trace.record)
+
+    def write(self, record: dict):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            try:
+                size = os.path.getsize(self.path)
+            except FileNotFoundError:
+                size = 0
+            if size and size + len(line) > self.max_bytes:
+                self._rotate()
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+            self.written += 1
+
+    def _rotate(self):
+        """traces.jsonl -> traces.jsonl.1 -> ... -> traces.jsonl.<backups> (dropped)"""
+        for i in range(self.backups - 1, 0, -1):
+            older = f"{self.path}.{i}"
+            if os.path.exists(older):
+                os.replace(older, f"{self.path}.{i + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self.rotations += 1
+
+    def stats(self) -> dict:
+        return {
+            "path": self.path,
+            "sample_rate": self.sample_rate,
+            "written": self.written,
+            "rotations": self.rotations,
+        }
@@ -0,0 +1,73 @@
+"""
+WebSocket frame formats
+
+Clients choose the frame format of /ws/{session_id} with the WebSocket
+subprotocol: ``msgpack`` exchanges MessagePack binary frames, ``json`` (or
+no subprotocol) JSON text frames. permessage-deflate compression is a
+separate extension negotiated by the server (uvicorn's
+``ws_per_message_deflate``) and applies to either format.
+"""
+from typing import List, Optional, Union
+import json
+
+from starlette.websockets import WebSocket, WebSocketDisconnect
+
+from config import settings
+
+try:
+    import msgpack
+except ImportError:  # binary frames disabled
+    msgpack = None
+
+JSON = "json"
+MSGPACK = "msgpack"
+
+
+def supported_formats() -> List[str]:
+    """Subprotocols the server accepts, most preferred first"""
+    if settings.ws_msgpack_enabled and msgpack is not None:
+        return [MSGPACK, JSON]
+    return [JSON]
+
+
+def negotiate(offered: List[str]) -> Optional[str]:
+    """Subprotocol to accept from the client's offer; None means plain JSON"""
+    supported = supported_formats()
+    for protocol in supported:
+        if protocol in offered:
+            return protocol
+    return None
+
+
+class FrameCodec:
+    """Encodes and decodes a connection's frames in its negotiated format"""
+
+    def __init__(self, fmt: Optional[str] = None):
+        self.format = fmt or JSON
+
+    def encode(self, data: dict) -> Union[bytes, str]:
+        if self.format == MSGPACK:
+            return msgpack.packb(data, use_bin_type=True)
+        return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+    def decode(self, frame: Union[bytes, str]) -> dict:
+        """Binary frames are MessagePack, text frames JSON (whatever was negotiated)"""
+        if isinstance(frame, bytes):
+            return msgpack.unpackb(frame, raw=False)
+        return json.loads(frame)
+
+    async def receive(self, websocket: WebSocket) -> dict:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            raise WebSocketDisconnect(message.get("code", 1000))
+        frame = message.get("bytes")
+        if frame is None or self.format != MSGPACK:
+            frame = message.get("text") or ""
+        return self.decode(frame)
+
+    async def send(self, websocket: WebSocket, data: dict):
+        frame = self.encode(data)
+        if isinstance(frame, bytes):
+            await websocket.send_bytes(frame)
+        else:
+            await websocket.send_text(frame)